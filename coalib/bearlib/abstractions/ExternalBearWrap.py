@@ -190,7 +190,8 @@ def _create_wrapper(klass, options):
                 return
 
             shell_command = (self.get_executable(),) + args
-            out, err = run_shell_command(shell_command, json_string)
+            out, err = run_shell_command(shell_command, json_string,
+                                         new_session=True)
 
             return self.parse_output(out, filename)
 
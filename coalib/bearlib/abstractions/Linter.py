@@ -659,6 +659,7 @@ def _create_linter(klass, options):
                 output = run_shell_command(
                     arguments,
                     stdin=''.join(file) if options['use_stdin'] else None,
+                    new_session=True,
                     cwd=self.get_config_dir())
 
                 output = tuple(compress(
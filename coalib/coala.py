@@ -84,6 +84,22 @@ def main(debug=False):
             show_language_bears_capabilities(capabilities, console_printer)
 
             return 0
+        elif args.cache_gc:
+            from coalib.misc.CacheDatabase import CacheDatabase
+            from coalib.misc.CachingUtilities import get_cache_limits
+            from coalib.settings.ConfigurationGathering import (
+                load_configuration)
+
+            sections, _ = load_configuration(None, log_printer, args=args)
+            max_age, max_size = get_cache_limits(sections['cli'], log_printer)
+            database = CacheDatabase(log_printer)
+            evicted = database.collect_garbage(max_age, max_size)
+            database.vacuum()
+            database.close()
+            console_printer.print('Evicted the caches of {} projects.'.format(
+                len(evicted)))
+
+            return 0
 
     except BaseException as exception:  # pylint: disable=broad-except
         if not isinstance(exception, SystemExit):
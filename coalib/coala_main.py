@@ -9,17 +9,49 @@ from coalib.output.Interactions import fail_acquire_settings
 from coalib.output.printers.LogPrinter import LogPrinter
 from coalib.output.printers.LOG_LEVEL import LOG_LEVEL
 from coalib.output.Logging import CounterHandler
-from coalib.processes.Processing import execute_section, simplify_section_result
+from coalib.processes.BearRunnerPool import BearRunnerPool
+from coalib.processes.Processing import (
+    execute_section, execute_sections_concurrently, get_job_count,
+    simplify_section_result)
 from coalib.settings.ConfigurationGathering import gather_configuration
 from coalib.misc.Caching import FileCache
-from coalib.misc.CachingUtilities import (
-    settings_changed, update_settings_db, get_settings_hash)
+from coalib.misc.CachingUtilities import get_cache_limits
 
 
 def do_nothing(*args):
     return True
 
 
+def execute_sections(sections,
+                     global_bears,
+                     local_bears,
+                     print_results,
+                     print_section_beginning,
+                     cache,
+                     log_printer,
+                     console_printer,
+                     debug,
+                     pool):
+    """
+    Executes the given list of section names and sections one after another.
+
+    :return: A generator yielding tuples of section names and the results of
+             ``execute_section``.
+    """
+    for section_name, section in sections:
+        print_section_beginning(section)
+        yield section_name, execute_section(
+            section=section,
+            global_bear_list=global_bears[section_name],
+            local_bear_list=local_bears[section_name],
+            print_results=print_results,
+            cache=cache,
+            log_printer=log_printer,
+            console_printer=console_printer,
+            debug=debug,
+            pool=pool)
+
+
 def run_coala(console_printer=None,
               log_printer=None,
               print_results=do_nothing,
@@ -78,6 +110,7 @@ def run_coala(console_printer=None,
     sections = {}
     results = {}
     file_dicts = {}
+    pool = None
     try:
         yielded_results = yielded_unfixed_results = False
         did_nothing = True
@@ -92,14 +125,36 @@ def run_coala(console_printer=None,
                           .format(platform.system(), platform.python_version(),
                                   VERSION))
 
-        settings_hash = get_settings_hash(sections, targets)
-        flush_cache = bool(sections['cli'].get('flush_cache', False) or
-                           settings_changed(log_printer, settings_hash))
+        # Results are invalidated per section when the settings of its local
+        # bears change, see ``FileCache.section_settings_changed``.
+        flush_cache = bool(sections['cli'].get('flush_cache', False))
 
         cache = None
         if not sections['cli'].get('disable_caching', False):
-            cache = FileCache(log_printer, os.getcwd(), flush_cache)
-
+            max_age, max_size = get_cache_limits(sections['cli'], log_printer)
+            cache = FileCache(
+                log_printer,
+                os.getcwd(),
+                flush_cache,
+                content_hashes=bool(sections['cli'].get(
+                    'cache_content_hashes', False)),
+                max_age=max_age,
+                max_size=max_size)
+
+        debug = debug or bool(args and args.debug)
+        concurrent_sections = (
+            bool(sections['cli'].get('concurrent_sections', False)) and
+            not debug)
+
+        if sections['cli'].get('persistent_workers', False):
+            if concurrent_sections:
+                log_printer.warn('The persistent_workers setting is ignored '
+                                 'when sections are executed concurrently.')
+            else:
+                # Share the bear running processes between all sections.
+                pool = BearRunnerPool()
+
+        enabled_sections = []
         for section_name, section in sections.items():
             if not section.is_enabled(targets):
                 continue
@@ -110,16 +165,33 @@ def run_coala(console_printer=None,
                 section['default_actions'] = '*: ShowPatchAction'
                 section['show_result_on_top'] = 'yeah'
 
-            print_section_beginning(section)
-            section_result = execute_section(
-                section=section,
-                global_bear_list=global_bears[section_name],
-                local_bear_list=local_bears[section_name],
-                print_results=print_results,
-                cache=cache,
-                log_printer=log_printer,
-                console_printer=console_printer,
-                debug=debug or args and args.debug)
+            enabled_sections.append((section_name, section))
+
+        if concurrent_sections:
+            section_results = execute_sections_concurrently(
+                enabled_sections,
+                global_bears,
+                local_bears,
+                print_results,
+                print_section_beginning,
+                cache,
+                log_printer,
+                console_printer,
+                job_count=get_job_count(sections['cli'], log_printer))
+        else:
+            section_results = execute_sections(
+                enabled_sections,
+                global_bears,
+                local_bears,
+                print_results,
+                print_section_beginning,
+                cache,
+                log_printer,
+                console_printer,
+                debug,
+                pool)
+
+        for section_name, section_result in section_results:
             yielded, yielded_unfixed, results[section_name] = (
                 simplify_section_result(section_result))
 
@@ -130,7 +202,6 @@ def run_coala(console_printer=None,
 
             file_dicts[section_name] = section_result[3]
 
-        update_settings_db(log_printer, settings_hash)
         if cache:
             cache.write()
 
@@ -156,5 +227,8 @@ def run_coala(console_printer=None,
                 raise
 
         exitcode = exitcode or get_exitcode(exception, log_printer)
+    finally:
+        if pool is not None:
+            pool.close()
 
     return results, exitcode, file_dicts
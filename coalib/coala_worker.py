@@ -0,0 +1,44 @@
+import argparse
+from multiprocessing.connection import Listener
+import os
+import sys
+
+from coalib.core.RemoteExecutor import (
+    AUTHKEY_VARIABLE, FILE_CONTENTS_CACHE_SIZE, format_address, parse_address,
+    serve)
+from coalib.output.Logging import configure_logging
+
+
+def main(args=None):
+    configure_logging()
+
+    arg_parser = argparse.ArgumentParser(
+        description='Runs the tasks of bears for coala instances using a '
+                    '`RemoteExecutor`. The authentication key is read from '
+                    'the {} environment variable.'.format(AUTHKEY_VARIABLE))
+    arg_parser.add_argument(
+        'address',
+        help='The address to listen on, either HOST:PORT for a TCP socket '
+             '(use port 0 to pick a free one) or the path of a Unix socket.')
+    arg_parser.add_argument(
+        '--max-file-contents', type=int, default=FILE_CONTENTS_CACHE_SIZE,
+        help='The number of file contents to keep for further tasks. Use at '
+             'least the number of files analyzed, so they are only sent '
+             'once.')
+    args = arg_parser.parse_args(args)
+
+    authkey = os.environ.get(AUTHKEY_VARIABLE)
+    if not authkey:
+        print('The {} environment variable has to be set.'.format(
+            AUTHKEY_VARIABLE), file=sys.stderr)
+        return 255
+
+    with Listener(parse_address(args.address),
+                  authkey=authkey.encode()) as listener:
+        # Tell whoever started the worker where to find it.
+        print(format_address(listener.address), flush=True)
+        serve(listener, args.max_file_contents)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
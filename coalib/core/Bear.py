@@ -419,7 +419,7 @@ class Bear:
         """
         return partial(Result.from_values, self)
 
-    def execute_task(self, args, kwargs):
+    def execute_task(self, args, kwargs, result_writer=None):
         """
         Executes a task.
 
@@ -428,14 +428,36 @@ class Bear:
         This function has to return something that is picklable to make bears
         work in multi-process environments.
 
+        If a ``result_writer`` is given, the results are streamed to it while
+        ``analyze`` is still running instead:
+
+        >>> from coalib.core.ResultStream import ResultWriter
+        >>> from queue import Queue
+        >>> class SomeBear(Bear):
+        ...     def analyze(self, count):
+        ...         return range(count)
+        >>> writer = ResultWriter(Queue(), 'task', 2)
+        >>> SomeBear(Section(''), {}).execute_task((3,), {}, writer)
+        []
+        >>> writer.result_queue.get(), writer.buffer
+        (('task', [0, 1]), [2])
+
         :param args:
             The arguments of a task.
         :param kwargs:
             The keyword-arguments of a task.
+        :param result_writer:
+            A ``ResultWriter`` to write the results to.
         :return:
-            A list of results from the bear.
+            A list of results from the bear, or an empty list if the results
+            were written to the ``result_writer``.
         """
-        return list(self.analyze(*args, **kwargs))
+        if result_writer is None:
+            return list(self.analyze(*args, **kwargs))
+
+        for result in self.analyze(*args, **kwargs):
+            result_writer.write(result)
+        return []
 
     def analyze(self, *args, **kwargs):
         """
@@ -1,17 +1,30 @@
 import asyncio
 import concurrent.futures
 import functools
+import itertools
 import logging
+import multiprocessing
+import threading
+import uuid
 
 from coalib.core.DependencyTracker import DependencyTracker
 from coalib.core.Graphs import traverse_graph
+from coalib.core.RemoteExecutor import RemoteExecutor
+from coalib.core.ResultDispatcher import (
+    ResultDispatcher, call_result_callback)
+from coalib.core.ResultStream import ResultStream
+from coalib.core.TaskExecution import (
+    chunk_tasks, run_async_task, run_tasks)
+from coalib.core.TaskPriorities import TaskPriorities
 
 
 def group(iterable, key=lambda x: x):
     """
     Groups elements (out-of-order) together in the given iterable.
 
-    Supports non-hashable keys by comparing keys with ``==``.
+    Hashable keys are looked up in constant time. Non-hashable keys are
+    supported too by comparing them with ``==``, which takes linear time in the
+    number of groups.
 
     Accessing the groups is supported using the iterator as follows:
 
@@ -45,29 +58,81 @@ def group(iterable, key=lambda x: x):
     """
     keys = []
     elements = []
+    positions = {}
 
     for element in iterable:
         k = key(element)
 
         try:
-            position = keys.index(k)
-            element_list = elements[position]
-        except ValueError:
+            position = positions[k]
+        except KeyError:
+            position = None
+        except TypeError:
+            # Non-hashable key.
+            try:
+                position = keys.index(k)
+            except ValueError:
+                position = None
+
+        if position is None:
+            position = len(keys)
             keys.append(k)
-            element_list = []
-            elements.append(element_list)
+            elements.append([])
+            try:
+                positions[k] = position
+            except TypeError:
+                pass
 
-        element_list.append(element)
+        elements[position].append(element)
 
     return zip(keys, elements)
 
 
+def is_async_bear(bear):
+    """
+    Checks whether the ``analyze`` method of a bear is a coroutine, either
+    defined with ``async def`` or decorated with ``asyncio.coroutine``.
+
+    Tasks of such bears run directly on the event loop instead of the
+    executor, so many I/O-bound tasks (e.g. waiting on subprocesses created
+    with ``asyncio.create_subprocess_exec``) can run concurrently.
+
+    :param bear:
+        The bear instance.
+    :return:
+        True if ``analyze`` is a coroutine function.
+    """
+    return asyncio.iscoroutinefunction(bear.analyze)
+
+
+def get_grouping_key(bear):
+    """
+    Returns the key to group bears by that share the same section and
+    file-dictionary.
+
+    The key consists of the identities of both, so grouping never compares
+    (possibly huge) file-dictionaries by value. Bears only share a group if
+    they were given the very same section and file-dictionary objects.
+
+    :param bear:
+        The bear instance.
+    :return:
+        A hashable key.
+    """
+    return id(bear.section), id(bear.file_dict)
+
+
 def cleanup_bear(bear,
                  result_callback,
                  dependency_tracker,
                  running_tasks,
                  event_loop,
-                 executor):
+                 executor,
+                 tasks_per_chunk=1,
+                 cache_bears=False,
+                 result_stream=None,
+                 task_priorities=None,
+                 task_cache=None):
     """
     Cleans up state of an ongoing run for a bear.
 
@@ -90,6 +155,16 @@ def cleanup_bear(bear,
         The event-loop tasks are scheduled on.
     :param executor:
         The executor tasks are executed on.
+    :param tasks_per_chunk:
+        The number of tasks of a bear to execute together.
+    :param cache_bears:
+        Whether to cache bears in the workers of the executor.
+    :param result_stream:
+        The ``ResultStream`` to receive results of running tasks from.
+    :param task_priorities:
+        The ``TaskPriorities`` to prioritize tasks with.
+    :param task_cache:
+        The ``TaskCache`` to look up and store results of tasks in.
     """
     if not running_tasks[bear]:
         resolved_bears = dependency_tracker.resolve(bear)
@@ -97,7 +172,8 @@ def cleanup_bear(bear,
         if resolved_bears:
             schedule_bears(resolved_bears, result_callback,
                            dependency_tracker, event_loop, running_tasks,
-                           executor)
+                           executor, tasks_per_chunk, cache_bears,
+                           result_stream, task_priorities, task_cache)
 
         del running_tasks[bear]
 
@@ -121,7 +197,12 @@ def schedule_bears(bears,
                    dependency_tracker,
                    event_loop,
                    running_tasks,
-                   executor):
+                   executor,
+                   tasks_per_chunk=1,
+                   cache_bears=False,
+                   result_stream=None,
+                   task_priorities=None,
+                   task_cache=None):
     """
     Schedules the tasks of bears to the given executor and runs them on the
     given event loop.
@@ -140,7 +221,27 @@ def schedule_bears(bears,
         their scheduled tasks.
     :param executor:
         The executor to which the bear tasks are scheduled.
+    :param tasks_per_chunk:
+        The number of tasks of a bear to submit to the executor together.
+        Each submission transfers the bear, so bears with many small tasks
+        are transferred less often with bigger chunks.
+    :param cache_bears:
+        Whether to cache bears in the workers of the executor, so each bear is
+        transferred to each worker only once.
+    :param result_stream:
+        A ``ResultStream`` to receive results while tasks are running, or
+        ``None`` to receive them when a task completes.
+    :param task_priorities:
+        A ``TaskPriorities`` instance. If given, tasks of bears on the longest
+        remaining dependency chain are submitted first, and the durations of
+        all tasks are recorded.
+    :param task_cache:
+        A ``TaskCache`` instance. If given, tasks with cached results aren't
+        executed, and the results of executed tasks are cached.
     """
+    if task_priorities is not None:
+        bears = sorted(bears, key=task_priorities.get_priority, reverse=True)
+
     for bear in bears:
         if dependency_tracker.get_dependencies(bear):  # pragma: no cover
             logging.warning(
@@ -148,17 +249,61 @@ def schedule_bears(bears,
                 'should not happen, the dependency tracking system should be '
                 'smarter. Please report this to the developers.'.format(bear))
         else:
-            tasks = {
-                event_loop.run_in_executor(
-                    executor, bear.execute_task, bear_args, bear_kwargs)
-                for bear_args, bear_kwargs in bear.generate_tasks()}
+            bear_tasks = bear.generate_tasks()
+            task_keys = itertools.repeat(None)
+            tasks = set()
+            if task_cache is not None:
+                bear_tasks, task_keys, tasks = lookup_cached_tasks(
+                    bear, bear_tasks, task_cache, event_loop)
+
+            if is_async_bear(bear) or (
+                    tasks_per_chunk == 1 and not cache_bears and
+                    result_stream is None and task_priorities is None):
+                for (bear_args, bear_kwargs), task_key in zip(bear_tasks,
+                                                              task_keys):
+                    if is_async_bear(bear):
+                        # Runs directly on the event loop, not occupying the
+                        # executor.
+                        task = event_loop.create_task(run_async_task(
+                            bear, bear_args, bear_kwargs))
+                    else:
+                        task = event_loop.run_in_executor(
+                            executor, bear.execute_task, bear_args,
+                            bear_kwargs)
+                    if task_key is not None:
+                        task.add_done_callback(functools.partial(
+                            store_task_results, task_cache, task_key))
+                    tasks.add(task)
+            else:
+                # The first chunk carries the bear, other chunks only ask for
+                # it from workers that didn't cache it yet.
+                key = uuid.uuid4().hex if cache_bears else None
+                for index, chunk in enumerate(
+                        chunk_tasks(zip(bear_tasks, task_keys),
+                                    tasks_per_chunk)):
+                    chunk_tasks_, chunk_keys = zip(*chunk)
+                    tasks.add(event_loop.create_task(
+                        run_tasks(bear, key, chunk_tasks_, event_loop,
+                                  executor,
+                                  send_bear=index == 0,
+                                  result_stream=result_stream,
+                                  handle_results=functools.partial(
+                                      handle_results, bear, result_callback,
+                                      dependency_tracker),
+                                  task_priorities=task_priorities,
+                                  store_results=functools.partial(
+                                      store_chunk_results, task_cache,
+                                      chunk_keys))))
 
             running_tasks[bear] = tasks
 
             for task in tasks:
                 task.add_done_callback(functools.partial(
                     finish_task, bear, result_callback, dependency_tracker,
-                    running_tasks, event_loop, executor))
+                    running_tasks, event_loop, executor,
+                    tasks_per_chunk=tasks_per_chunk, cache_bears=cache_bears,
+                    result_stream=result_stream,
+                    task_priorities=task_priorities, task_cache=task_cache))
 
             logging.debug('Scheduled {!r} (tasks: {})'.format(bear,
                                                               len(tasks)))
@@ -168,7 +313,79 @@ def schedule_bears(bears,
                 # process, as when no tasks were offloaded the event-loop could
                 # hang up otherwise.
                 cleanup_bear(bear, result_callback, dependency_tracker,
-                             running_tasks, event_loop, executor)
+                             running_tasks, event_loop, executor,
+                             tasks_per_chunk, cache_bears, result_stream,
+                             task_priorities, task_cache)
+
+
+def lookup_cached_tasks(bear, tasks, task_cache, event_loop):
+    """
+    Looks up the tasks of a bear in the cache.
+
+    :param bear:
+        The bear the tasks belong to.
+    :param tasks:
+        An iterable of ``(args, kwargs)`` tuples.
+    :param task_cache:
+        The ``TaskCache`` to look up the tasks in.
+    :param event_loop:
+        The event loop to create the futures of cached tasks on.
+    :return:
+        A tuple with a list of the tasks not in the cache, a list of their
+        fingerprints, and a set of completed futures holding the results of
+        the cached tasks.
+    """
+    uncached_tasks = []
+    task_keys = []
+    cached_tasks = set()
+
+    for bear_args, bear_kwargs in tasks:
+        task_key = task_cache.get_key(bear, bear_args, bear_kwargs)
+        results = None if task_key is None else task_cache.get(task_key)
+        if results is None:
+            uncached_tasks.append((bear_args, bear_kwargs))
+            task_keys.append(task_key)
+        else:
+            cached_task = asyncio.Future(loop=event_loop)
+            cached_task.set_result(results)
+            cached_tasks.add(cached_task)
+
+    logging.debug('Found {} cached tasks for {!r}.'.format(len(cached_tasks),
+                                                           bear))
+
+    return uncached_tasks, task_keys, cached_tasks
+
+
+def store_task_results(task_cache, task_key, task):
+    """
+    Caches the results of a task if it succeeded.
+
+    :param task_cache:
+        The ``TaskCache`` to store the results in.
+    :param task_key:
+        The fingerprint of the task.
+    :param task:
+        The completed task.
+    """
+    if not task.cancelled() and task.exception() is None:
+        task_cache.set(task_key, task.result())
+
+
+def store_chunk_results(task_cache, task_keys, results):
+    """
+    Caches the results of a chunk of tasks.
+
+    :param task_cache:
+        The ``TaskCache`` to store the results in.
+    :param task_keys:
+        The fingerprints of the tasks, ``None`` for tasks which can't be
+        cached.
+    :param results:
+        A list holding the list of results of each task.
+    """
+    for task_key, task_results in zip(task_keys, results):
+        if task_key is not None:
+            task_cache.set(task_key, task_results)
 
 
 def finish_task(bear,
@@ -177,7 +394,12 @@ def finish_task(bear,
                 running_tasks,
                 event_loop,
                 executor,
-                task):
+                task,
+                tasks_per_chunk=1,
+                cache_bears=False,
+                result_stream=None,
+                task_priorities=None,
+                task_cache=None):
     """
     The callback for when a task of a bear completes. It is responsible for
     checking if the bear completed its execution and the handling of the
@@ -187,7 +409,8 @@ def finish_task(bear,
     :param bear:
         The bear that the task belongs to.
     :param result_callback:
-        A callback function which is called when results are available.
+        A callback function which is called when results are available, or a
+        ``ResultDispatcher`` the results are dispatched to.
     :param dependency_tracker:
         The object that keeps track of dependencies.
     :param running_tasks:
@@ -198,6 +421,16 @@ def finish_task(bear,
         The executor to which the bear tasks are scheduled.
     :param task:
         The task that completed.
+    :param tasks_per_chunk:
+        The number of tasks of a bear to execute together.
+    :param cache_bears:
+        Whether to cache bears in the workers of the executor.
+    :param result_stream:
+        The ``ResultStream`` to receive results of running tasks from.
+    :param task_priorities:
+        The ``TaskPriorities`` to prioritize tasks with.
+    :param task_cache:
+        The ``TaskCache`` to look up and store results of tasks in.
     """
     try:
         results = task.result()
@@ -221,23 +454,50 @@ def finish_task(bear,
     finally:
         running_tasks[bear].remove(task)
         cleanup_bear(bear, result_callback, dependency_tracker, running_tasks,
-                     event_loop, executor)
+                     event_loop, executor, tasks_per_chunk, cache_bears,
+                     result_stream, task_priorities, task_cache)
 
     if results is not None:
-        for result in results:
-            try:
-                # FIXME Long operations on the result-callback could block the
-                # FIXME   scheduler significantly. It should be possible to
-                # FIXME   schedule new Python Threads on the given event_loop
-                # FIXME   and process the callback there.
-                result_callback(result)
-            except Exception as ex:
-                # FIXME Try to display only the relevant traceback of the
-                # FIXME result handler if error occurred there, not the
-                # FIXME complete event-loop traceback.
-                logging.error(
-                    'An exception was thrown during result-handling.',
-                    exc_info=ex)
+        dispatch_results(result_callback, results)
+
+
+def handle_results(bear, result_callback, dependency_tracker, results):
+    """
+    Handles results of a bear received while its tasks are still running.
+
+    The results are passed to the bears depending on it and to the
+    result-callback.
+
+    :param bear:
+        The bear that produced the results.
+    :param result_callback:
+        A callback function which is called when results are available, or a
+        ``ResultDispatcher`` the results are dispatched to.
+    :param dependency_tracker:
+        The object that keeps track of dependencies.
+    :param results:
+        A list of results.
+    """
+    for dependant in dependency_tracker.get_dependants(bear):
+        dependant.dependency_results[type(bear)] += results
+
+    dispatch_results(result_callback, results)
+
+
+def dispatch_results(result_callback, results):
+    """
+    Passes results to the result-callback.
+
+    :param result_callback:
+        A callback function which is called when results are available, or a
+        ``ResultDispatcher`` the results are dispatched to.
+    :param results:
+        A list of results.
+    """
+    if isinstance(result_callback, ResultDispatcher):
+        result_callback.dispatch(results)
+    else:
+        call_result_callback(result_callback, results)
 
 
 def initialize_dependencies(bears):
@@ -286,10 +546,12 @@ def initialize_dependencies(bears):
 
     # Group bears by sections and file-dictionaries. These will serve as
     # entry-points for the dependency-instantiation-graph.
-    grouping = group(bears, key=lambda bear: (bear.section, bear.file_dict))
-    for (section, file_dict), bears_per_section in grouping:
+    grouping = group(bears, key=get_grouping_key)
+    for key, bears_per_section in grouping:
         # Pre-collect bears as the iterator only works once.
         bears_per_section = list(bears_per_section)
+        section = bears_per_section[0].section
+        file_dict = bears_per_section[0].file_dict
 
         # Now traverse each edge of the graph, and instantiate a new dependency
         # bear if not already instantiated. For the entry point bears, we hack
@@ -327,10 +589,33 @@ def initialize_dependencies(bears):
     return dependency_tracker, bears
 
 
-def run(bears, result_callback):
+def run(bears,
+        result_callback,
+        executor=None,
+        event_loop=None,
+        threaded_result_callback=False,
+        tasks_per_chunk=1,
+        cache_bears=False,
+        results_per_chunk=0,
+        task_durations=None,
+        task_cache=None,
+        max_workers=None):
     """
     Runs a coala session.
 
+    The results of a task are passed to the ``result_callback`` in the order
+    the task returned them, and tasks are handled in the order they finish.
+    So the results of a bear with multiple tasks may interleave with the
+    results of other bears, but all results of a bear are handled before any
+    result of the bears depending on it.
+
+    Bears whose ``analyze`` is a coroutine (see ``is_async_bear``) run their
+    tasks directly on the event loop instead of the executor, and must return
+    an iterable of results. Other options concerning the executor don't apply
+    to them. On Unix, a child watcher is attached to the event loop during the
+    run if ``run`` is called from the main thread, so they can use
+    ``asyncio.create_subprocess_exec``.
+
     :param bears:
         The bear instances to run.
     :param result_callback:
@@ -339,22 +624,121 @@ def run(bears, result_callback):
 
             def result_callback(result):
                 pass
+    :param executor:
+        The executor to run the tasks of the bears on, for example a
+        ``concurrent.futures.ThreadPoolExecutor`` for bears mostly waiting on
+        subprocesses, or a ``concurrent.futures.ProcessPoolExecutor`` with a
+        limited number of workers, or a ``RemoteExecutor`` for workers on
+        other machines. It is not shut down after the run, so it can be
+        reused for further runs. Defaults to a new ``ProcessPoolExecutor``
+        using all cores, which is shut down afterwards.
+    :param event_loop:
+        The ``asyncio`` event loop to schedule the tasks on. It must not be
+        running already, as ``run`` runs it until all tasks are done. It is not
+        closed after the run. Defaults to a new ``SelectorEventLoop``, which
+        is closed afterwards.
+    :param threaded_result_callback:
+        Whether to invoke the ``result_callback`` on a dedicated thread instead
+        of the event loop, so long running callbacks don't delay scheduling
+        the bears depending on a finished bear. The ordering guarantees above
+        still hold, and ``run`` returns only after all results were handled.
+        Results waiting for the callback are queued without a bound, so a
+        callback slower than the bears keeps them in memory.
+    :param tasks_per_chunk:
+        The number of tasks of a bear to submit to the executor in one call.
+        Bigger chunks reduce the overhead of bears with many small tasks, as
+        the bear with its file-dictionary is pickled once per call. If a task
+        of a chunk fails, the results of the whole chunk are lost.
+    :param cache_bears:
+        Whether to cache bears in the workers of the executor, so a bear with
+        its file-dictionary is sent to each worker only once instead of with
+        each call. Workers keep a limited number of bears.
+    :param results_per_chunk:
+        If not ``0``, results are streamed from running tasks in chunks of
+        this size, so they are handled (and passed to dependant bears) while
+        the bears are still analyzing, instead of all at once when a task
+        completes. Results streamed before a task fails are still handled.
+        Not supported with a ``RemoteExecutor``, as its workers can't reach
+        the queue the results are streamed through.
+    :param task_durations:
+        A ``TaskDurations`` instance holding how long bears took in past runs.
+        If given, ready bears on the longest remaining dependency chain are
+        submitted first, so slow dependencies don't wait behind cheap
+        independent bears. The durations measured in this run are merged into
+        it afterwards, so it can be persisted for the next run.
+    :param task_cache:
+        A ``TaskCache`` instance. If given, tasks that ran before with the
+        same inputs aren't executed, but their cached results are used as if
+        they were. New results are added to it. It's not saved by ``run``.
+    :param max_workers:
+        The number of tasks the executor runs at the same time. It's used for
+        the default executor and to decide how many tasks are submitted at
+        once with ``task_durations``. Defaults to the number of processors.
     """
-    # FIXME Allow to pass different executors nicely, for example to execute
-    # FIXME   coala with less cores, or to schedule jobs on distributed systems
-    # FIXME   (for example Mesos).
+    if results_per_chunk and isinstance(executor, RemoteExecutor):
+        raise ValueError('results_per_chunk is not supported with a '
+                         'RemoteExecutor.')
 
-    # Set up event loop and executor.
-    event_loop = asyncio.SelectorEventLoop()
-    executor = concurrent.futures.ProcessPoolExecutor()
+    if max_workers is None:
+        max_workers = multiprocessing.cpu_count()
 
-    # Initialize dependency tracking.
-    dependency_tracker, bears_to_schedule = initialize_dependencies(bears)
+    owns_event_loop = event_loop is None
+    if owns_event_loop:
+        event_loop = asyncio.SelectorEventLoop()
 
-    # Let's go.
-    schedule_bears(bears_to_schedule, result_callback, dependency_tracker,
-                   event_loop, {}, executor)
+    owns_executor = executor is None
+    if owns_executor:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers)
+
+    dispatcher = None
+    if threaded_result_callback:
+        dispatcher = ResultDispatcher(result_callback)
+        dispatcher.start()
+        result_callback = dispatcher
+
+    result_stream = None
+    if results_per_chunk:
+        result_stream = ResultStream(event_loop, executor, results_per_chunk)
+
+    previous_child_watcher = None
     try:
+        # Initialize dependency tracking.
+        dependency_tracker, bears_to_schedule = initialize_dependencies(bears)
+
+        all_bears = (bears_to_schedule | dependency_tracker.dependants |
+                     dependency_tracker.dependencies)
+        if (hasattr(asyncio, 'SafeChildWatcher') and
+                threading.current_thread() is threading.main_thread() and
+                any(is_async_bear(bear) for bear in all_bears)):
+            # Asynchronous bears may start subprocesses, which requires a
+            # child watcher attached to the event loop.
+            previous_child_watcher = asyncio.get_child_watcher()
+            child_watcher = asyncio.SafeChildWatcher()
+            child_watcher.attach_loop(event_loop)
+            asyncio.set_child_watcher(child_watcher)
+
+        task_priorities = None
+        if task_durations is not None:
+            task_priorities = TaskPriorities(
+                task_durations, dependency_tracker, event_loop, max_workers)
+
+        # Let's go.
+        schedule_bears(bears_to_schedule, result_callback, dependency_tracker,
+                       event_loop, {}, executor, tasks_per_chunk, cache_bears,
+                       result_stream, task_priorities, task_cache)
         event_loop.run_forever()
+
+        if task_durations is not None:
+            task_durations.commit()
     finally:
-        event_loop.close()
+        if previous_child_watcher is not None:
+            asyncio.get_child_watcher().close()
+            asyncio.set_child_watcher(previous_child_watcher)
+        if result_stream is not None:
+            result_stream.close()
+        if dispatcher is not None:
+            dispatcher.stop()
+        if owns_executor:
+            executor.shutdown()
+        if owns_event_loop:
+            event_loop.close()
@@ -1,5 +1,3 @@
-from itertools import chain
-
 from coalib.core.Graphs import traverse_graph
 
 
@@ -44,10 +42,18 @@ class DependencyTracker:
     resolving dependencies in the right order. Dependencies which are itself
     dependent will be forcefully resolved and removed from their according
     dependencies too.
+
+    Relations are indexed in both directions, so adding, resolving and
+    looking up relations takes constant time per relation involved,
+    independent of the total number of tracked objects.
     """
 
     def __init__(self):
+        # Maps dependencies to the set of their dependants.
         self._dependency_dict = {}
+        # Maps dependants to the set of their dependencies. The size of a set
+        # is the number of unresolved dependencies of the dependant.
+        self._dependant_dict = {}
 
     def get_dependants(self, dependency):
         """
@@ -94,10 +100,10 @@ class DependencyTracker:
         :return:
             A set of dependencies.
         """
-        return set(
-            dependency
-            for dependency, dependants in self._dependency_dict.items()
-            if dependant in dependants)
+        try:
+            return set(self._dependant_dict[dependant])
+        except KeyError:
+            return set()
 
     def get_all_dependants(self, dependency):
         """
@@ -150,10 +156,7 @@ class DependencyTracker:
 
         traverse_graph(
             [dependant],
-            lambda node:
-                {dependency
-                 for dependency, dependants in self._dependency_dict.items()
-                 if node in dependants},
+            lambda node: self._dependant_dict.get(node, frozenset()),
             append_to_dependencies)
 
         return dependencies
@@ -170,7 +173,7 @@ class DependencyTracker:
         >>> tracker.dependants
         {1, 2, 3}
         """
-        return set(chain.from_iterable(self._dependency_dict.values()))
+        return set(self._dependant_dict.keys())
 
     @property
     def dependencies(self):
@@ -224,7 +227,11 @@ class DependencyTracker:
         if dependency not in self._dependency_dict:
             self._dependency_dict[dependency] = set()
 
+        if dependant not in self._dependant_dict:
+            self._dependant_dict[dependant] = set()
+
         self._dependency_dict[dependency].add(dependant)
+        self._dependant_dict[dependant].add(dependency)
 
     def resolve(self, dependency):
         """
@@ -251,35 +258,28 @@ class DependencyTracker:
         # Check if dependency has itself dependencies which aren't resolved,
         # these need to be removed too. This operation does not free any
         # dependencies.
-        dependencies_to_remove = []
-        for tracked_dependency, dependants in self._dependency_dict.items():
-            if dependency in dependants:
-                dependants.remove(dependency)
-
-                # If dependants set is now empty, schedule dependency for
-                # removal from dependency_dict.
-                if not dependants:
-                    dependencies_to_remove.append(tracked_dependency)
+        for tracked_dependency in self._dependant_dict.pop(dependency, ()):
+            dependants = self._dependency_dict[tracked_dependency]
+            dependants.remove(dependency)
 
-        for tracked_dependency in dependencies_to_remove:
-            del self._dependency_dict[tracked_dependency]
+            # If dependants set is now empty, remove dependency from
+            # dependency_dict.
+            if not dependants:
+                del self._dependency_dict[tracked_dependency]
 
         # Now free dependants which do depend on the given dependency.
-        possible_freed_dependants = self._dependency_dict.pop(
-            dependency, set())
-        non_free_dependants = set()
+        freed_dependants = set()
+        for dependant in self._dependency_dict.pop(dependency, ()):
+            dependencies = self._dependant_dict[dependant]
+            dependencies.remove(dependency)
 
-        for possible_freed_dependant in possible_freed_dependants:
-            # Check if all dependencies of dependants from above are satisfied.
-            # If so, there are no more dependencies for dependant. Thus it's
+            # If all dependencies of the dependant are satisfied, it's
             # resolved.
-            for dependants in self._dependency_dict.values():
-                if possible_freed_dependant in dependants:
-                    non_free_dependants.add(possible_freed_dependant)
-                    break
+            if not dependencies:
+                del self._dependant_dict[dependant]
+                freed_dependants.add(dependant)
 
-        # Remaining dependents are officially resolved.
-        return possible_freed_dependants - non_free_dependants
+        return freed_dependants
 
     def check_circular_dependencies(self):
         """
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+import hashlib
+import pickle
+import threading
+
+
+class FileContents:
+    """
+    Identifies the contents of files in file-dictionaries by the hash of their
+    pickled contents.
+
+    >>> file_contents = FileContents()
+    >>> content = ('line\\n',)
+    >>> file_contents.add_file_dict({'a': content, 'b': content})
+    >>> len(file_contents.get_digest(content))
+    64
+    >>> file_contents.get_digest(('line\\n',)) is None
+    True
+
+    File-dictionaries and their contents are registered by their identity, so
+    file-dictionaries must not be modified while they're registered. Contents
+    are only hashed when their hash is requested.
+    """
+
+    def __init__(self, max_size=None, max_file_dicts=None):
+        """
+        :param max_size:
+            The number of hashes of contents to keep. Beyond that, the least
+            recently used ones are dropped and computed again when needed. At
+            least the contents of the largest registered file-dictionary are
+            kept. ``None`` for no limit.
+        :param max_file_dicts:
+            The number of file-dictionaries to keep registered. Beyond that,
+            the least recently registered ones are dropped. ``None`` for no
+            limit.
+        """
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.max_file_dicts = max_file_dicts
+        # Maps the ids of registered file-dictionaries to them.
+        self.file_dicts = OrderedDict()
+        # Maps the ids of the contents of registered file-dictionaries to the
+        # contents and the number of file-dictionaries containing them.
+        self.contents = {}
+        # Maps the ids of hashed contents to the contents and their hashes.
+        # The contents are kept, so their ids aren't reused.
+        self.digests = OrderedDict()
+
+    def add_file_dict(self, file_dict):
+        """
+        Registers all file contents of a file-dictionary. Registering it
+        again is cheap, its contents are only walked the first time.
+
+        :param file_dict:
+            The file-dictionary.
+        """
+        with self.lock:
+            if id(file_dict) in self.file_dicts:
+                self.file_dicts.move_to_end(id(file_dict))
+                return
+
+            # Keep the file-dictionary, so its id isn't reused.
+            self.file_dicts[id(file_dict)] = file_dict
+            for content in file_dict.values():
+                _, count = self.contents.get(id(content), (content, 0))
+                self.contents[id(content)] = content, count + 1
+
+            if self.max_file_dicts is not None:
+                while len(self.file_dicts) > self.max_file_dicts:
+                    self._remove_file_dict(self.file_dicts.popitem(
+                        last=False)[1])
+
+    def _remove_file_dict(self, file_dict):
+        for content in file_dict.values():
+            _, count = self.contents[id(content)]
+            if count == 1:
+                del self.contents[id(content)]
+            else:
+                self.contents[id(content)] = content, count - 1
+
+    def get_digest(self, obj):
+        """
+        :param obj:
+            Any object.
+        :return:
+            The hash of the given object if it's registered file content,
+            ``None`` otherwise.
+        """
+        with self.lock:
+            if id(obj) in self.digests:
+                self.digests.move_to_end(id(obj))
+                return self.digests[id(obj)][1]
+
+            if id(obj) not in self.contents:
+                return None
+
+            digest = hashlib.sha256(pickle.dumps(
+                obj, pickle.HIGHEST_PROTOCOL)).hexdigest()
+            self.digests[id(obj)] = obj, digest
+
+            if self.max_size is not None:
+                max_size = max([self.max_size] +
+                               [len(file_dict)
+                                for file_dict in self.file_dicts.values()])
+                while len(self.digests) > max_size:
+                    self.digests.popitem(last=False)
+
+            return digest
@@ -0,0 +1,453 @@
+import binascii
+from collections import ChainMap, OrderedDict
+import concurrent.futures
+import io
+import logging
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+
+from coalib.core.Bear import Bear
+from coalib.core.FileContents import FileContents
+
+# The environment variable the authentication key of workers is passed in.
+AUTHKEY_VARIABLE = 'COALA_WORKER_AUTHKEY'
+
+# The default number of file contents a worker keeps, and an executor
+# remembers a worker to have.
+FILE_CONTENTS_CACHE_SIZE = 4096
+
+# The number of file-dictionaries an executor keeps the contents of
+# registered.
+FILE_DICTS_CACHE_SIZE = 16
+
+
+def parse_address(address):
+    """
+    Parses the address of a worker.
+
+    >>> parse_address('localhost:4000')
+    ('localhost', 4000)
+    >>> parse_address('/tmp/coala-worker.socket')
+    '/tmp/coala-worker.socket'
+
+    :param address:
+        Either ``host:port`` for a TCP socket, or the path of a Unix socket.
+    :return:
+        A tuple ``(host, port)`` or the path.
+    """
+    host, separator, port = address.rpartition(':')
+    if separator and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def format_address(address):
+    """
+    Formats the address of a worker, the inverse of ``parse_address``.
+
+    >>> format_address(('localhost', 4000))
+    'localhost:4000'
+
+    :param address:
+        A tuple ``(host, port)`` or the path of a Unix socket.
+    :return:
+        The address as a string.
+    """
+    if isinstance(address, tuple):
+        return '{}:{}'.format(*address)
+    return address
+
+
+class BoundedDict:
+    """
+    A thread-safe dict dropping the least recently used items beyond a
+    maximum size.
+
+    >>> bounded_dict = BoundedDict(2)
+    >>> bounded_dict['a'] = 1
+    >>> bounded_dict['b'] = 2
+    >>> bounded_dict['a']
+    1
+    >>> bounded_dict['c'] = 3
+    >>> 'b' in bounded_dict
+    False
+    >>> len(bounded_dict)
+    2
+    """
+
+    def __init__(self, max_size):
+        """
+        :param max_size:
+            The number of items to keep.
+        """
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.items = OrderedDict()
+
+    def __getitem__(self, key):
+        with self.lock:
+            value = self.items[key]
+            self.items.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+
+class CallPickler(pickle.Pickler):
+    """
+    Pickles a call to send to a worker. Contents of files in the
+    file-dictionaries of bears are replaced with their hash. Only the
+    contents that are pickled are hashed.
+    """
+
+    def __init__(self, file, file_contents):
+        """
+        :param file:
+            The file to write the pickle to.
+        :param file_contents:
+            The ``FileContents`` registering the contents of files.
+        """
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.file_contents = file_contents
+        # Maps the hashes of the file contents in the call to the contents, so
+        # they can still be sent after ``file_contents`` dropped them.
+        self.digests = {}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Bear):
+            # Called before the attributes of the bear are pickled. Only
+            # walks the file-dictionary the first time.
+            self.file_contents.add_file_dict(obj.file_dict)
+            return None
+
+        digest = self.file_contents.get_digest(obj)
+        if digest is not None:
+            self.digests[digest] = obj
+        return digest
+
+
+class CallUnpickler(pickle.Unpickler):
+    """
+    Unpickles a call received from a ``RemoteExecutor``, filling in file
+    contents the worker received before. The hashes of contents the worker
+    doesn't have (anymore) are collected in ``missing_digests``, the ones it
+    has in ``loaded_contents``.
+    """
+
+    def __init__(self, file, file_contents):
+        """
+        :param file:
+            The file to read the pickle from.
+        :param file_contents:
+            A dict mapping hashes to file contents.
+        """
+        pickle.Unpickler.__init__(self, file)
+        self.file_contents = file_contents
+        self.loaded_contents = {}
+        self.missing_digests = set()
+
+    def persistent_load(self, digest):
+        try:
+            self.loaded_contents[digest] = self.file_contents[digest]
+            return self.loaded_contents[digest]
+        except KeyError:
+            self.missing_digests.add(digest)
+            return None
+
+
+def handle_connection(connection, file_contents):
+    """
+    Executes calls received over a connection from a ``RemoteExecutor`` and
+    sends back their results, until the connection is closed.
+
+    If a call refers to file contents the worker doesn't have, e.g. because
+    they were dropped from ``file_contents``, their hashes are sent back
+    instead of a result.
+
+    :param connection:
+        The ``multiprocessing.connection.Connection`` to the executor.
+    :param file_contents:
+        A ``BoundedDict`` mapping hashes to file contents received before.
+        It's shared by all connections of the worker.
+    """
+    # The contents received for the next call, which are kept for it even if
+    # they are pushed out of ``file_contents`` meanwhile.
+    received = {}
+    with connection:
+        while True:
+            try:
+                kind, payload = connection.recv()
+            except (EOFError, OSError):
+                return
+
+            if kind == 'files':
+                for digest, content in payload.items():
+                    received[digest] = pickle.loads(content)
+                    file_contents[digest] = received[digest]
+            else:
+                unpickler = CallUnpickler(
+                    io.BytesIO(payload), ChainMap(received, file_contents))
+                try:
+                    function, args, kwargs = unpickler.load()
+                    if not unpickler.missing_digests:
+                        reply = 'result', function(*args, **kwargs)
+                except BaseException as ex:
+                    reply = 'error', ex
+                if unpickler.missing_digests:
+                    # Checked even if unpickling failed, which the
+                    # placeholders of missing contents may cause. The
+                    # contents the call needs are kept until the missing ones
+                    # arrive.
+                    reply = 'missing', unpickler.missing_digests
+                    received.update(unpickler.loaded_contents)
+                else:
+                    received = {}
+
+                try:
+                    connection.send(reply)
+                except (pickle.PicklingError, AttributeError, TypeError) as ex:
+                    connection.send(('error', RuntimeError(
+                        'Unable to send back the result: {!r}'.format(ex))))
+
+
+def serve(listener, max_file_contents=FILE_CONTENTS_CACHE_SIZE):
+    """
+    Accepts connections from ``RemoteExecutor`` instances and executes their
+    calls, each connection on its own thread.
+
+    :param listener:
+        The ``multiprocessing.connection.Listener`` to accept connections on.
+    :param max_file_contents:
+        The number of file contents to keep for further calls. The contents
+        of the call being executed are kept regardless.
+    """
+    file_contents = BoundedDict(max_file_contents)
+    while True:
+        try:
+            connection = listener.accept()
+        except (OSError, EOFError, AuthenticationError) as ex:
+            logging.warning('Refused a connection: {}'.format(ex))
+            continue
+
+        threading.Thread(target=handle_connection,
+                         args=(connection, file_contents),
+                         daemon=True).start()
+
+
+class RemoteExecutor(concurrent.futures.Executor):
+    """
+    An executor running calls on worker processes reachable over TCP or Unix
+    sockets, started with the ``coala-worker`` command. All workers need to be
+    able to import the bears that are run.
+
+    Calls are pickled, so only connect to workers you trust and use a secret
+    authentication key. Contents of files in the file-dictionaries of bears
+    are sent by their hash, and the contents themselves only to workers that
+    didn't receive them yet. Both sides keep a limited number of file
+    contents, contents a worker dropped are sent again when needed. Start
+    workers with a ``--max-file-contents`` of at least the number of files
+    analyzed, so they keep all of them.
+
+    Each worker runs one call at a time. Calls are handed to the next free
+    worker.
+    """
+
+    def __init__(self, addresses, authkey, processes=(),
+                 max_file_contents=FILE_CONTENTS_CACHE_SIZE):
+        """
+        :param addresses:
+            The addresses of the workers, as tuples ``(host, port)`` or paths
+            of Unix sockets.
+        :param authkey:
+            The authentication key the workers were started with, as bytes.
+        :param processes:
+            Worker processes to terminate on shutdown.
+        :param max_file_contents:
+            The number of file contents to remember each worker to have, and
+            to keep the hashes of. At least the contents of the largest call
+            are remembered.
+        """
+        self.processes = list(processes)
+        self.max_file_contents = max_file_contents
+        self.file_contents = FileContents(max_file_contents,
+                                          FILE_DICTS_CACHE_SIZE)
+        self.calls = queue.Queue()
+        self.lock = threading.Lock()
+        self.shutting_down = False
+
+        self.connections = [Client(address, authkey=authkey)
+                            for address in addresses]
+
+        self.threads = [threading.Thread(target=self._run,
+                                         args=(connection,),
+                                         daemon=True)
+                        for connection in self.connections]
+        self.alive_threads = len(self.threads)
+        for thread in self.threads:
+            thread.start()
+
+    @classmethod
+    def start_local(cls, worker_count,
+                    max_file_contents=FILE_CONTENTS_CACHE_SIZE):
+        """
+        Starts workers on this machine listening on local TCP ports, e.g. to
+        test distributed setups.
+
+        :param worker_count:
+            The number of worker processes to start.
+        :param max_file_contents:
+            The number of file contents the workers keep.
+        :return:
+            A ``RemoteExecutor`` using these workers, which terminates them on
+            shutdown.
+        """
+        authkey = binascii.hexlify(os.urandom(16)).decode()
+        env = dict(os.environ)
+        env[AUTHKEY_VARIABLE] = authkey
+        # Let the workers import everything this process can import.
+        env['PYTHONPATH'] = os.pathsep.join(path for path in sys.path if path)
+
+        processes = []
+        addresses = []
+        try:
+            for _ in range(worker_count):
+                process = subprocess.Popen(
+                    [sys.executable, '-m', 'coalib.coala_worker',
+                     '--max-file-contents', str(max_file_contents),
+                     '127.0.0.1:0'],
+                    env=env,
+                    stdout=subprocess.PIPE,
+                    universal_newlines=True)
+                processes.append(process)
+                addresses.append(parse_address(
+                    process.stdout.readline().strip()))
+
+            return cls(addresses, authkey.encode(), processes,
+                       max_file_contents)
+        except BaseException:
+            for process in processes:
+                process.kill()
+                process.wait()
+                process.stdout.close()
+            raise
+
+    def submit(self, fn, *args, **kwargs):
+        with self.lock:
+            if self.shutting_down:
+                raise RuntimeError('Cannot schedule new calls after shutdown.')
+
+            future = concurrent.futures.Future()
+            if not self.alive_threads:
+                future.set_exception(ConnectionError(
+                    'The connections to all workers were lost.'))
+                return future
+
+            self.calls.put((future, fn, args, kwargs))
+            return future
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            self.shutting_down = True
+        for _ in self.threads:
+            self.calls.put(None)
+
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+            for process in self.processes:
+                process.terminate()
+                process.wait()
+                process.stdout.close()
+
+    def _run(self, connection):
+        known_digests = BoundedDict(self.max_file_contents)
+
+        while True:
+            call = self.calls.get()
+            if call is None:
+                break
+
+            future, fn, args, kwargs = call
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                output = io.BytesIO()
+                pickler = CallPickler(output, self.file_contents)
+                pickler.dump((fn, args, kwargs))
+            except BaseException as ex:
+                future.set_exception(ex)
+                continue
+
+            try:
+                missing_digests = {digest for digest in pickler.digests
+                                   if digest not in known_digests}
+                while True:
+                    if missing_digests:
+                        connection.send(('files', {
+                            digest: pickle.dumps(pickler.digests[digest],
+                                                 pickle.HIGHEST_PROTOCOL)
+                            for digest in missing_digests}))
+
+                    connection.send(('call', output.getvalue()))
+                    kind, value = connection.recv()
+                    if kind != 'missing':
+                        break
+
+                    # The worker dropped them meanwhile.
+                    missing_digests = value
+
+                # The worker used all of them, so it keeps them the longest.
+                known_digests.max_size = max(known_digests.max_size,
+                                             len(pickler.digests))
+                for digest in pickler.digests:
+                    known_digests[digest] = True
+            except (EOFError, OSError) as ex:
+                future.set_exception(ConnectionError(
+                    'The connection to a worker was lost: {}'.format(ex)))
+                self._connection_lost()
+                break
+
+            if kind == 'result':
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+        connection.close()
+
+    def _connection_lost(self):
+        with self.lock:
+            self.alive_threads -= 1
+            if self.alive_threads:
+                return
+
+            # Nobody is left to execute queued calls.
+            while True:
+                try:
+                    call = self.calls.get_nowait()
+                except queue.Empty:
+                    break
+
+                if call is not None:
+                    call[0].set_exception(ConnectionError(
+                        'The connections to all workers were lost.'))
@@ -0,0 +1,86 @@
+import logging
+import queue
+import threading
+
+
+def call_result_callback(result_callback, results):
+    """
+    Invokes the given result-callback for each result and logs exceptions
+    raised by it, so one failing result doesn't prevent the others from being
+    handled.
+
+    :param result_callback:
+        The callback to invoke.
+    :param results:
+        An iterable of results to pass to the callback.
+    """
+    for result in results:
+        try:
+            result_callback(result)
+        except Exception as ex:
+            # FIXME Try to display only the relevant traceback of the result
+            # FIXME handler if error occurred there, not the complete
+            # FIXME traceback.
+            logging.error('An exception was thrown during result-handling.',
+                          exc_info=ex)
+
+
+class ResultDispatcher:
+    """
+    Invokes a result-callback on a dedicated thread, so long running
+    callbacks (writing to a database, formatting diffs, ...) don't stall the
+    event loop scheduling tasks.
+
+    Results are dispatched in batches (usually all results of a task) through
+    a FIFO queue and handled in the order they were dispatched. The queue is
+    unbounded, so dispatching never blocks the event loop. Results of a slow
+    callback pile up in memory until it catches up:
+
+    >>> handled = []
+    >>> dispatcher = ResultDispatcher(handled.append)
+    >>> dispatcher.start()
+    >>> dispatcher.dispatch([1, 2])
+    >>> dispatcher.dispatch([3])
+    >>> dispatcher.stop()
+    >>> handled
+    [1, 2, 3]
+    """
+
+    def __init__(self, result_callback):
+        """
+        :param result_callback:
+            The callback to invoke for each result.
+        """
+        self.result_callback = result_callback
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """
+        Starts the thread invoking the callback.
+        """
+        self.thread.start()
+
+    def dispatch(self, results):
+        """
+        Queues results to be passed to the callback. Never blocks.
+
+        :param results:
+            An iterable of results.
+        """
+        self.queue.put(results)
+
+    def stop(self):
+        """
+        Waits until all dispatched results are handled and stops the thread.
+        """
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            results = self.queue.get()
+            if results is None:
+                break
+
+            call_result_callback(self.result_callback, results)
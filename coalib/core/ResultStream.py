@@ -0,0 +1,163 @@
+import asyncio
+import concurrent.futures
+import itertools
+import multiprocessing
+import queue
+import threading
+
+
+class ResultWriter:
+    """
+    Collects results of tasks in a worker and sends them in chunks of a
+    bounded size to the ``ResultStream`` it was created by.
+
+    >>> results = queue.Queue()
+    >>> writer = ResultWriter(results, 'task', 2)
+    >>> for result in range(5):
+    ...     writer.write(result)
+    >>> results.get(), results.get()
+    (('task', [0, 1]), ('task', [2, 3]))
+    >>> writer.count, writer.buffer
+    (2, [4])
+    """
+
+    def __init__(self, result_queue, task_id, results_per_chunk):
+        """
+        :param result_queue:
+            The queue to put chunks into.
+        :param task_id:
+            The id the chunks are sent with.
+        :param results_per_chunk:
+            The number of results to send together.
+        """
+        self.result_queue = result_queue
+        self.task_id = task_id
+        self.results_per_chunk = results_per_chunk
+        self.count = 0
+        self.buffer = []
+
+    def write(self, result):
+        """
+        Adds a result, sending the buffered results if a chunk is full.
+
+        :param result:
+            The result to add.
+        """
+        self.buffer.append(result)
+        if len(self.buffer) >= self.results_per_chunk:
+            self.result_queue.put((self.task_id, self.buffer))
+            self.count += 1
+            self.buffer = []
+
+
+class ResultStream:
+    """
+    Receives results of running tasks in chunks and hands them to the event
+    loop, so they can be processed while the tasks are still running.
+
+    A dedicated thread reads the chunks from a queue shared with the workers
+    of the executor: a ``queue.Queue`` for a ``ThreadPoolExecutor``, and a
+    queue of a ``multiprocessing.Manager`` for other executors. Workers of a
+    ``RemoteExecutor`` on other machines can't reach that queue, so it isn't
+    supported.
+    """
+
+    def __init__(self, event_loop, executor, results_per_chunk):
+        """
+        :param event_loop:
+            The event loop to hand the chunks to.
+        :param executor:
+            The executor the tasks are run on.
+        :param results_per_chunk:
+            The number of results to send together.
+        """
+        self.event_loop = event_loop
+        self.results_per_chunk = results_per_chunk
+
+        self.manager = None
+        if isinstance(executor, concurrent.futures.ThreadPoolExecutor):
+            self.queue = queue.Queue()
+        else:
+            self.manager = multiprocessing.Manager()
+            self.queue = self.manager.Queue()
+
+        self.task_ids = itertools.count()
+        self.handlers = {}
+        self.received = {}
+        self.waiters = {}
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def open(self, handler):
+        """
+        Registers a new task.
+
+        :param handler:
+            A function called on the event loop with each chunk of results of
+            the task.
+        :return:
+            A ``ResultWriter`` to send the results of the task with.
+        """
+        task_id = next(self.task_ids)
+        self.handlers[task_id] = handler
+        self.received[task_id] = 0
+        return ResultWriter(self.queue, task_id, self.results_per_chunk)
+
+    @asyncio.coroutine
+    def wait(self, task_id, count):
+        """
+        Waits until the given number of chunks of a task was handled, and
+        unregisters the task.
+
+        :param task_id:
+            The id of the task.
+        :param count:
+            The number of chunks the task sent.
+        """
+        if self.received[task_id] < count:
+            waiter = asyncio.Future(loop=self.event_loop)
+            self.waiters[task_id] = (waiter, count)
+            yield from waiter
+
+        self.discard(task_id)
+
+    def discard(self, task_id):
+        """
+        Unregisters a task. Chunks of it still arriving are dropped.
+
+        :param task_id:
+            The id of the task.
+        """
+        self.handlers.pop(task_id, None)
+        self.received.pop(task_id, None)
+        self.waiters.pop(task_id, None)
+
+    def close(self):
+        """
+        Stops receiving chunks.
+        """
+        self.queue.put(None)
+        self.thread.join()
+        if self.manager is not None:
+            self.manager.shutdown()
+
+    def _handle(self, task_id, results):
+        handler = self.handlers.get(task_id)
+        if handler is None:
+            return
+
+        handler(results)
+        self.received[task_id] += 1
+
+        waiter, count = self.waiters.get(task_id, (None, None))
+        if waiter is not None and self.received[task_id] >= count:
+            waiter.set_result(None)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            self.event_loop.call_soon_threadsafe(self._handle, *item)
@@ -0,0 +1,231 @@
+import hashlib
+import inspect
+import io
+import logging
+import os
+import pickle
+
+from coalib import VERSION
+from coalib.core.Bear import Bear
+from coalib.core.FileContents import FileContents
+
+
+class FingerprintPickler(pickle.Pickler):
+    """
+    Pickles task arguments to fingerprint them. Bears and their
+    file-dictionaries are left out, as they are fingerprinted separately.
+    """
+
+    def __init__(self, file, bear):
+        """
+        :param file:
+            The file to write the pickle to.
+        :param bear:
+            The bear the task belongs to.
+        """
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.bear = bear
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Bear):
+            return 'bear:' + type(obj).__qualname__
+        if obj is self.bear.file_dict:
+            return 'file_dict'
+        return None
+
+
+class TaskCache:
+    """
+    Stores the results of tasks of bears, so tasks which were run before with
+    the same inputs don't need to run again.
+
+    A task is identified by a fingerprint of:
+
+    - the bear class, its source file and the coala version,
+    - the settings of the section the bear takes as ``analyze`` parameters,
+    - the task arguments,
+    - the contents of the files the task reads, see ``get_task_files``,
+    - the results of the bears it depends on.
+
+    The contents of a file-dictionary are hashed once, so file-dictionaries
+    must not be modified while the cache is used. The cache is persisted to a
+    file with ``save``.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path:
+            The file to load the cache from and save it to. If ``None``, the
+            cache only lives in memory.
+        """
+        self.path = path
+        self.results = {}
+        self.file_contents = FileContents()
+        self.bear_fingerprints = {}
+        self.bear_settings = {}
+
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, 'rb') as file:
+                    self.results = pickle.load(file)
+            except (OSError, EOFError, pickle.UnpicklingError) as ex:
+                logging.warning('The task cache at {} could not be loaded '
+                                'and will be rebuilt: {}'.format(path, ex))
+
+    def get_bear_fingerprint(self, bear_type):
+        """
+        Fingerprints a bear class by its name, its source file and the coala
+        version, so changes to the bear invalidate its results.
+
+        :param bear_type:
+            The bear class.
+        :return:
+            The fingerprint as a hex string.
+        """
+        if bear_type not in self.bear_fingerprints:
+            fingerprint = hashlib.sha256()
+            fingerprint.update('{}.{}:{}'.format(
+                bear_type.__module__, bear_type.__qualname__,
+                VERSION).encode())
+            try:
+                with open(inspect.getsourcefile(bear_type), 'rb') as file:
+                    fingerprint.update(file.read())
+            except (OSError, TypeError):
+                pass
+
+            self.bear_fingerprints[bear_type] = fingerprint.hexdigest()
+
+        return self.bear_fingerprints[bear_type]
+
+    @staticmethod
+    def get_task_files(bear, args, kwargs):
+        """
+        Determines the files a task reads.
+
+        These are the files whose names are passed as arguments to the task.
+        If no file name is passed, the task is assumed to read all files of
+        the bear.
+
+        :param bear:
+            The bear the task belongs to.
+        :param args:
+            The arguments of the task.
+        :param kwargs:
+            The keyword-arguments of the task.
+        :return:
+            A sorted list of file names.
+        """
+        filenames = {value
+                     for value in tuple(args) + tuple(kwargs.values())
+                     if isinstance(value, str) and value in bear.file_dict}
+
+        return sorted(filenames or bear.file_dict)
+
+    def get_key(self, bear, args, kwargs):
+        """
+        Fingerprints a task.
+
+        :param bear:
+            The bear the task belongs to.
+        :param args:
+            The arguments of the task.
+        :param kwargs:
+            The keyword-arguments of the task.
+        :return:
+            The fingerprint as a hex string, or ``None`` if the task can't be
+            fingerprinted as its arguments or dependency results can't be
+            pickled.
+        """
+        fingerprint = hashlib.sha256()
+        fingerprint.update(self.get_bear_fingerprint(type(bear)).encode())
+
+        if type(bear) not in self.bear_settings:
+            metadata = bear.get_metadata()
+            self.bear_settings[type(bear)] = sorted(
+                set(metadata.non_optional_params) |
+                set(metadata.optional_params))
+
+        for name in self.bear_settings[type(bear)]:
+            if name in bear.section:
+                fingerprint.update('{}={}\n'.format(
+                    name, bear.section[name]).encode())
+
+        self.file_contents.add_file_dict(bear.file_dict)
+
+        for filename in self.get_task_files(bear, args, kwargs):
+            fingerprint.update('{}:{}\n'.format(
+                filename,
+                self.file_contents.get_digest(bear.file_dict[filename])
+            ).encode())
+
+        try:
+            fingerprint.update(self.pickle(bear, (args, kwargs)))
+
+            # Tasks of dependencies finish in any order, so the order of their
+            # results doesn't matter.
+            for bear_type, results in sorted(
+                    bear.dependency_results.items(),
+                    key=lambda item: (item[0].__module__,
+                                      item[0].__qualname__)):
+                fingerprint.update('{}.{}\n'.format(
+                    bear_type.__module__, bear_type.__qualname__).encode())
+                for digest in sorted(
+                        hashlib.sha256(self.pickle(bear, result)).digest()
+                        for result in results):
+                    fingerprint.update(digest)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return None
+
+        return fingerprint.hexdigest()
+
+    @staticmethod
+    def pickle(bear, obj):
+        """
+        Pickles an object to fingerprint it, using ``FingerprintPickler``.
+
+        :param bear:
+            The bear the object belongs to.
+        :param obj:
+            The object to pickle.
+        :return:
+            The pickled object.
+        """
+        output = io.BytesIO()
+        FingerprintPickler(output, bear).dump(obj)
+        return output.getvalue()
+
+    def get(self, key):
+        """
+        :param key:
+            The fingerprint of a task.
+        :return:
+            The cached list of results of the task, or ``None`` if there are
+            none.
+        """
+        return self.results.get(key)
+
+    def set(self, key, results):
+        """
+        Caches the results of a task.
+
+        :param key:
+            The fingerprint of the task.
+        :param results:
+            The list of results of the task.
+        """
+        self.results[key] = results
+
+    def save(self):
+        """
+        Writes the cache to its file.
+        """
+        if self.path is None:
+            return
+
+        try:
+            with open(self.path, 'wb') as file:
+                pickle.dump(self.results, file, pickle.HIGHEST_PROTOCOL)
+        except (OSError, pickle.PicklingError, AttributeError,
+                TypeError) as ex:
+            logging.warning('The task cache could not be saved to {}: '
+                            '{}'.format(self.path, ex))
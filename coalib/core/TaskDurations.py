@@ -0,0 +1,161 @@
+import time
+
+from coalib.misc.CachingUtilities import pickle_dump, pickle_load
+
+
+class TaskDurations:
+    """
+    Keeps track of how long the tasks of bears took in past runs, so the core
+    can estimate how long a bear will take.
+
+    Durations are recorded per bear name during a run:
+
+    >>> durations = TaskDurations()
+    >>> durations.record('SomeBear', 2.0)
+    >>> durations.record('SomeBear', 1.0)
+    >>> durations.commit()
+    >>> durations.get('SomeBear')
+    3.0
+
+    Each run is averaged with the previous ones, weighting recent runs more:
+
+    >>> durations.record('SomeBear', 1.0)
+    >>> durations.commit()
+    >>> durations.get('SomeBear')
+    2.0
+
+    Bears that weren't run yet are assumed to take the average time of all
+    known bears:
+
+    >>> durations.record('OtherBear', 4.0)
+    >>> durations.commit()
+    >>> durations.get('UnknownBear')
+    3.0
+
+    The durations are kept between runs on a project with ``save`` and
+    ``load``.
+    """
+
+    def __init__(self, durations=None, weight=0.5):
+        """
+        :param durations:
+            A dict mapping bear names to their durations in seconds from past
+            runs.
+        :param weight:
+            The weight of the latest run when averaging it with the previous
+            ones.
+        """
+        self.durations = dict(durations or {})
+        self.weight = weight
+        self.current = {}
+
+    @classmethod
+    def load(cls, log_printer, project_dir, **kwargs):
+        """
+        Loads the durations of past runs on a project stored with ``save``.
+
+        :param log_printer:
+            The log printer to warn to if the stored durations are corrupted.
+        :param project_dir:
+            The directory of the project.
+        :param kwargs:
+            Further arguments to pass on instantiation.
+        :return:
+            A ``TaskDurations`` instance, without durations if none were
+            stored yet.
+        """
+        return cls(pickle_load(log_printer,
+                               get_durations_identifier(project_dir),
+                               {}),
+                   **kwargs)
+
+    def save(self, log_printer, project_dir):
+        """
+        Stores the durations of past runs on a project in the user's data
+        directory. Durations of the current run are only stored once
+        committed.
+
+        :param log_printer:
+            The log printer to report errors to.
+        :param project_dir:
+            The directory of the project.
+        :return:
+            True if the durations were stored.
+        """
+        return pickle_dump(log_printer,
+                           get_durations_identifier(project_dir),
+                           self.durations)
+
+    def get(self, bear_name):
+        """
+        Returns the expected duration of all tasks of a bear.
+
+        :param bear_name:
+            The name of the bear.
+        :return:
+            The expected duration in seconds, or ``1`` if no bear is known.
+        """
+        try:
+            return self.durations[bear_name]
+        except KeyError:
+            if not self.durations:
+                return 1
+            return sum(self.durations.values()) / len(self.durations)
+
+    def record(self, bear_name, duration):
+        """
+        Adds the duration of a task of a bear in the current run.
+
+        :param bear_name:
+            The name of the bear.
+        :param duration:
+            The duration of the task in seconds.
+        """
+        self.current[bear_name] = self.current.get(bear_name, 0) + duration
+
+    def commit(self):
+        """
+        Merges the durations of the current run into the ones of past runs.
+        """
+        for bear_name, duration in self.current.items():
+            if bear_name in self.durations:
+                duration = (self.weight * duration +
+                            (1 - self.weight) * self.durations[bear_name])
+            self.durations[bear_name] = duration
+
+        self.current = {}
+
+
+def get_durations_identifier(project_dir):
+    """
+    Returns the identifier to store the durations of a project with.
+
+    >>> get_durations_identifier('/project')
+    'task_durations:/project'
+
+    :param project_dir:
+        The directory of the project.
+    :return:
+        The identifier for ``coalib.misc.CachingUtilities.pickle_dump``.
+    """
+    return 'task_durations:' + project_dir
+
+
+def call_timed(function, *args):
+    """
+    Calls a function and measures how long it takes.
+
+    >>> duration, result = call_timed(max, 1, 2)
+    >>> result
+    2
+
+    :param function:
+        The function to call.
+    :param args:
+        The arguments to pass.
+    :return:
+        A tuple of the duration in seconds and the return value.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
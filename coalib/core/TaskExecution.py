@@ -0,0 +1,215 @@
+import asyncio
+from collections import OrderedDict
+from itertools import chain, islice
+import threading
+
+from coalib.core.TaskDurations import call_timed
+
+# The number of bear instances each worker keeps in its cache.
+BEAR_CACHE_SIZE = 16
+
+_bear_cache = OrderedDict()
+_bear_cache_lock = threading.Lock()
+
+
+def chunk_tasks(tasks, tasks_per_chunk):
+    """
+    Splits the tasks of a bear into chunks that are executed together.
+
+    >>> list(chunk_tasks(range(5), 2))
+    [(0, 1), (2, 3), (4,)]
+
+    :param tasks:
+        An iterable of tasks as returned from ``Bear.generate_tasks``.
+    :param tasks_per_chunk:
+        The maximum number of tasks in a chunk.
+    :return:
+        An iterable of tuples of tasks.
+    """
+    tasks = iter(tasks)
+    while True:
+        chunk = tuple(islice(tasks, tasks_per_chunk))
+        if not chunk:
+            return
+        yield chunk
+
+
+def execute_tasks(bear, tasks, result_writer=None):
+    """
+    Executes a chunk of tasks of a bear.
+
+    :param bear:
+        The bear to execute the tasks with.
+    :param tasks:
+        An iterable of ``(args, kwargs)`` tuples.
+    :param result_writer:
+        A ``ResultWriter`` to stream the results with.
+    :return:
+        A list holding the list of results of each task. If a
+        ``result_writer`` is given, a tuple of the number of chunks it sent
+        and the list of remaining results.
+    """
+    if result_writer is None:
+        return [bear.execute_task(args, kwargs) for args, kwargs in tasks]
+
+    for args, kwargs in tasks:
+        bear.execute_task(args, kwargs, result_writer)
+    return result_writer.count, result_writer.buffer
+
+
+def execute_cached_tasks(key, bear, tasks, result_writer=None):
+    """
+    Executes a chunk of tasks of a bear that is cached in the worker.
+
+    The bear is only sent if the worker asked for it, so a bear and its
+    file-dictionary are transferred to each worker once instead of with every
+    chunk:
+
+    >>> from coalib.core.Bear import Bear
+    >>> from coalib.settings.Section import Section
+    >>> class SomeBear(Bear):
+    ...     def analyze(self, x):
+    ...         return [x * 2]
+    >>> tasks = [((1,), {}), ((2,), {})]
+    >>> execute_cached_tasks('some-key', None, tasks) is None
+    True
+    >>> execute_cached_tasks('some-key', SomeBear(Section(''), {}), tasks)
+    [[2], [4]]
+    >>> execute_cached_tasks('some-key', None, tasks)
+    [[2], [4]]
+
+    :param key:
+        A key identifying the bear across processes.
+    :param bear:
+        The bear to execute the tasks with, or ``None`` to use the cached bear
+        with the given key.
+    :param tasks:
+        An iterable of ``(args, kwargs)`` tuples.
+    :param result_writer:
+        A ``ResultWriter`` to stream the results with.
+    :return:
+        The return value of ``execute_tasks``, or ``None`` if no bear was
+        given and the worker has no bear cached under ``key``.
+    """
+    with _bear_cache_lock:
+        if bear is None:
+            bear = _bear_cache.get(key)
+            if bear is None:
+                return None
+            _bear_cache.move_to_end(key)
+        else:
+            _bear_cache[key] = bear
+            while len(_bear_cache) > BEAR_CACHE_SIZE:
+                _bear_cache.popitem(last=False)
+
+    return execute_tasks(bear, tasks, result_writer)
+
+
+@asyncio.coroutine
+def run_async_task(bear, args, kwargs):
+    """
+    Runs a task of a bear whose ``analyze`` is a coroutine directly on the
+    event loop.
+
+    :param bear:
+        The bear to execute the task with.
+    :param args:
+        The arguments of the task.
+    :param kwargs:
+        The keyword-arguments of the task.
+    :return:
+        A list of the results of the task.
+    """
+    return list((yield from bear.analyze(*args, **kwargs)))
+
+
+@asyncio.coroutine
+def run_tasks(bear,
+              key,
+              tasks,
+              event_loop,
+              executor,
+              send_bear=False,
+              result_stream=None,
+              handle_results=None,
+              task_priorities=None,
+              store_results=None):
+    """
+    Runs a chunk of tasks of a bear on the executor.
+
+    :param bear:
+        The bear to execute the tasks with.
+    :param key:
+        A key to cache the bear in the workers under, or ``None`` to send the
+        bear along with the tasks.
+    :param tasks:
+        A tuple of ``(args, kwargs)`` tuples.
+    :param event_loop:
+        The ``asyncio`` event loop to schedule the tasks on.
+    :param executor:
+        The executor to execute the tasks on.
+    :param send_bear:
+        Whether to send the bear to cache along with the tasks right away.
+        Otherwise it's only sent if the worker doesn't have it cached yet,
+        which takes another call.
+    :param result_stream:
+        A ``ResultStream`` to receive results while the tasks are running.
+    :param handle_results:
+        A function called with each chunk of results received from the
+        ``result_stream``.
+    :param task_priorities:
+        The ``TaskPriorities`` to wait for before submitting the tasks, and to
+        record how long the tasks took in the worker in.
+    :param store_results:
+        A function called with a list holding the list of results of each
+        task, e.g. to cache them. It's not called for streamed results.
+    :return:
+        A list of the results of all tasks. If a ``result_stream`` is given,
+        the results which weren't handled with ``handle_results`` yet.
+    """
+    @asyncio.coroutine
+    def execute(*args):
+        if task_priorities is None:
+            return (yield from event_loop.run_in_executor(executor, *args))
+
+        yield from task_priorities.acquire(task_priorities.get_priority(bear))
+        try:
+            duration, result = yield from event_loop.run_in_executor(
+                executor, call_timed, *args)
+        finally:
+            task_priorities.release()
+
+        task_priorities.record(bear, duration)
+        return result
+
+    result_writer = None
+    if result_stream is not None:
+        result_writer = result_stream.open(handle_results)
+
+    try:
+        if key is None:
+            results = yield from execute(
+                execute_tasks, bear, tasks, result_writer)
+        else:
+            results = yield from execute(
+                execute_cached_tasks, key, bear if send_bear else None, tasks,
+                result_writer)
+            if results is None:
+                # The worker hasn't seen the bear yet.
+                results = yield from execute(
+                    execute_cached_tasks, key, bear, tasks, result_writer)
+    except BaseException:
+        if result_writer is not None:
+            result_stream.discard(result_writer.task_id)
+        raise
+
+    if result_writer is None:
+        if store_results is not None:
+            store_results(results)
+        return list(chain.from_iterable(results))
+
+    # Hand out all streamed results before the remaining ones, which
+    # completes the tasks.
+    count, results = results
+    yield from result_stream.wait(result_writer.task_id, count)
+    return results
@@ -0,0 +1,104 @@
+import asyncio
+import heapq
+import itertools
+
+
+class TaskPriorities:
+    """
+    Prioritizes the tasks of bears on the longest remaining dependency chain,
+    estimated from the durations of past runs.
+
+    An executor runs tasks in the order they were submitted, so tasks
+    submitted once can't be reordered any more. That's why only as many tasks
+    are submitted as the executor runs at the same time, and further tasks
+    wait in the order of their priority until a running one is done.
+    """
+
+    def __init__(self,
+                 task_durations,
+                 dependency_tracker,
+                 event_loop,
+                 running_task_limit):
+        """
+        :param task_durations:
+            The ``TaskDurations`` to estimate how long bears take with, and to
+            record the durations of tasks in.
+        :param dependency_tracker:
+            The object that keeps track of dependencies.
+        :param event_loop:
+            The event loop tasks are scheduled on.
+        :param running_task_limit:
+            The number of tasks to submit to the executor at the same time.
+        """
+        self.task_durations = task_durations
+        self.dependency_tracker = dependency_tracker
+        self.event_loop = event_loop
+        self.free_slots = running_task_limit
+        self.waiting = []
+        self.counter = itertools.count()
+        self.critical_path_lengths = {}
+
+    def get_priority(self, bear):
+        """
+        Estimates how long it takes until a bear and all bears depending on it
+        (directly or indirectly) are done, following the longest chain of
+        dependants.
+
+        :param bear:
+            The bear instance.
+        :return:
+            The estimated duration in seconds. Bears with longer durations
+            are more urgent.
+        """
+        if bear not in self.critical_path_lengths:
+            self.critical_path_lengths[bear] = (
+                self.task_durations.get(bear.name) +
+                max((self.get_priority(dependant)
+                     for dependant in self.dependency_tracker.get_dependants(
+                         bear)),
+                    default=0))
+
+        return self.critical_path_lengths[bear]
+
+    @asyncio.coroutine
+    def acquire(self, priority):
+        """
+        Waits until a task with the given priority may be submitted.
+
+        Tasks with a higher priority are let through first, tasks with the
+        same priority in the order they arrived.
+
+        :param priority:
+            The priority of the task.
+        """
+        if self.free_slots > 0 and not self.waiting:
+            self.free_slots -= 1
+            return
+
+        waiter = asyncio.Future(loop=self.event_loop)
+        heapq.heappush(self.waiting, (-priority, next(self.counter), waiter))
+        yield from waiter
+
+    def release(self):
+        """
+        Marks a submitted task as done, letting the most urgent waiting task
+        through.
+        """
+        while self.waiting:
+            _, _, waiter = heapq.heappop(self.waiting)
+            if not waiter.cancelled():
+                waiter.set_result(None)
+                return
+
+        self.free_slots += 1
+
+    def record(self, bear, duration):
+        """
+        Records how long a task of a bear took.
+
+        :param bear:
+            The bear instance.
+        :param duration:
+            The duration of the task in seconds.
+        """
+        self.task_durations.record(bear.name, duration)
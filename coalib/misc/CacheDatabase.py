@@ -0,0 +1,391 @@
+from contextlib import contextmanager
+import os
+import pickle
+import re
+import sqlite3
+import time
+
+from coalib.misc import Constants
+from coalib.misc.CachingUtilities import hash_id
+
+# The version of the schema, stored as the ``user_version`` of the database.
+SCHEMA_VERSION = 1
+
+# The rows of a project are stored next to each other, so they are read fast.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    project TEXT PRIMARY KEY,
+    path TEXT,
+    time INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    project TEXT NOT NULL,
+    section TEXT NOT NULL,
+    file TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    digest TEXT,
+    PRIMARY KEY (project, section, file)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS results (
+    project TEXT NOT NULL,
+    section TEXT NOT NULL,
+    file TEXT NOT NULL,
+    results BLOB NOT NULL,
+    PRIMARY KEY (project, section, file)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sections (
+    project TEXT NOT NULL,
+    section TEXT NOT NULL,
+    settings_hash TEXT NOT NULL,
+    PRIMARY KEY (project, section)
+) WITHOUT ROWID;
+"""
+
+
+class CacheDatabase:
+    """
+    Stores the file caches and settings hashes of all projects in one SQLite
+    database in the user data directory.
+
+    Projects are identified by the hash of their directory, like the pickle
+    files used before. A run only reads the rows of its own project and only
+    writes the rows that changed. The database uses write-ahead logging, so
+    concurrent runs don't block each other while reading. Caches of projects
+    that weren't analyzed for long are evicted with ``collect_garbage``.
+
+    >>> from pyprint.NullPrinter import NullPrinter
+    >>> from coalib.output.printers.LogPrinter import LogPrinter
+    >>> database = CacheDatabase(LogPrinter(NullPrinter()), ':memory:')
+    >>> database.set_time('/project', 42)
+    >>> database.get_time('/project')
+    42
+    >>> database.get_time('/other/project')
+    -1
+    """
+
+    def __init__(self, log_printer, path=None):
+        """
+        Opens the database, creating it if needed. Pickled caches of older
+        versions of coala in the user data directory are migrated into a
+        new database.
+
+        :param log_printer: A LogPrinter object to use for logging.
+        :param path:        The file of the database. Defaults to
+                            ``cache.sqlite3`` in the user data directory.
+                            If it can't be created, an in-memory database is
+                            used, so coala continues without caching.
+        """
+        self.log_printer = log_printer
+        if path is None:
+            try:
+                os.makedirs(Constants.USER_DATA_DIR, exist_ok=True)
+                path = os.path.join(Constants.USER_DATA_DIR, 'cache.sqlite3')
+            except PermissionError:
+                log_printer.err("Unable to create user data directory '{}'. "
+                                'Continuing without caching.'.format(
+                                    Constants.USER_DATA_DIR))
+                path = ':memory:'
+        self.path = path
+
+        try:
+            self.connection = self._connect()
+        except sqlite3.DatabaseError as exception:
+            log_printer.warn('The cache database is corrupted and will be '
+                             'rebuilt: {}'.format(exception))
+            for file_path in (path, path + '-wal', path + '-shm'):
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            self.connection = self._connect()
+
+    def _connect(self):
+        # Transactions are managed explicitly, see ``transaction``.
+        connection = sqlite3.connect(self.path, timeout=30,
+                                     isolation_level=None)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Durable enough with write-ahead logging, and much faster.
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection = connection
+
+            with self.transaction():
+                # Only one process creates the schema and migrates.
+                version = connection.execute(
+                    'PRAGMA user_version').fetchone()[0]
+                if version < SCHEMA_VERSION:
+                    for statement in SCHEMA.split(';')[:-1]:
+                        connection.execute(statement)
+                    if self.path != ':memory:':
+                        self._migrate_pickles(connection)
+                    connection.execute(
+                        'PRAGMA user_version={}'.format(SCHEMA_VERSION))
+        except BaseException:
+            connection.close()
+            raise
+
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs the statements executed in the ``with`` block in one transaction,
+        so they are written at once or not at all. Other statements are
+        written immediately.
+        """
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+    def _migrate_pickles(self, connection):
+        directory = os.path.dirname(self.path)
+        for name in os.listdir(directory):
+            file_path = os.path.join(directory, name)
+            if not re.fullmatch('[0-9a-f]{32}', name):
+                continue
+
+            try:
+                with open(file_path, 'rb') as file:
+                    data = pickle.load(file)
+            except Exception:
+                continue
+
+            if self._migrate_pickle(connection, name, data):
+                os.remove(file_path)
+                self.log_printer.debug('Migrated the cache file {} into the '
+                                       'cache database.'.format(file_path))
+
+    @staticmethod
+    def _migrate_pickle(connection, name, data):
+        if not isinstance(data, dict):
+            return False
+
+        if 'files' in data:
+            CacheDatabase._migrate_file_cache(connection, name, data)
+            return True
+
+        return False
+
+    @staticmethod
+    def _migrate_file_cache(connection, project, data):
+        connection.execute(
+            'INSERT OR IGNORE INTO projects (project) VALUES (?)', (project,))
+        # The files are not migrated, as pickled caches don't know which
+        # sections analyzed them.
+        connection.execute('UPDATE projects SET time = ? WHERE project = ?',
+                           (data.get('time', -1), project))
+
+    def close(self):
+        """
+        Closes the connection to the database.
+        """
+        self.connection.close()
+
+    def _set_project_value(self, project_dir, column, value):
+        project = hash_id(project_dir)
+        self.connection.execute(
+            'INSERT OR IGNORE INTO projects (project) VALUES (?)', (project,))
+        self.connection.execute(
+            'UPDATE projects SET path = ?, {} = ? WHERE project = ?'.format(
+                column),
+            (project_dir, value, project))
+
+    def _get_project_value(self, project_dir, column):
+        row = self.connection.execute(
+            'SELECT {} FROM projects WHERE project = ?'.format(column),
+            (hash_id(project_dir),)).fetchone()
+        return None if row is None else row[0]
+
+    def get_time(self, project_dir):
+        """
+        :param project_dir: The directory of the project.
+        :return:            The time the file cache of the project was
+                            written last, or ``-1`` if it never was.
+        """
+        time = self._get_project_value(project_dir, 'time')
+        return -1 if time is None else time
+
+    def set_time(self, project_dir, time):
+        """
+        :param project_dir: The directory of the project.
+        :param time:        The time the file cache of the project is
+                            written.
+        """
+        self._set_project_value(project_dir, 'time', time)
+
+    def get_files(self, project_dir):
+        """
+        :param project_dir: The directory of the project.
+        :return:            A dict mapping tuples of section names and the
+                            files tracked for them to their fingerprints,
+                            which are tuples of size, modification time in
+                            nanoseconds and the hash of their contents, or
+                            ``None`` if unknown.
+        """
+        return {(section, file):
+                None if digest is None else (size, mtime_ns, digest)
+                for section, file, size, mtime_ns, digest in
+                self.connection.execute(
+                    'SELECT section, file, size, mtime_ns, digest FROM files '
+                    'WHERE project = ?', (hash_id(project_dir),))}
+
+    def set_files(self, project_dir, fingerprints):
+        """
+        Tracks files in sections or updates their fingerprints.
+
+        :param project_dir:  The directory of the project.
+        :param fingerprints: A dict mapping tuples of section names and files
+                             to their fingerprints, see ``get_files``.
+        """
+        project = hash_id(project_dir)
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)',
+            ((project, section, file) + (fingerprint or (None,) * 3)
+             for (section, file), fingerprint in fingerprints.items()))
+
+    def remove_files(self, project_dir, files):
+        """
+        Untracks files in sections, dropping their results.
+
+        :param project_dir: The directory of the project.
+        :param files:       The tuples of section names and files to
+                            untrack.
+        """
+        project = hash_id(project_dir)
+        for table in ('files', 'results'):
+            self.connection.executemany(
+                'DELETE FROM {} WHERE project = ? AND section = ? AND file = ?'
+                .format(table),
+                ((project, section, file) for section, file in files))
+
+    def get_results(self, project_dir):
+        """
+        :param project_dir: The directory of the project.
+        :return:            A dict mapping tuples of section names and files
+                            to the pickled results stored for them.
+        """
+        return {(section, file): results
+                for section, file, results in self.connection.execute(
+                    'SELECT section, file, results FROM results '
+                    'WHERE project = ?', (hash_id(project_dir),))}
+
+    def set_results(self, project_dir, section_name, file, results):
+        """
+        :param project_dir:  The directory of the project.
+        :param section_name: The name of the section.
+        :param file:         The file the results were yielded on.
+        :param results:      A list of results. If empty, the results stored
+                             before are dropped.
+        """
+        project = hash_id(project_dir)
+        if results:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                (project, section_name, file,
+                 pickle.dumps(results, pickle.HIGHEST_PROTOCOL)))
+        else:
+            self.connection.execute(
+                'DELETE FROM results '
+                'WHERE project = ? AND section = ? AND file = ?',
+                (project, section_name, file))
+
+    def get_section_settings(self, project_dir):
+        """
+        :param project_dir: The directory of the project.
+        :return:            A dict mapping the names of the sections of the
+                            project to the hashes of their settings, see
+                            ``CachingUtilities.get_section_settings_hash``.
+        """
+        return dict(self.connection.execute(
+            'SELECT section, settings_hash FROM sections WHERE project = ?',
+            (hash_id(project_dir),)))
+
+    def set_section_settings(self, project_dir, section_settings):
+        """
+        :param project_dir:      The directory of the project.
+        :param section_settings: A dict mapping section names to the hashes
+                                 of their settings.
+        """
+        project = hash_id(project_dir)
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO sections VALUES (?, ?, ?)',
+            ((project, section, settings_hash)
+             for section, settings_hash in section_settings.items()))
+
+    def clear(self, project_dir):
+        """
+        Drops the file cache of a project.
+
+        :param project_dir: The directory of the project.
+        """
+        project = hash_id(project_dir)
+        for table in ('files', 'results', 'sections'):
+            self.connection.execute(
+                'DELETE FROM {} WHERE project = ?'.format(table), (project,))
+        self.connection.execute(
+            'UPDATE projects SET time = NULL WHERE project = ?', (project,))
+
+    def _remove_project(self, project):
+        for table in ('files', 'results', 'sections', 'projects'):
+            self.connection.execute(
+                'DELETE FROM {} WHERE project = ?'.format(table), (project,))
+
+    def get_size(self):
+        """
+        :return: The size of the pages of the database in use in bytes. Pages
+                 of evicted caches are reused for new ones, the file itself
+                 only shrinks with ``vacuum``.
+        """
+        page_size, page_count, freelist_count = (
+            self.connection.execute('PRAGMA {}'.format(pragma)).fetchone()[0]
+            for pragma in ('page_size', 'page_count', 'freelist_count'))
+        return page_size * (page_count - freelist_count)
+
+    def collect_garbage(self, max_age=None, max_size=None, keep=None):
+        """
+        Evicts the caches of the least recently used projects, i.e. the ones
+        written last the longest time ago.
+
+        :param max_age:  The number of seconds after which the cache of a
+                         project that wasn't written since is evicted, or
+                         ``None`` to keep caches regardless of their age.
+        :param max_size: The size in bytes the database may use, see
+                         ``get_size``. Caches are evicted until it fits. If
+                         ``None``, the size is not limited.
+        :param keep:     The directory of a project whose cache is never
+                         evicted, e.g. the one being analyzed.
+        :return:         A list of the directories of the evicted projects.
+                         Projects migrated from pickles whose directory is
+                         unknown are given by their hash.
+        """
+        keep = '' if keep is None else hash_id(keep)
+        evicted = []
+        with self.transaction():
+            # Projects whose cache was never written come first.
+            projects = self.connection.execute(
+                'SELECT project, path, time FROM projects WHERE project != ? '
+                'ORDER BY time', (keep,)).fetchall()
+            for project, path, last_time in projects:
+                expired = (max_age is not None and
+                           (last_time or -1) < time.time() - max_age)
+                too_large = max_size is not None and self.get_size() > max_size
+                if not (expired or too_large):
+                    break
+
+                self._remove_project(project)
+                evicted.append(path or project)
+                self.log_printer.debug('Evicted the cache of project {}.'
+                                       .format(path or project))
+
+        return evicted
+
+    def vacuum(self):
+        """
+        Shrinks the database file to the pages in use and truncates the
+        write-ahead log.
+        """
+        self.connection.execute('VACUUM')
+        self.connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
@@ -1,10 +1,50 @@
-import time
+import functools
+import logging
 import os
+import pickle
+import threading
+import time
 
 from coala_utils.decorators import enforce_signature
 from coalib.output.printers.LogPrinter import LogPrinterMixin
-from coalib.misc.CachingUtilities import (
-    pickle_load, pickle_dump, delete_files)
+from coalib.misc.CacheDatabase import CacheDatabase
+from coalib.misc.CachingUtilities import hash_file
+
+# The section files are tracked for if no section is given, as files used to
+# be tracked for all sections together.
+DEFAULT_SECTION_NAME = 'default'
+
+
+def get_section_name(section_name, method_name):
+    """
+    Returns the section to track files for, warning if none was given.
+
+    :param section_name: The name of the section, or ``None``.
+    :param method_name:  The name of the ``FileCache`` method called.
+    :return:             The name of the section, ``DEFAULT_SECTION_NAME`` if
+                         none was given.
+    """
+    if section_name is not None:
+        return section_name
+
+    logging.warning('Calling FileCache.{} without a section_name is '
+                    'deprecated and will be removed. The files are tracked '
+                    'for the section {!r}.'.format(method_name,
+                                                   DEFAULT_SECTION_NAME))
+    return DEFAULT_SECTION_NAME
+
+
+def synchronized(method):
+    """
+    Makes a method of a ``FileCache`` hold the lock of the cache, so
+    sections executed concurrently can share it.
+    """
+    @functools.wraps(method)
+    def synchronized_method(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+
+    return synchronized_method
 
 
 class FileCache:
@@ -23,9 +63,9 @@ class FileCache:
 
     >>> cache = FileCache(log_printer, "test", flush_cache=True)
 
-    Now we can track new files by running:
+    Now we can track new files for a section by running:
 
-    >>> cache.track_files(["a.c", "b.c"])
+    >>> cache.track_files(["a.c", "b.c"], "section")
 
     Since all cache operations are lazy (for performance), we need to
     explicitly write the cache to disk for persistence in future uses:
@@ -45,7 +85,7 @@ class FileCache:
 
     We can mark a file as changed by doing:
 
-    >>> cache.untrack_files({"a.c"})
+    >>> cache.untrack_files({"a.c"}, "section")
 
     Again write to disk after calculating the new cache times for each file:
 
@@ -54,16 +94,35 @@ class FileCache:
 
     Since we marked 'a.c' as a changed file:
 
-    >>> "a.c" not in cache.data
+    >>> ("section", "a.c") not in cache.data
     True
-    >>> "a.c" in old_data
+    >>> ("section", "a.c") in old_data
     True
 
     Since 'b.c' was untouched after the second run, its time was updated
     to the latest value:
 
-    >>> old_data["b.c"] < new_data["b.c"]
+    >>> old_data[("section", "b.c")] < new_data[("section", "b.c")]
     True
+
+    Files are tracked per section, so they are new to other sections:
+
+    >>> cache.get_uncached_files({"b.c"}, "other section")
+    {'b.c'}
+
+    The results local bears yield on a file can be stored per section, so
+    they are replayed instead of analyzing the file again as long as it
+    doesn't change:
+
+    >>> cache.set_results("section", "b.c", ["result"])
+    >>> cache.get_results("section", "b.c")
+    ['result']
+    >>> cache.get_results("other section", "b.c")
+    []
+
+    With ``content_hashes`` enabled, a file only counts as changed if its
+    contents changed, not only its modification time. Its contents are only
+    hashed again if its size or modification time changed.
     """
 
     @enforce_signature
@@ -71,23 +130,40 @@ class FileCache:
             self,
             log_printer: LogPrinterMixin,
             project_dir: str,
-            flush_cache: bool=False):
+            flush_cache: bool=False,
+            content_hashes: bool=False,
+            max_age=None,
+            max_size=None):
         """
         Initialize FileCache.
 
-        :param log_printer: An object to use for logging.
-        :param project_dir: The root directory of the project to be used
-                            as a key identifier.
-        :param flush_cache: Flush the cache and rebuild it.
+        :param log_printer:    An object to use for logging.
+        :param project_dir:    The root directory of the project to be used
+                               as a key identifier.
+        :param flush_cache:    Flush the cache and rebuild it.
+        :param content_hashes: Detect changed files by hashes of their
+                               contents instead of their modification times,
+                               so touching or restoring files doesn't
+                               invalidate them.
+        :param max_age:        The number of seconds after which caches of
+                               other projects that weren't written since are
+                               evicted when writing this one.
+        :param max_size:       The size in bytes the caches of all projects
+                               may use. The caches of the least recently used
+                               other projects are evicted to fit when writing
+                               this one.
         """
         self.log_printer = log_printer
         self.project_dir = project_dir
+        self.content_hashes = content_hashes
+        self.max_age = max_age
+        self.max_size = max_size
+        self.lock = threading.RLock()
         self.current_time = int(time.time())
 
-        cache_data = pickle_load(log_printer, project_dir, {})
-        last_time = -1
-        if 'time' in cache_data:
-            last_time = cache_data['time']
+        self.database = CacheDatabase(log_printer)
+
+        last_time = self.database.get_time(project_dir)
         if not flush_cache and last_time > self.current_time:
             log_printer.warn('It seems like you went back in time - your '
                              'system time is behind the last recorded run '
@@ -95,42 +171,127 @@ class FileCache:
                              'be force flushed.')
             flush_cache = True
 
-        self.data = cache_data.get('files', {})
+        # Only the rows that changed are written back, see ``write``.
+        self.changed_fingerprints = set()
+        self.changed_results = set()
+        self.changed_sections = set()
         if flush_cache:
             self.flush_cache()
+        else:
+            self.section_settings = self.database.get_section_settings(
+                project_dir)
+            self.fingerprints = self.database.get_files(project_dir)
+            self.data = dict.fromkeys(self.fingerprints, last_time)
+            self.fingerprints = {file: fingerprint
+                                 for file, fingerprint in
+                                 self.fingerprints.items()
+                                 if fingerprint is not None}
+            self.results = {}
+            for key, results in self.database.get_results(
+                    project_dir).items():
+                try:
+                    self.results[key] = pickle.loads(results)
+                except (pickle.UnpicklingError, AttributeError, EOFError,
+                        ImportError, TypeError):
+                    # E.g. the classes of the results changed, so the file
+                    # is analyzed again.
+                    self.data.pop(key, None)
 
         # store the files to be untracked and then untrack them in the end
-        # so that an untracked file is not tracked again by mistake in a
-        # later section (which will happen if that file doesn't yield a
-        # result in that section).
+        # so that an untracked file is not tracked again by mistake (which
+        # will happen if its section is run again before the cache is
+        # written).
         self.to_untrack = set()
 
+    @synchronized
     def flush_cache(self):
         """
-        Flushes the cache and deletes the relevant file.
+        Flushes the cache and deletes it from the database.
         """
         self.data = {}
-        delete_files(self.log_printer, [self.project_dir])
+        self.results = {}
+        self.fingerprints = {}
+        self.section_settings = {}
+        self.changed_fingerprints.clear()
+        self.changed_results.clear()
+        self.changed_sections.clear()
+        self._open_database().clear(self.project_dir)
         self.log_printer.debug('The file cache was successfully flushed.')
 
+    def _open_database(self):
+        """
+        Opens the connection to the cache database if ``write`` closed it.
+
+        :return: The ``CacheDatabase``.
+        """
+        if self.database is None:
+            self.database = CacheDatabase(self.log_printer)
+        return self.database
+
     def __enter__(self):
         return self
 
+    @synchronized
     def write(self):
         """
         Update the last run time on the project for each file
         to the current time. Using this object as a contextmanager is
         preferred (that will automatically call this method on exit).
+
+        Only new and untracked files, changed fingerprints, changed results
+        and changed section settings are written to the database.
         """
-        for file in self.to_untrack:
-            if file in self.data:
-                del self.data[file]
-        for file_name in self.data:
-            self.data[file_name] = self.current_time
-        pickle_dump(
-            self.log_printer,
-            self.project_dir,
-            {'time': self.current_time, 'files': self.data})
+        untracked_files = {key for key in self.to_untrack
+                           if key in self.data}
+        for key in untracked_files:
+            del self.data[key]
+        self.to_untrack.clear()
+        changed_files = ({key
+                          for key, file_time in self.data.items()
+                          if file_time == -1} |
+                         (self.changed_fingerprints & self.data.keys()))
+
+        database = self._open_database()
+        try:
+            with database.transaction():
+                database.remove_files(self.project_dir, untracked_files)
+                database.set_files(
+                    self.project_dir,
+                    {key: self.fingerprints.get(key)
+                     for key in changed_files})
+                for section_name, file in self.changed_results:
+                    if (section_name, file) in self.data:
+                        database.set_results(
+                            self.project_dir,
+                            section_name,
+                            file,
+                            self.get_results(section_name, file))
+                database.set_section_settings(
+                    self.project_dir,
+                    {section_name: self.section_settings[section_name]
+                     for section_name in self.changed_sections})
+                database.set_time(self.project_dir, self.current_time)
+
+            if self.max_age is not None or self.max_size is not None:
+                database.collect_garbage(self.max_age, self.max_size,
+                                         keep=self.project_dir)
+        finally:
+            # The connection is opened again if needed, see
+            # ``_open_database``.
+            database.close()
+            self.database = None
+
+        for key in self.data:
+            self.data[key] = self.current_time
+        self.results = {key: results
+                        for key, results in self.results.items()
+                        if key in self.data}
+        self.fingerprints = {key: fingerprint
+                             for key, fingerprint in self.fingerprints.items()
+                             if key in self.data}
+        self.changed_fingerprints.clear()
+        self.changed_results.clear()
+        self.changed_sections.clear()
 
     def __exit__(self, type, value, traceback):
         """
@@ -139,36 +300,63 @@ class FileCache:
         """
         self.write()
 
-    def untrack_files(self, files):
+    @synchronized
+    def untrack_files(self, files, section_name=None):
         """
-        Removes the given files from the cache so that they are no longer
-        considered cached for this and the next run.
+        Removes the given files of a section from the cache so that they are
+        no longer considered cached for the section in the next run. Their
+        stored results are dropped.
 
-        :param files: A set of files to remove from cache.
+        :param files:        A set of files to remove from cache.
+        :param section_name: The name of the section. Omitting it is
+                             deprecated, see ``get_section_name``.
         """
-        self.to_untrack.update(files)
+        section_name = get_section_name(section_name, 'untrack_files')
+        self.to_untrack.update((section_name, file) for file in files)
 
-    def track_files(self, files):
+    @synchronized
+    def untrack_changed_files(self, files):
         """
-        Start tracking files given in ``files`` by adding them to the
-        database.
+        Removes the given files from the cache of every section tracking them,
+        e.g. because actions changed them. They are analyzed again in the next
+        run.
 
-        :param files: A set of files that need to be tracked.
-                      These files are initialized with their last
-                      modified tag as -1.
+        :param files: A set of files to remove from cache.
         """
+        self.to_untrack.update(key for key in self.data if key[1] in files)
+
+    @synchronized
+    def track_files(self, files, section_name=None):
+        """
+        Start tracking files given in ``files`` for a section by adding them
+        to the database.
+
+        :param files:        A set of files that need to be tracked.
+                             These files are initialized with their last
+                             modified tag as -1.
+        :param section_name: The name of the section. Omitting it is
+                             deprecated, see ``get_section_name``.
+        """
+        section_name = get_section_name(section_name, 'track_files')
         for file in files:
-            if file not in self.data:
-                self.data[file] = -1
+            self.data.setdefault((section_name, file), -1)
 
-    def get_uncached_files(self, files):
+    @synchronized
+    def get_uncached_files(self, files, section_name=None):
         """
-        Returns the set of files that are not in the cache yet or have been
-        untracked.
+        Returns the set of files that are not in the cache of a section yet or
+        have been untracked.
 
-        :param files: The list of collected files.
-        :return:      A set of files that are uncached.
+        :param files:        The list of collected files.
+        :param section_name: The name of the section. Omitting it is
+                             deprecated, see ``get_section_name``.
+        :return:             A set of files that are uncached.
         """
+        section_name = get_section_name(section_name, 'get_uncached_files')
+        if self.content_hashes:
+            return {file for file in files
+                    if self.content_changed(section_name, file)}
+
         if self.data == {}:
             # The first run on this project. So all files are new
             # and must be returned irrespective of whether caching is turned on.
@@ -176,5 +364,112 @@ class FileCache:
         else:
             return {file
                     for file in files
-                    if (file not in self.data or
-                        int(os.path.getmtime(file)) > self.data[file])}
+                    # Files changed within the second the last run
+                    # started in are checked again, to be safe.
+                    if ((section_name, file) not in self.data or
+                        int(os.path.getmtime(file)) >=
+                        self.data[(section_name, file)])}
+
+    @synchronized
+    def set_results(self, section_name, file, results):
+        """
+        Stores the results all local bears of a section yielded on a file,
+        replacing the ones stored before.
+
+        :param section_name: The name of the section.
+        :param file:         The file the results were yielded on.
+        :param results:      A list of results. If empty, nothing is stored.
+        """
+        if results:
+            self.results[(section_name, file)] = list(results)
+        else:
+            self.results.pop((section_name, file), None)
+        self.changed_results.add((section_name, file))
+
+    @synchronized
+    def section_settings_changed(self, section_name, settings_hash, files):
+        """
+        Checks whether the settings of the local bears of a section changed
+        since the last run, see
+        ``CachingUtilities.get_section_settings_hash``. If so, the results of
+        the section are dropped, while the ones of other sections are kept.
+
+        The given files are analyzed again in this run. All other files
+        tracked for the section were analyzed with the old settings, so they
+        are untracked and analyzed when the section runs on them again.
+
+        :param section_name:  The name of the section.
+        :param settings_hash: The hash of the settings of the section.
+        :param files:         The set of files of the section in this run.
+        :return:              True if the settings changed or the section
+                              wasn't run before, so all its files need to be
+                              analyzed again.
+        """
+        if self.section_settings.get(section_name) == settings_hash:
+            return False
+
+        self.section_settings[section_name] = settings_hash
+        self.changed_sections.add(section_name)
+        for key in [key for key in self.results if key[0] == section_name]:
+            self.set_results(*key, results=[])
+        self.untrack_files({file for section, file in self.data
+                            if section == section_name} - files,
+                           section_name)
+        return True
+
+    @synchronized
+    def get_results(self, section_name, file):
+        """
+        Returns the results the local bears of a section yielded on a file
+        when it was last analyzed. They are only valid if the file didn't
+        change since, see ``get_uncached_files``.
+
+        :param section_name: The name of the section.
+        :param file:         The name of the file.
+        :return:             A list of results.
+        """
+        return self.results.get((section_name, file), [])
+
+    def content_changed(self, section_name, file):
+        """
+        Checks whether the contents of a file changed since a section last
+        analyzed it, recording its current fingerprint for the section.
+
+        The fingerprint of a file consists of its size, its modification time
+        and a hash of its contents. The contents are only hashed if the size
+        or modification time changed, or if the file was modified in the same
+        second the last run started, as that modification may have been
+        missed.
+
+        :param section_name: The name of the section.
+        :param file:         The name of the file.
+        :return:             True if the file is new, untracked or its
+                             contents changed.
+        """
+        key = (section_name, file)
+        last_time = self.data.get(key, -1)
+        try:
+            stat = os.stat(file)
+        except OSError:
+            self.fingerprints.pop(key, None)
+            self.changed_fingerprints.add(key)
+            return True
+
+        fingerprint = self.fingerprints.get(key)
+        if (fingerprint is not None and
+                fingerprint[:2] == (stat.st_size, stat.st_mtime_ns) and
+                int(stat.st_mtime) < last_time):
+            return False
+
+        try:
+            digest = hash_file(file)
+        except OSError:
+            self.fingerprints.pop(key, None)
+            self.changed_fingerprints.add(key)
+            return True
+
+        self.fingerprints[key] = (stat.st_size, stat.st_mtime_ns, digest)
+        self.changed_fingerprints.add(key)
+        return (last_time == -1 or
+                fingerprint is None or
+                fingerprint[2] != digest)
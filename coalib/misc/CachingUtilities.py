@@ -1,9 +1,14 @@
 import hashlib
+import logging
 import os
 import pickle
 
 from coalib.misc import Constants
 
+# The default limits of the cache database, see ``get_cache_limits``.
+DEFAULT_CACHE_MAX_AGE = 90
+DEFAULT_CACHE_MAX_SIZE = 512
+
 
 def get_data_path(log_printer, identifier):
     """
@@ -127,69 +132,109 @@ def hash_id(text):
     return hashlib.md5(text.encode('utf-8')).hexdigest()
 
 
-def get_settings_hash(sections,
-                      targets=[],
-                      ignore_settings: list=['disable_caching']):
+def hash_file(filename):
+    """
+    Hashes the contents of the given file.
+
+    :param filename: The name of the file.
+    :return:         A MD5 hash of the contents of the file.
+    """
+    digest = hashlib.md5()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_bear_settings_hash(bear, section):
     """
-    Compute and return a unique hash for the settings.
+    Compute a hash of the settings a bear takes from a section, i.e. the
+    parameters of its ``run`` method.
 
-    :param sections:        A dict containing the settings for each section.
-    :param targets:         The list of sections that are enabled.
-    :param ignore_settings: Setting keys to remove from sections before
-                            hashing.
-    :return:                A MD5 hash that is unique to the settings used.
+    :param bear:    The bear class or instance.
+    :param section: The section the bear runs in.
+    :return:        A MD5 hash that is unique to the bear and its settings.
     """
-    settings = []
-    for section in sections:
-        if section in targets or targets == []:
-            section_copy = sections[section].copy()
-            for setting in ignore_settings:
-                try:
-                    section_copy.__getitem__(setting, ignore_defaults=True)
-                    section_copy.delete_setting(setting)
-                except IndexError:
-                    continue
-            settings.append(str(section_copy))
+    metadata = bear.get_metadata()
+    settings = [bear.name]
+    for name in sorted(set(metadata.non_optional_params) |
+                       set(metadata.optional_params)):
+        if name in section:
+            settings.append((name, str(section[name])))
 
     return hash_id(str(settings))
 
 
-def settings_changed(log_printer, settings_hash):
+def get_section_settings_hash(section, local_bears):
     """
-    Determine if the settings have changed since the last run with caching.
+    Compute a hash of the settings the local bears of a section take, so
+    their cached results are only invalidated if one of these settings
+    changes or a bear is added or removed.
 
-    :param log_printer:   A LogPrinter object to use for logging.
-    :param settings_hash: A MD5 hash that is unique to the settings used.
-    :return:              Return True if the settings hash has changed
-                          Return False otherwise.
+    Global bears are always run, so their settings don't matter.
+
+    :param section:     The section.
+    :param local_bears: The local bears running in the section.
+    :return:            A MD5 hash that is unique to the local bears and their
+                        settings.
     """
-    project_hash = hash_id(os.getcwd())
+    return hash_id(str(sorted(get_bear_settings_hash(bear, section)
+                              for bear in local_bears)))
 
-    settings_hash_db = pickle_load(log_printer, 'settings_hash_db', {})
-    if project_hash not in settings_hash_db:
-        # This is the first time coala is run on this project, so the cache
-        # will be flushed automatically.
-        return False
 
-    result = settings_hash_db[project_hash] != settings_hash
-    if result:
-        del settings_hash_db[project_hash]
-        log_printer.debug('Since the configuration settings have '
-                          'changed since the last run, the '
-                          'cache will be flushed and rebuilt.')
+def settings_changed(log_printer, settings_hash):
+    """
+    Deprecated, the settings of each section are compared by
+    ``FileCache.section_settings_changed`` instead.
 
-    return result
+    :param log_printer:   A LogPrinter object to use for logging.
+    :param settings_hash: A MD5 hash that is unique to the settings used.
+    :return:              False, so the cache isn't flushed.
+    """
+    logging.warning('settings_changed is deprecated and will be removed. '
+                    'Settings are compared per section by '
+                    '`FileCache.section_settings_changed`.')
+    return False
 
 
 def update_settings_db(log_printer, settings_hash):
     """
-    Update the config file last modification date.
+    Deprecated, the settings of each section are stored by ``FileCache``
+    instead. Does nothing.
 
     :param log_printer:   A LogPrinter object to use for logging.
     :param settings_hash: A MD5 hash that is unique to the settings used.
     """
-    project_hash = hash_id(os.getcwd())
+    logging.warning('update_settings_db is deprecated and will be removed. '
+                    'Settings are stored per section by `FileCache`.')
+
+
+def get_cache_limits(section, log_printer):
+    """
+    Retrieves the limits of the caches of all projects from the
+    ``cache_max_age`` setting in days and the ``cache_max_size`` setting in
+    megabytes of the given section. A limit of ``0`` disables it.
+
+    :param section:     The section to read the settings from.
+    :param log_printer: The log printer to warn to.
+    :return:            A tuple of the maximum age in seconds and the maximum
+                        size in bytes, or ``None`` for disabled limits. See
+                        ``CacheDatabase.collect_garbage``.
+    """
+    limits = []
+    for key, default, unit in (('cache_max_age', DEFAULT_CACHE_MAX_AGE,
+                                24 * 60 * 60),
+                               ('cache_max_size', DEFAULT_CACHE_MAX_SIZE,
+                                1024 * 1024)):
+        try:
+            limit = float(section[key])
+        except ValueError:
+            log_printer.warn("Unable to convert setting '{}' into a number. "
+                             'Falling back to {}.'.format(key, default))
+            limit = default
+        except IndexError:
+            limit = default
+
+        limits.append(int(limit * unit) if limit > 0 else None)
 
-    settings_hash_db = pickle_load(log_printer, 'settings_hash_db', {})
-    settings_hash_db[project_hash] = settings_hash
-    pickle_dump(log_printer, 'settings_hash_db', settings_hash_db)
+    return tuple(limits)
@@ -1,7 +1,9 @@
 from contextlib import contextmanager
+import os
 import platform
 import shlex
-from subprocess import PIPE, Popen
+import signal
+from subprocess import DEVNULL, PIPE, Popen, call
 from shutil import which
 
 
@@ -46,8 +48,25 @@ class ShellCommandResult(tuple):
         self.code = code
 
 
+def kill_process_group(process):
+    """
+    Kills a process started by :func:`run_interactive_shell_command` along
+    with all processes it started.
+
+    :param process: The ``subprocess.Popen`` object of the process.
+    """
+    if platform.system() == 'Windows':  # pragma posix: no cover
+        call(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+             stdout=DEVNULL, stderr=DEVNULL)
+    else:  # pragma nt: no cover
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
 @contextmanager
-def run_interactive_shell_command(command, **kwargs):
+def run_interactive_shell_command(command, new_session=False, **kwargs):
     """
     Runs a single command in shell and provides stdout, stderr and stdin
     streams.
@@ -62,6 +81,11 @@ def run_interactive_shell_command(command, **kwargs):
     the contents of the streams you should retrieve them before the context
     manager exits.
 
+    With ``new_session=True`` the process is started in its own session on
+    POSIX systems. If an exception is raised inside the context then, the
+    process and all processes it started are killed instead of being waited
+    for.
+
     >>> with run_interactive_shell_command(["echo", "TEXT"]) as p:
     ...     stdout = p.stdout
     ...     stdout_text = stdout.read()
@@ -82,16 +106,20 @@ def run_interactive_shell_command(command, **kwargs):
     >>> stream.closed
     False
 
-    :param command: The command to run on shell. This parameter can either
-                    be a sequence of arguments that are directly passed to
-                    the process or a string. A string gets splitted beforehand
-                    using ``shlex.split()``. If providing ``shell=True`` as a
-                    keyword-argument, no ``shlex.split()`` is performed and the
-                    command string goes directly to ``subprocess.Popen()``.
-    :param kwargs:  Additional keyword arguments to pass to
-                    ``subprocess.Popen`` that are used to spawn the process.
-    :return:        A context manager yielding the process started from the
-                    command.
+    :param command:     The command to run on shell. This parameter can
+                        either be a sequence of arguments that are directly
+                        passed to the process or a string. A string gets
+                        splitted beforehand using ``shlex.split()``. If
+                        providing ``shell=True`` as a keyword-argument, no
+                        ``shlex.split()`` is performed and the command string
+                        goes directly to ``subprocess.Popen()``.
+    :param new_session: Whether to start the process in its own session, so it
+                        can be killed along with all processes it started.
+    :param kwargs:      Additional keyword arguments to pass to
+                        ``subprocess.Popen`` that are used to spawn the
+                        process.
+    :return:            A context manager yielding the process started from
+                        the command.
     """
     if not kwargs.get('shell', False) and isinstance(command, str):
         command = shlex.split(command)
@@ -107,11 +135,20 @@ def run_interactive_shell_command(command, **kwargs):
             'stderr': PIPE,
             'stdin': PIPE,
             'universal_newlines': True}
+    if new_session:
+        # Ignored on Windows.
+        args['start_new_session'] = True
     args.update(kwargs)
 
     process = Popen(command, **args)
     try:
         yield process
+    except BaseException:
+        # Don't wait for the command if the caller was interrupted, e.g. by
+        # the time limit of a bear.
+        if new_session:
+            kill_process_group(process)
+        raise
     finally:
         if args['stdout'] is PIPE:
             process.stdout.close()
@@ -123,7 +160,7 @@ def run_interactive_shell_command(command, **kwargs):
         process.wait()
 
 
-def run_shell_command(command, stdin=None, **kwargs):
+def run_shell_command(command, stdin=None, new_session=False, **kwargs):
     """
     Runs a single command in shell and returns the read stdout and stderr data.
 
@@ -133,15 +170,18 @@ def run_shell_command(command, stdin=None, **kwargs):
 
     See also ``run_interactive_shell_command()``.
 
-    :param command: The command to run on shell. This parameter can either
-                    be a sequence of arguments that are directly passed to
-                    the process or a string. A string gets splitted beforehand
-                    using ``shlex.split()``.
-    :param stdin:   Initial input to send to the process.
-    :param kwargs:  Additional keyword arguments to pass to
-                    ``subprocess.Popen`` that is used to spawn the process.
-    :return:        A tuple with ``(stdoutstring, stderrstring)``.
+    :param command:     The command to run on shell. This parameter can
+                        either be a sequence of arguments that are directly
+                        passed to the process or a string. A string gets
+                        splitted beforehand using ``shlex.split()``.
+    :param stdin:       Initial input to send to the process.
+    :param new_session: Whether to start the process in its own session, so it
+                        can be killed along with all processes it started.
+    :param kwargs:      Additional keyword arguments to pass to
+                        ``subprocess.Popen`` that is used to spawn the
+                        process.
+    :return:            A tuple with ``(stdoutstring, stderrstring)``.
     """
-    with run_interactive_shell_command(command, **kwargs) as p:
+    with run_interactive_shell_command(command, new_session, **kwargs) as p:
         ret = p.communicate(stdin)
     return ShellCommandResult(p.returncode, *ret)
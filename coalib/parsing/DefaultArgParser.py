@@ -1,6 +1,8 @@
 import argparse
 
 from coalib.misc import Constants
+from coalib.misc.CachingUtilities import (
+    DEFAULT_CACHE_MAX_AGE, DEFAULT_CACHE_MAX_SIZE)
 from coalib.collecting.Collectors import get_all_bears_names
 
 
@@ -129,6 +131,23 @@ To run coala without user interaction, run the `coala --non-interactive`,
     config_group.add_argument(
         '--flush-cache', const=True, action='store_const',
         help='rebuild the file cache')
+    config_group.add_argument(
+        '--cache-content-hashes', const=True, action='store_const',
+        help='detect changed files by their contents instead of their '
+             'modification times')
+    config_group.add_argument(
+        '--cache-max-age', type=float, metavar='DAYS',
+        help='evict the caches of projects not analyzed for this many days, '
+             '0 to keep them (default {})'.format(DEFAULT_CACHE_MAX_AGE))
+    config_group.add_argument(
+        '--cache-max-size', type=float, metavar='MB',
+        help='evict the caches of the least recently analyzed projects once '
+             'all caches take more megabytes, 0 for no limit (default '
+             '{})'.format(DEFAULT_CACHE_MAX_SIZE))
+    config_group.add_argument(
+        '--cache-gc', const=True, action='store_const',
+        help='evict stale caches of all projects and compact the cache, then '
+             'exit')
     config_group.add_argument(
         '--no-autoapply-warn', const=True, action='store_const',
         help='turn off warning about patches not being auto applicable')
@@ -226,6 +245,15 @@ To run coala without user interaction, run the `coala --non-interactive`,
         '-j', '--jobs', type=int,
         help='number of jobs to use in parallel')
 
+    misc_group.add_argument(
+        '--persistent-workers', const=True, action='store_const',
+        help='reuse the same processes for running bears of all sections')
+
+    misc_group.add_argument(
+        '--concurrent-sections', const=True, action='store_const',
+        help='run sections that check different files at the same time, '
+             'sharing the number of jobs between them')
+
     misc_group.add_argument(
         '-n', '--no-orig', const=True, action='store_const',
         help="don't create .orig backup files before patching")
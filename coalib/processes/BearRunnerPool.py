@@ -0,0 +1,178 @@
+import copy
+from itertools import chain
+import multiprocessing
+
+from coalib.processes.BearRunning import run
+
+
+def detach_bears(bear_list):
+    """
+    Copies the given bears without their message queues, so they can be sent
+    through a queue to another process.
+
+    :param bear_list: A list of bear instances. Elements that are not bears
+                      are kept as they are.
+    :return:          A list of shallow bear copies whose ``message_queue`` is
+                      ``None``.
+    """
+    detached = []
+    for bear in bear_list:
+        if hasattr(bear, 'message_queue'):
+            bear = copy.copy(bear)
+            bear.message_queue = None
+        detached.append(bear)
+
+    return detached
+
+
+def run_jobs(job_queue,
+             file_name_queue,
+             global_bear_queue,
+             message_queue,
+             control_queue):
+    """
+    Executes ``BearRunning.run`` for every job received until ``None`` is
+    received. This is the method that is actually run by the processes of a
+    ``BearRunnerPool``.
+
+    :param job_queue:         queue (read) of dicts with the keyword
+                              arguments for ``BearRunning.run`` except the
+                              queues.
+    :param file_name_queue:   queue (read) of file names to check with local
+                              bears.
+    :param global_bear_queue: queue (read, write) of global bear groups.
+    :param message_queue:     queue (write) for debug/warning/error messages.
+                              It is attached to the bears of each job. A
+                              ``None`` is put after the messages of each
+                              job.
+    :param control_queue:     queue (write) for control elements.
+    """
+    for job in iter(job_queue.get, None):
+        for bear in chain(job['local_bear_list'], job['global_bear_list']):
+            bear.message_queue = message_queue
+
+        try:
+            run(file_name_queue=file_name_queue,
+                global_bear_queue=global_bear_queue,
+                message_queue=message_queue,
+                control_queue=control_queue,
+                **job)
+        finally:
+            # Marks the end of the messages of this job, so the section's
+            # ``LogPrinterThread`` prints all of them before it stops.
+            message_queue.put(None)
+
+
+class PooledProcess:
+    """
+    A handle for a process of a ``BearRunnerPool`` that behaves like a
+    ``multiprocessing.Process`` running ``BearRunning.run`` once.
+    """
+
+    def __init__(self, process, job_queue, job):
+        """
+        :param process:   The pool process to run the job on.
+        :param job_queue: The job queue of that process.
+        :param job:       The keyword arguments for ``BearRunning.run``.
+        """
+        self.process = process
+        self.job_queue = job_queue
+        self.job = job
+
+    def start(self):
+        """
+        Sends the job to the pool process.
+        """
+        self.job_queue.put(self.job)
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def join(self):
+        """
+        Does nothing, the pool process keeps running for further jobs. It
+        marks the end of the messages of its job on the message queue
+        instead, see ``run_jobs``.
+        """
+
+
+class BearRunnerPool:
+    """
+    A pool of processes running bears which can be reused for executing
+    several sections, so the processes and queues are only set up once:
+
+    >>> with BearRunnerPool() as pool:
+    ...     len(pool.processes)
+    0
+
+    Processes are started lazily by ``get_processes`` whenever a section
+    needs more of them than there are already.
+    """
+
+    # Keys of the ``BearRunning.run`` arguments that are owned by the pool.
+    QUEUE_ARGS = ('file_name_queue', 'global_bear_queue', 'message_queue',
+                  'control_queue')
+
+    def __init__(self):
+        self.file_name_queue = multiprocessing.Queue()
+        self.global_bear_queue = multiprocessing.Queue()
+        self.message_queue = multiprocessing.Queue()
+        self.control_queue = multiprocessing.Queue()
+
+        self.processes = []
+        self.job_queues = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def get_processes(self, job_count, bear_runner_args):
+        """
+        Creates handles to run ``BearRunning.run`` on ``job_count`` pool
+        processes, starting new ones if needed.
+
+        :param job_count:        The number of processes to use.
+        :param bear_runner_args: The arguments for ``BearRunning.run``. The
+                                 queues have to be the ones of this pool and
+                                 results have to be piped.
+        :return:                 A list of ``PooledProcess`` instances.
+        """
+        while len(self.processes) < job_count:
+            job_queue = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=run_jobs,
+                args=(job_queue,
+                      self.file_name_queue,
+                      self.global_bear_queue,
+                      self.message_queue,
+                      self.control_queue),
+                daemon=True)
+            process.start()
+
+            self.processes.append(process)
+            self.job_queues.append(job_queue)
+
+        job = {key: value
+               for key, value in bear_runner_args.items()
+               if key not in self.QUEUE_ARGS}
+        job['local_bear_list'] = detach_bears(job['local_bear_list'])
+        job['global_bear_list'] = detach_bears(job['global_bear_list'])
+
+        return [PooledProcess(process, job_queue, job)
+                for process, job_queue in zip(self.processes[:job_count],
+                                              self.job_queues)]
+
+    def close(self):
+        """
+        Stops all processes of the pool after they finished their jobs.
+        """
+        for job_queue in self.job_queues:
+            job_queue.put(None)
+
+        for process in self.processes:
+            process.join()
+
+        self.processes = []
+        self.job_queues = []
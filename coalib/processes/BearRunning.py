@@ -1,4 +1,10 @@
+from contextlib import contextmanager
+import os
 import queue
+import signal
+import sys
+import threading
+import time
 import traceback
 
 from coalib.bears.BEAR_KIND import BEAR_KIND
@@ -9,6 +15,10 @@ from coalib.processes.communication.LogMessage import LOG_LEVEL, LogMessage
 from coalib.processes.CONTROL_ELEMENT import CONTROL_ELEMENT
 from coalib.results.Result import Result
 
+# Seconds to sleep between checks whether the dependencies of a global bear,
+# run by another process, are finished.
+DEPENDENCY_POLL_INTERVAL = 0.01
+
 
 def send_msg(message_queue, timeout, log_level, *args, delimiter=' ', end=''):
     """
@@ -76,6 +86,61 @@ def validate_results(message_queue, timeout, result_list, name, args, kwargs):
     return result_list
 
 
+class BearTimeoutError(BaseException):
+    """
+    Raised inside a bear that exceeded its time budget. It is no ``Exception``
+    so bears don't catch it by accident.
+    """
+
+
+@contextmanager
+def time_limit(seconds):
+    """
+    Raises ``BearTimeoutError`` in the code running inside the context after
+    the given time. Shell commands started with
+    ``coalib.misc.Shell.run_interactive_shell_command`` in the context are
+    killed along with their process group then.
+
+    The limit is only enforced on platforms supporting ``SIGALRM`` and in the
+    main thread, otherwise the code runs without a limit.
+
+    :param seconds: The time in seconds. ``0`` disables the limit.
+    """
+    if (not seconds or not hasattr(signal, 'setitimer') or
+            threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+
+    def handle_alarm(signum, frame):
+        raise BearTimeoutError
+
+    previous_handler = signal.signal(signal.SIGALRM, handle_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def get_time_budget(bear_instance):
+    """
+    Retrieves the time a bear may take for one run from the ``bear_timeout``
+    setting of its section.
+
+    :param bear_instance: The bear instance.
+    :return:              The time in seconds or ``0`` if there is no limit.
+    """
+    section = getattr(bear_instance, 'section', None)
+    if section is None:
+        return 0
+
+    try:
+        return max(float(section.get('bear_timeout', 0)), 0)
+    except ValueError:
+        return 0
+
+
 def run_bear(message_queue, timeout, bear_instance, *args, debug=False,
              **kwargs):
     """
@@ -94,15 +159,32 @@ def run_bear(message_queue, timeout, bear_instance, *args, debug=False,
     :param kwargs:        The keyword arguments that are to be passed to the
                           bear.
     :return:              Returns a valid list of objects of the type Result
-                          if the bear executed successfully. None otherwise.
+                          if the bear executed successfully. None otherwise,
+                          also if the bear exceeded the time given by the
+                          ``bear_timeout`` setting.
     """
     if kwargs.get('dependency_results', True) is None:
         del kwargs['dependency_results']
 
     name = bear_instance.name
+    time_budget = get_time_budget(bear_instance)
 
     try:
-        result_list = bear_instance.execute(*args, debug=debug, **kwargs)
+        with time_limit(time_budget):
+            result_list = bear_instance.execute(*args, debug=debug, **kwargs)
+    except BearTimeoutError:
+        send_msg(message_queue,
+                 timeout,
+                 LOG_LEVEL.WARNING,
+                 'The bear {bear} exceeded its time budget of {budget} '
+                 'seconds{on_file} and was cancelled. Continuing with the '
+                 'remaining work...'
+                 .format(bear=name,
+                         budget=time_budget,
+                         on_file=' on file {}'.format(args[0]) if args
+                         else ''))
+
+        return None
     except (Exception, SystemExit) as exc:
         if debug and not isinstance(exc, SystemExit):
             raise
@@ -259,7 +341,8 @@ def run_local_bears_on_file(message_queue,
                             local_result_dict,
                             control_queue,
                             filename,
-                            debug=False):
+                            debug=False,
+                            pipe_results=False):
     """
     This method runs a list of local bears on one file.
 
@@ -279,7 +362,13 @@ def run_local_bears_on_file(message_queue,
                               what kind of event happened) and either a bear
                               name(for global results) or a file name to
                               indicate the result will be put to the queue.
+                              If any bear failed or exceeded its time budget,
+                              a (CONTROL_ELEMENT.LOCAL_FAILED, filename) tuple
+                              is put before, as the results are incomplete.
     :param filename:          The name of file on which to run the bears.
+    :param pipe_results:      Whether to send the results along with the
+                              control element instead of storing them in the
+                              ``local_result_dict``.
     """
     if filename not in file_dict:
         send_msg(message_queue,
@@ -296,6 +385,7 @@ def run_local_bears_on_file(message_queue,
         return
 
     local_result_list = []
+    failed = False
     for bear_instance in local_bear_list:
         result = run_local_bear(message_queue,
                                 timeout,
@@ -304,11 +394,20 @@ def run_local_bears_on_file(message_queue,
                                 bear_instance,
                                 filename,
                                 debug=debug)
-        if result is not None:
+        if result is None:
+            failed = True
+        else:
             local_result_list.extend(result)
 
-    local_result_dict[filename] = local_result_list
-    control_queue.put((CONTROL_ELEMENT.LOCAL, filename))
+    if failed:
+        control_queue.put((CONTROL_ELEMENT.LOCAL_FAILED, filename))
+
+    if pipe_results:
+        control_queue.put((CONTROL_ELEMENT.LOCAL_RESULTS,
+                           (filename, local_result_list)))
+    else:
+        local_result_dict[filename] = local_result_list
+        control_queue.put((CONTROL_ELEMENT.LOCAL, filename))
 
 
 def get_global_dependency_results(global_result_dict, bear_instance):
@@ -342,37 +441,42 @@ def get_global_dependency_results(global_result_dict, bear_instance):
     return dependency_results
 
 
-def get_next_global_bear(timeout,
-                         global_bear_queue,
+def get_next_global_bear(waiting,
                          global_bear_list,
-                         global_result_dict):
+                         global_result_dict,
+                         wait=False):
     """
-    Retrieves the next global bear.
+    Retrieves the next global bear whose dependencies are finished.
 
-    :param timeout:            The queue blocks at most timeout seconds for a
-                               free slot to execute the put operation on. After
-                               the timeout it returns queue Full exception.
-    :param global_bear_queue:  queue (read, write) of indexes of global bear
-                               instances in the global_bear_list.
+    :param waiting:            A list of indexes of global bear instances in
+                               the global_bear_list taken from the queue by
+                               this process. The index of the returned bear
+                               is removed from it.
     :param global_bear_list:   A list containing all global bears to be
                                executed.
     :param global_result_dict: A Manager.dict that will be used to store global
                                results. The list of results of one global bear
                                will be stored with the bear name as key.
-    :return:                   (bear, bearname, dependency_results)
+    :param wait:               Whether to wait for the dependencies other
+                               processes are running if no bear is ready yet.
+    :return:                   (bear, dependency_results) or ``None`` if no
+                               bear is ready.
     """
-    dependency_results = False
+    while waiting:
+        for bear_id in waiting:
+            bear = global_bear_list[bear_id]
+            dependency_results = (
+                get_global_dependency_results(global_result_dict, bear))
+            if dependency_results is not False:
+                waiting.remove(bear_id)
+                return bear, dependency_results
 
-    while dependency_results is False:
-        bear_id = global_bear_queue.get(timeout=timeout)
-        bear = global_bear_list[bear_id]
+        if not wait:
+            break
 
-        dependency_results = (
-            get_global_dependency_results(global_result_dict, bear))
-        if dependency_results is False:
-            global_bear_queue.put(bear_id)
+        time.sleep(DEPENDENCY_POLL_INTERVAL)
 
-    return bear, dependency_results
+    return None
 
 
 def task_done(obj):
@@ -386,6 +490,64 @@ def task_done(obj):
         obj.task_done()
 
 
+def get_rss():
+    """
+    Retrieves the current resident set size of the current process.
+
+    Where it is not available, the peak resident set size is used instead.
+    A forked process inherits it from its parent, so only compare the growth
+    of the returned size.
+
+    :return: The resident set size in megabytes or ``None`` if it is not
+             available on this platform.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def should_retire(files_checked,
+                  max_files_per_worker=0,
+                  max_worker_rss=0,
+                  start_rss=0):
+    """
+    Checks whether a process has reached one of its limits and should be
+    replaced by a fresh one.
+
+    :param files_checked:        The number of files the process checked.
+    :param max_files_per_worker: The number of files after which to retire,
+                                 ``0`` for no limit.
+    :param max_worker_rss:       The growth of the resident set size in
+                                 megabytes from which on to retire, ``0`` for
+                                 no limit.
+    :param start_rss:            The resident set size in megabytes the
+                                 process had when it started, as returned by
+                                 ``get_rss``.
+    :return:                     True if the process should retire.
+    """
+    if max_files_per_worker and files_checked >= max_files_per_worker:
+        return True
+
+    if max_worker_rss:
+        rss = get_rss()
+        return (rss is not None and start_rss is not None and
+                rss - start_rss >= max_worker_rss)
+
+    return False
+
+
 def run_local_bears(filename_queue,
                     message_queue,
                     timeout,
@@ -393,12 +555,19 @@ def run_local_bears(filename_queue,
                     local_bear_list,
                     local_result_dict,
                     control_queue,
-                    debug=False):
+                    debug=False,
+                    pipe_results=False,
+                    max_files_per_worker=0,
+                    max_worker_rss=0):
     """
     Run local bears on all the files given.
 
     :param filename_queue:    queue (read) of file names to check with
-                              local bears.
+                              local bears. Instead of a single file name, an
+                              element may be a tuple of file names to check
+                              as a batch. ``None`` marks the end of the queue
+                              for one process, so it doesn't have to wait for
+                              the timeout.
     :param message_queue:     A queue that contains messages of type
                               errors/warnings/debug statements to be printed
                               in the Log.
@@ -415,21 +584,128 @@ def run_local_bears(filename_queue,
                               what kind of event happened) and either a bear
                               name(for global results) or a file name to
                               indicate the result will be put to the queue.
+    :param pipe_results:      Whether to send the results along with the
+                              control elements instead of storing them in the
+                              ``local_result_dict``.
+    :param max_files_per_worker:
+                              Stop after checking that many files, ``0`` for
+                              no limit.
+    :param max_worker_rss:    Stop once the resident set size of the process
+                              grew by that many megabytes since it started,
+                              ``0`` for no limit.
+    :return:                  True if a limit was reached before all files
+                              were checked, False otherwise.
     """
+    files_checked = 0
+    # Memory the process inherited when it was forked doesn't count.
+    start_rss = get_rss() if max_worker_rss else 0
     try:
         while True:
-            filename = filename_queue.get(timeout=timeout)
-            run_local_bears_on_file(message_queue,
-                                    timeout,
-                                    file_dict,
-                                    local_bear_list,
-                                    local_result_dict,
-                                    control_queue,
-                                    filename,
-                                    debug=debug)
+            filenames = filename_queue.get(timeout=timeout)
+            if filenames is None:
+                return False
+            if isinstance(filenames, str):
+                filenames = (filenames,)
+
+            for filename in filenames:
+                run_local_bears_on_file(message_queue,
+                                        timeout,
+                                        file_dict,
+                                        local_bear_list,
+                                        local_result_dict,
+                                        control_queue,
+                                        filename,
+                                        debug=debug,
+                                        pipe_results=pipe_results)
             task_done(filename_queue)
+
+            files_checked += len(filenames)
+            if should_retire(files_checked,
+                             max_files_per_worker,
+                             max_worker_rss,
+                             start_rss):
+                return True
     except queue.Empty:
-        return
+        return False
+
+
+def send_global_results(global_result_dict,
+                        control_queue,
+                        bearname,
+                        result,
+                        pipe_results=False):
+    """
+    Stores the results of a global bear and notifies the control queue about
+    them.
+
+    :param global_result_dict: A dict that will be used to store global
+                               results. The list of results of one global bear
+                               will be stored with the bear name as key.
+    :param control_queue:      If any result gets written to the result_dict a
+                               tuple containing a CONTROL_ELEMENT and the bear
+                               name will be put to the queue.
+    :param bearname:           The name of the global bear.
+    :param result:             The list of results of the bear or ``None`` if
+                               it failed.
+    :param pipe_results:       Whether to send the results along with the
+                               control element. They are still stored in the
+                               ``global_result_dict`` as dependants may need
+                               them.
+    """
+    if result:
+        global_result_dict[bearname] = result
+        if pipe_results:
+            control_queue.put((CONTROL_ELEMENT.GLOBAL_RESULTS,
+                               (bearname, result)))
+        else:
+            control_queue.put((CONTROL_ELEMENT.GLOBAL, bearname))
+    else:
+        global_result_dict[bearname] = None
+
+
+def run_waiting_global_bears(message_queue,
+                             timeout,
+                             waiting,
+                             global_bear_list,
+                             global_result_dict,
+                             control_queue,
+                             debug=False,
+                             wait=False):
+    """
+    Runs the global bears taken from the queue whose dependencies are
+    finished.
+
+    :param message_queue:      A queue that contains messages of type
+                               errors/warnings/debug statements to be printed
+                               in the Log.
+    :param timeout:            The queue blocks at most timeout seconds for a
+                               free slot to execute the put operation on. After
+                               the timeout it returns queue Full exception.
+    :param waiting:            A list of indexes of global bear instances in
+                               the global_bear_list taken from the queue by
+                               this process.
+    :param global_bear_list:   list of global bear instances
+    :param global_result_dict: A Manager.dict that will be used to store global
+                               results. The list of results of one global bear
+                               will be stored with the bear name as key.
+    :param control_queue:      If any result gets written to the result_dict a
+                               tuple containing a CONTROL_ELEMENT and the bear
+                               name will be put to the queue.
+    :param wait:               Whether to wait until all bears in ``waiting``
+                               were run.
+    """
+    next_bear = get_next_global_bear(waiting, global_bear_list,
+                                     global_result_dict, wait=wait)
+    while next_bear is not None:
+        bear, dep_results = next_bear
+        result = run_global_bear(message_queue, timeout, bear, dep_results,
+                                 debug=debug)
+        send_global_results(global_result_dict,
+                            control_queue,
+                            bear.__class__.__name__,
+                            result)
+        next_bear = get_next_global_bear(waiting, global_bear_list,
+                                         global_result_dict, wait=wait)
 
 
 def run_global_bears(message_queue,
@@ -438,7 +714,8 @@ def run_global_bears(message_queue,
                      global_bear_list,
                      global_result_dict,
                      control_queue,
-                     debug=False):
+                     debug=False,
+                     pipe_results=False):
     """
     Run all global bears.
 
@@ -449,7 +726,14 @@ def run_global_bears(message_queue,
                                free slot to execute the put operation on. After
                                the timeout it returns queue Full exception.
     :param global_bear_queue:  queue (read, write) of indexes of global bear
-                               instances in the global_bear_list.
+                               instances in the global_bear_list. If
+                               ``pipe_results`` is set, it holds tuples of
+                               indexes instead, each one containing a group of
+                               global bears and all their dependencies, and
+                               ``None`` marks the end of the queue for one
+                               process. Without ``pipe_results``, ``None``
+                               marks the end of the queue for one process as
+                               well.
     :param global_bear_list:   list of global bear instances
     :param global_result_dict: A Manager.dict that will be used to store global
                                results. The list of results of one global bear
@@ -459,25 +743,53 @@ def run_global_bears(message_queue,
                                what kind of event happened) and either a bear
                                name(for global results) or a file name to
                                indicate the result will be put to the queue.
+    :param pipe_results:       Whether to send the results along with the
+                               control elements. The ``global_result_dict`` is
+                               then private to this process.
     """
+    # Bears whose dependencies are still running are kept here instead of
+    # being put back to the queue, where they could end up behind the end
+    # markers of all processes.
+    waiting = []
     try:
         while True:
-            bear, dep_results = (
-                get_next_global_bear(timeout,
-                                     global_bear_queue,
-                                     global_bear_list,
-                                     global_result_dict))
-            bearname = bear.__class__.__name__
-            result = run_global_bear(message_queue, timeout, bear, dep_results,
-                                     debug=debug)
-            if result:
-                global_result_dict[bearname] = result
-                control_queue.put((CONTROL_ELEMENT.GLOBAL, bearname))
+            if pipe_results:
+                # A group is ordered so that all dependencies of a bear were
+                # run by this process before.
+                group = global_bear_queue.get(timeout=timeout)
+                if group is None:
+                    return
+
+                for bear_id in group:
+                    bear = global_bear_list[bear_id]
+                    dep_results = get_global_dependency_results(
+                        global_result_dict, bear)
+                    result = run_global_bear(message_queue, timeout, bear,
+                                             dep_results, debug=debug)
+                    send_global_results(global_result_dict,
+                                        control_queue,
+                                        bear.__class__.__name__,
+                                        result,
+                                        pipe_results=True)
             else:
-                global_result_dict[bearname] = None
+                bear_id = global_bear_queue.get(timeout=timeout)
+                if bear_id is None:
+                    run_waiting_global_bears(message_queue, timeout, waiting,
+                                             global_bear_list,
+                                             global_result_dict,
+                                             control_queue, debug=debug,
+                                             wait=True)
+                    return
+
+                waiting.append(bear_id)
+                run_waiting_global_bears(message_queue, timeout, waiting,
+                                         global_bear_list, global_result_dict,
+                                         control_queue, debug=debug)
             task_done(global_bear_queue)
     except queue.Empty:
-        return
+        run_waiting_global_bears(message_queue, timeout, waiting,
+                                 global_bear_list, global_result_dict,
+                                 control_queue, debug=debug, wait=True)
 
 
 def run(file_name_queue,
@@ -490,7 +802,12 @@ def run(file_name_queue,
         message_queue,
         control_queue,
         timeout=0,
-        debug=False):
+        debug=False,
+        pipe_results=False,
+        overlap_global_bears=False,
+        max_files_per_worker=0,
+        max_worker_rss=0,
+        global_bears_done=False):
     """
     This is the method that is actually runs by processes.
 
@@ -510,7 +827,9 @@ def run(file_name_queue,
                                bears. Each invocation of the run method needs
                                one such queue which it checks with all the
                                local bears. The queue could be empty.
-                               (Repeat until queue empty.)
+                               (Repeat until queue empty.) Elements may also be
+                               tuples of file names which are checked as a
+                               batch.
     :param local_bear_list:    List of local bear instances.
     :param global_bear_list:   List of global bear instances.
     :param global_bear_queue:  queue (read, write) of indexes of global bear
@@ -539,26 +858,84 @@ def run(file_name_queue,
     :param timeout:            The queue blocks at most timeout seconds for a
                                free slot to execute the put operation on. After
                                the timeout it returns queue Full exception.
+    :param pipe_results:       If set, results are not stored in the result
+                               dicts for the parent process but are sent with
+                               the control elements instead, using
+                               CONTROL_ELEMENT.LOCAL_RESULTS and
+                               CONTROL_ELEMENT.GLOBAL_RESULTS with a tuple of
+                               the file or bear name and the list of results.
+                               The result dicts can be ordinary dicts then,
+                               and the global_bear_queue has to hold groups of
+                               global bears (see ``run_global_bears``).
+    :param overlap_global_bears:
+                               If set, global bears are run before the local
+                               ones, so long running global bears start right
+                               away while other processes check the files.
+                               (CONTROL_ELEMENT.GLOBAL_FINISHED, None) is put
+                               to the control queue before
+                               (CONTROL_ELEMENT.LOCAL_FINISHED, None) then.
+                               Requires ``pipe_results``, as the
+                               global_bear_queue must not run empty before
+                               all global bears are done.
+    :param max_files_per_worker:
+                               The number of files after which the process
+                               retires, ``0`` for no limit.
+    :param max_worker_rss:     The growth of the resident set size in
+                               megabytes from which on the process retires,
+                               ``0`` for no limit. A retiring process puts
+                               (CONTROL_ELEMENT.WORKER_RETIRED, None) to the
+                               control queue and stops without running any
+                               further bears or putting
+                               CONTROL_ELEMENT.LOCAL_FINISHED. A replacement
+                               process has to be started with the same
+                               arguments then, which continues with the
+                               remaining files.
+    :param global_bears_done:  Set for a replacement of a process that retired
+                               after it already ran its global bears (with
+                               ``overlap_global_bears``), so only local bears
+                               are run.
     """
-    try:
-        run_local_bears(file_name_queue,
-                        message_queue,
-                        timeout,
-                        file_dict,
-                        local_bear_list,
-                        local_result_dict,
-                        control_queue,
-                        debug=debug)
+    def local_phase():
+        retired = run_local_bears(file_name_queue,
+                                  message_queue,
+                                  timeout,
+                                  file_dict,
+                                  local_bear_list,
+                                  local_result_dict,
+                                  control_queue,
+                                  debug=debug,
+                                  pipe_results=pipe_results,
+                                  max_files_per_worker=max_files_per_worker,
+                                  max_worker_rss=max_worker_rss)
+        if retired:
+            control_queue.put((CONTROL_ELEMENT.WORKER_RETIRED, None))
+            return False
+
         control_queue.put((CONTROL_ELEMENT.LOCAL_FINISHED, None))
+        return True
 
+    def global_phase():
         run_global_bears(message_queue,
                          timeout,
                          global_bear_queue,
                          global_bear_list,
                          global_result_dict,
                          control_queue,
-                         debug=debug)
+                         debug=debug,
+                         pipe_results=pipe_results)
         control_queue.put((CONTROL_ELEMENT.GLOBAL_FINISHED, None))
+        return True
+
+    phases = [local_phase, global_phase]
+    if overlap_global_bears:
+        phases.reverse()
+    if global_bears_done:
+        phases.remove(global_phase)
+
+    try:
+        for phase in phases:
+            if not phase():
+                break
     except (OSError, KeyboardInterrupt):  # pragma: no cover
         if debug:
             raise
@@ -1,3 +1,5 @@
 from coalib.misc.Enum import enum
 
-CONTROL_ELEMENT = enum('LOCAL', 'GLOBAL', 'LOCAL_FINISHED', 'GLOBAL_FINISHED')
+CONTROL_ELEMENT = enum('LOCAL', 'GLOBAL', 'LOCAL_FINISHED', 'GLOBAL_FINISHED',
+                       'LOCAL_RESULTS', 'GLOBAL_RESULTS', 'WORKER_RETIRED',
+                       'LOCAL_FAILED')
@@ -0,0 +1,66 @@
+from collections.abc import Mapping
+
+
+class LazyFileDict(Mapping):
+    """
+    A read-only dictionary of file names and file contents, reading each file
+    only when it is accessed for the first time.
+
+    Only the file names are pickled, so sending it to another process is
+    cheap and the process only reads the files it actually needs. Files that
+    can't be read as unicode are left out, like ``Processing.get_file_dict``
+    does:
+
+    >>> import os
+    >>> file_dict = LazyFileDict([os.devnull, 'does/not/exist'])
+    >>> file_dict[os.devnull]
+    ()
+    >>> 'does/not/exist' in file_dict
+    False
+    >>> len(file_dict)
+    1
+    """
+
+    def __init__(self, filenames, contents=None):
+        """
+        :param filenames: The names of the files to provide.
+        :param contents:  A dict of already known file contents, e.g. the ones
+                          read by the parent process. They are used as long as
+                          the dict isn't pickled.
+        """
+        self.filenames = tuple(filenames)
+        self._filename_set = frozenset(self.filenames)
+        self._contents = dict(contents or {})
+        self._unreadable = set()
+
+    def __getitem__(self, filename):
+        try:
+            return self._contents[filename]
+        except KeyError:
+            pass
+
+        if (filename not in self._filename_set or
+                filename in self._unreadable):
+            raise KeyError(filename)
+
+        try:
+            with open(filename, 'r', encoding='utf-8') as _file:
+                content = tuple(_file.readlines())
+        except (UnicodeDecodeError, OSError):
+            self._unreadable.add(filename)
+            raise KeyError(filename)
+
+        self._contents[filename] = content
+        return content
+
+    def __iter__(self):
+        return (filename for filename in self.filenames if filename in self)
+
+    def __len__(self):
+        return sum(1 for filename in self)
+
+    def __getstate__(self):
+        return {'filenames': self.filenames}
+
+    def __setstate__(self, state):
+        self.__init__(state['filenames'])
@@ -5,20 +5,42 @@ import threading
 class LogPrinterThread(threading.Thread):
     """
     This is the Thread object that outputs all log messages it gets from
-    its message_queue. Setting obj.running = False will stop within the next
-    0.1 seconds.
+    its message_queue. It stops as soon as it got ``None`` from the queue
+    once from every producer, see ``stop``. Setting obj.running = False will
+    stop within the next 0.1 seconds, dropping messages that are still
+    queued.
     """
 
-    def __init__(self, message_queue, log_printer):
+    def __init__(self, message_queue, log_printer, producer_count=1):
+        """
+        :param message_queue:  The queue to get the messages from.
+        :param log_printer:    The log printer to print the messages with.
+        :param producer_count: The number of ``None`` elements marking the
+                               end of messages to wait for. Processes that
+                               keep running after their messages were put,
+                               like the ones of a ``BearRunnerPool``, mark
+                               the end of their messages themselves.
+        """
         threading.Thread.__init__(self)
         self.running = True
         self.message_queue = message_queue
         self.log_printer = log_printer
+        self.producer_count = producer_count
+
+    def stop(self):
+        """
+        Makes the thread stop after it printed all messages queued so far.
+        """
+        self.message_queue.put(None)
 
     def run(self):
-        while self.running:
+        while self.running and self.producer_count > 0:
             try:
                 elem = self.message_queue.get(timeout=0.1)
-                self.log_printer.log_message(elem)
             except queue.Empty:
-                pass
+                continue
+
+            if elem is None:
+                self.producer_count -= 1
+            else:
+                self.log_printer.log_message(elem)
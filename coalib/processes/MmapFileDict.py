@@ -0,0 +1,127 @@
+from collections.abc import Mapping
+import mmap
+import os
+import tempfile
+import weakref
+
+
+def split_lines(text):
+    """
+    Splits a text into lines the way ``readlines`` on a text file does.
+
+    >>> split_lines('a\\nb')
+    ('a\\n', 'b')
+    >>> split_lines('a\\n')
+    ('a\\n',)
+    >>> split_lines('')
+    ()
+
+    :param text: The text to split.
+    :return:     A tuple of lines, all but the last one ending with ``\\n``.
+    """
+    lines = [line + '\n' for line in text.split('\n')]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+
+    return tuple(lines)
+
+
+class MmapFileDict(Mapping):
+    """
+    A read-only dictionary of file names and file contents, backed by a
+    single memory mapped file holding the contents of all files.
+
+    All processes using it map the same file, so they share one copy of the
+    project in the page cache instead of holding the contents of every file
+    themselves. Only the file name and an index of offsets are pickled. The
+    contents of a file are decoded whenever they are accessed and are not
+    kept, so a process only holds the files it currently works on.
+
+    The backing file is deleted when the instance it was created with is
+    garbage collected or at exit.
+    """
+
+    def __init__(self, path, index):
+        """
+        :param path:  The path of the file holding the contents of all files.
+        :param index: A dict mapping file names to tuples of the offset and
+                      length of their utf-8 encoded contents in that file.
+        """
+        self.path = path
+        self.index = index
+        self._map = None
+
+    @classmethod
+    def from_files(cls, filenames, directory=None):
+        """
+        Reads the given files into a new backing file. Files that can't be
+        read as unicode are left out, like ``LazyFileDict`` does.
+
+        :param filenames: The names of the files to store.
+        :param directory: The directory to create the backing file in.
+                          Defaults to the temporary directory.
+        :return:          A new ``MmapFileDict``.
+        """
+        index = {}
+        offset = 0
+        with tempfile.NamedTemporaryFile(prefix='coala_files_',
+                                         dir=directory,
+                                         delete=False) as store:
+            for filename in filenames:
+                try:
+                    with open(filename, 'r', encoding='utf-8') as _file:
+                        content = _file.read().encode('utf-8')
+                except (UnicodeDecodeError, OSError):
+                    continue
+
+                store.write(content)
+                index[filename] = (offset, len(content))
+                offset += len(content)
+
+        file_dict = cls(store.name, index)
+        file_dict._finalizer = weakref.finalize(file_dict,
+                                                os.remove,
+                                                store.name)
+        return file_dict
+
+    def close(self):
+        """
+        Unmaps the backing file in this process and deletes it if this
+        instance created it.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+        finalizer = getattr(self, '_finalizer', None)
+        if finalizer is not None:
+            finalizer()
+
+    def __getitem__(self, filename):
+        offset, length = self.index[filename]
+        if length == 0:
+            return ()
+
+        if self._map is None:
+            with open(self.path, 'rb') as store:
+                self._map = mmap.mmap(store.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+
+        return split_lines(
+            self._map[offset:offset + length].decode('utf-8'))
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, filename):
+        return filename in self.index
+
+    def __getstate__(self):
+        return {'path': self.path, 'index': self.index}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['index'])
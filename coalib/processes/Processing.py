@@ -1,3 +1,4 @@
+from functools import partial
 from itertools import chain
 import os
 import platform
@@ -6,10 +7,15 @@ import subprocess
 
 from coalib.collecting.Collectors import collect_files
 from coala_utils.string_processing.StringConverter import StringConverter
+from coalib.misc.CachingUtilities import get_section_settings_hash
 from coalib.output.printers.LOG_LEVEL import LOG_LEVEL
 from coalib.processes.BearRunning import run
 from coalib.processes.CONTROL_ELEMENT import CONTROL_ELEMENT
+from coalib.processes.LazyFileDict import LazyFileDict
 from coalib.processes.LogPrinterThread import LogPrinterThread
+from coalib.processes.MmapFileDict import MmapFileDict
+from coalib.processes.Scheduling import schedule_files
+from coalib.processes.SectionScheduler import SectionScheduler
 from coalib.results.Result import Result
 from coalib.results.result_actions.ApplyPatchAction import ApplyPatchAction
 from coalib.results.result_actions.IgnoreResultAction import IgnoreResultAction
@@ -332,6 +338,142 @@ def instantiate_bears(section,
     return local_bear_list, global_bear_list
 
 
+def get_global_bear_groups(global_bear_list):
+    """
+    Groups the global bears that depend on each other, so every group can be
+    run by a single process without sharing results with other processes.
+
+    >>> class A: BEAR_DEPS = set()
+    >>> class B: BEAR_DEPS = {A}
+    >>> class C: BEAR_DEPS = set()
+    >>> get_global_bear_groups([A(), C(), B()])
+    [(1,), (0, 2)]
+
+    :param global_bear_list: The list of global bear instances, sorted so that
+                             dependencies come before their dependants.
+    :return:                 A list of tuples of indexes into
+                             ``global_bear_list``. The indexes of a group keep
+                             the order of ``global_bear_list``.
+    """
+    groups = []
+    for index, bear in enumerate(global_bear_list):
+        names = {bear.__class__.__name__}
+        indexes = [index]
+        dep_names = {dep.__name__ for dep in getattr(bear, 'BEAR_DEPS', ())}
+        for group in groups[:]:
+            group_names, group_indexes = group
+            if group_names & dep_names:
+                groups.remove(group)
+                names |= group_names
+                indexes.extend(group_indexes)
+
+        groups.append((names, indexes))
+
+    return [tuple(sorted(indexes)) for names, indexes in groups]
+
+
+def collect_section_files(section, log_printer):
+    """
+    Collects the files matched by the ``files``, ``ignore`` and
+    ``limit_files`` settings of the given section.
+
+    :param section:     The section to collect the files of.
+    :param log_printer: The log printer to warn to.
+    :return:            A list of absolute file paths.
+    """
+    return collect_files(
+        glob_list(section.get('files', '')),
+        log_printer,
+        ignored_file_paths=glob_list(section.get('ignore', '')),
+        limit_file_paths=glob_list(section.get('limit_files', '')),
+        section_name=section.name)
+
+
+def get_job_count(section, log_printer):
+    """
+    Retrieves the number of processes to run bears on from the ``jobs``
+    setting of the given section.
+
+    :param section:     The section to read the setting from.
+    :param log_printer: The log printer to warn to.
+    :return:            The number of processes. Defaults to the CPU count.
+    """
+    try:
+        return int(section['jobs'])
+    except ValueError:
+        log_printer.warn("Unable to convert setting 'jobs' into a number. "
+                         'Falling back to CPU count.')
+        return get_cpu_count()
+    except IndexError:
+        return get_cpu_count()
+
+
+def get_worker_limits(section, log_printer):
+    """
+    Retrieves the limits after which processes running bears are replaced
+    from the ``max_files_per_worker`` and ``max_worker_rss`` settings of the
+    given section.
+
+    :param section:     The section to read the settings from.
+    :param log_printer: The log printer to warn to.
+    :return:            A tuple of the number of files and the growth of the
+                        resident set size. ``0`` disables a limit.
+    """
+    limits = []
+    for key, convert in (('max_files_per_worker', int),
+                         ('max_worker_rss', float)):
+        try:
+            limits.append(convert(section.get(key, 0)))
+        except ValueError:
+            log_printer.warn("Unable to convert setting '{}' into a number. "
+                             'Falling back to 0 (disabled).'.format(key))
+            limits.append(0)
+    return tuple(limits)
+
+
+def get_process_args(bear_runner_args, pickled):
+    """
+    Gets the arguments to start a process running ``BearRunning.run`` with.
+
+    :param bear_runner_args: The arguments for ``BearRunning.run``.
+    :param pickled:          Whether the arguments get pickled to be sent to
+                             the process. The file contents are not sent then,
+                             but read by the process itself.
+    :return:                 A dict of arguments.
+    """
+    if not pickled:
+        return bear_runner_args
+
+    return dict(bear_runner_args,
+                file_dict=LazyFileDict(bear_runner_args['file_dict'].keys()))
+
+
+def start_replacement_process(bear_runner_args):
+    """
+    Starts a process replacing one that retired because it reached the
+    ``max_files_per_worker`` or ``max_worker_rss`` limit. It gets fresh copies
+    of the bears and continues with the files left in the queue.
+
+    :param bear_runner_args: The arguments the retired process was started
+                             with, as returned by ``instantiate_processes``.
+    :return:                 The started ``multiprocessing.Process``.
+    """
+    import multiprocessing
+
+    process_args = get_process_args(
+        bear_runner_args,
+        pickled=multiprocessing.get_start_method() != 'fork')
+    # A process running its global bears first already did so and reported
+    # them finished.
+    process_args = dict(
+        process_args,
+        global_bears_done=bear_runner_args['overlap_global_bears'])
+
+    process = multiprocessing.Process(target=run, kwargs=process_args)
+    process.start()
+    return process
+
+
 def instantiate_processes(section,
                           local_bear_list,
                           global_bear_list,
@@ -339,7 +481,9 @@ def instantiate_processes(section,
                           cache,
                           log_printer,
                           console_printer,
-                          debug=False):
+                          debug=False,
+                          pool=None,
+                          filename_list=None):
     """
     Instantiate the number of processes that will run bears which will be
     responsible for running bears in a multiprocessing environment.
@@ -355,33 +499,76 @@ def instantiate_processes(section,
     :param debug:            Bypass multiprocessing and activate debug mode
                              for bears, not catching any exceptions on running
                              them.
+    :param pool:             A ``BearRunnerPool`` whose processes and queues
+                             shall be used instead of creating new ones. It is
+                             ignored in debug mode.
+    :param filename_list:    The files of the section if they were already
+                             collected with ``collect_section_files``.
     :return:                 A tuple containing a list of processes,
-                             and the arguments passed to each process which are
-                             the same for each object.
+                             the arguments passed to each process which are
+                             the same for each object, and a dict of the
+                             local results replayed from the cache for
+                             unchanged files instead of running the bears on
+                             them, with filenames as keys.
     """
-    filename_list = collect_files(
-        glob_list(section.get('files', '')),
-        log_printer,
-        ignored_file_paths=glob_list(section.get('ignore', '')),
-        limit_file_paths=glob_list(section.get('limit_files', '')),
-        section_name=section.name)
+    if debug:
+        pool = None
+
+    # With ``pipe_results`` the processes send their results directly through
+    # the control queue, so no ``Manager`` process is needed to share them.
+    # Pools only support this transport.
+    # With ``overlap_global_bears`` global bears run before the local ones on
+    # the processes. They are dispatched in groups with their dependencies
+    # then, which requires piping the results as well.
+    overlap_global_bears = bool(section.get('overlap_global_bears', False))
+    pipe_results = (bool(section.get('pipe_results', False)) or
+                    pool is not None or
+                    overlap_global_bears)
+
+    if filename_list is None:
+        filename_list = collect_section_files(section, log_printer)
 
     # This stores all matched files irrespective of whether coala is run
-    # only on changed files or not. Global bears require all the files
+    # only on changed files or not. Global bears require all the files, but
+    # only read the ones they access.
     complete_filename_list = filename_list
-    complete_file_dict = get_file_dict(complete_filename_list, log_printer)
+    if not debug and bool(section.get('shared_file_store', False)):
+        # All processes map the same file instead of holding the whole
+        # project in memory each.
+        complete_file_dict = MmapFileDict.from_files(complete_filename_list)
+    else:
+        complete_file_dict = LazyFileDict(complete_filename_list)
 
     if debug:
         from . import DebugProcessing as processing
     else:
         import multiprocessing as processing
-    manager = processing.Manager()
-    global_bear_queue = processing.Queue()
-    filename_queue = processing.Queue()
-    local_result_dict = manager.dict()
-    global_result_dict = manager.dict()
-    message_queue = processing.Queue()
-    control_queue = processing.Queue()
+    if pool is not None:
+        global_bear_queue = pool.global_bear_queue
+        filename_queue = pool.file_name_queue
+        message_queue = pool.message_queue
+        control_queue = pool.control_queue
+    else:
+        global_bear_queue = processing.Queue()
+        filename_queue = processing.Queue()
+        message_queue = processing.Queue()
+        control_queue = processing.Queue()
+
+    # Processes are replaced once they reach one of these limits. Processes
+    # of pools can't be replaced.
+    if debug or pool is not None:
+        max_files_per_worker = max_worker_rss = 0
+    else:
+        max_files_per_worker, max_worker_rss = get_worker_limits(
+            section, log_printer)
+
+    if pipe_results:
+        local_result_dict = {}
+        global_result_dict = {}
+    else:
+        manager = processing.Manager()
+        local_result_dict = manager.dict()
+        global_result_dict = manager.dict()
 
     loaded_local_bears_count = len(local_bear_list)
     local_bear_list[:], global_bear_list[:] = instantiate_bears(
@@ -398,10 +585,26 @@ def instantiate_processes(section,
     # run only for the changed files if caching is enabled.
 
     # Start tracking all the files
+    cached_results = {}
     if cache and loaded_valid_local_bears_count == loaded_local_bears_count:
-        cache.track_files(set(complete_filename_list))
+        cache.track_files(set(complete_filename_list), section.name)
         changed_files = cache.get_uncached_files(
-            set(filename_list)) if cache else filename_list
+            set(filename_list), section.name) if cache else filename_list
+        if cache.section_settings_changed(
+                section.name,
+                get_section_settings_hash(section, local_bear_list),
+                set(filename_list)):
+            log_printer.debug('The settings of the local bears of section {} '
+                              'changed since the last run, so all its files '
+                              'are analyzed again.'.format(section.name))
+            changed_files = set(filename_list)
+
+        # The results of unchanged files are replayed from the cache instead
+        # of analyzing them again.
+        for filename in set(filename_list) - set(changed_files):
+            results = cache.get_results(section.name, filename)
+            if results:
+                cached_results[filename] = results
 
         # If caching is enabled then the local bears should process only the
         # changed files.
@@ -412,10 +615,10 @@ def instantiate_processes(section,
 
     # Note: the complete file dict is given as the file dict to bears and
     # the whole project is accessible to every bear. However, local bears are
-    # run only for the changed files if caching is enabled.
-    file_dict = {filename: complete_file_dict[filename]
-                 for filename in filename_list
-                 if filename in complete_file_dict}
+    # run only for the changed files if caching is enabled. Files with
+    # replayed results are read for printing them.
+    file_dict = get_file_dict(list(filename_list) + list(cached_results),
+                              log_printer)
 
     bear_runner_args = {'file_name_queue': filename_queue,
                         'local_bear_list': local_bear_list,
@@ -427,14 +630,42 @@ def instantiate_processes(section,
                         'message_queue': message_queue,
                         'control_queue': control_queue,
                         'timeout': 0.1,
-                        'debug': debug}
+                        'debug': debug,
+                        'pipe_results': pipe_results,
+                        'overlap_global_bears': overlap_global_bears,
+                        'max_files_per_worker': max_files_per_worker,
+                        'max_worker_rss': max_worker_rss}
+
+    # Start with the most expensive files and batch the cheap ones, so no
+    # process is left with a huge file at the end while all others idle.
+    fill_queue(filename_queue,
+               schedule_files([filename for filename in file_dict
+                               if filename not in cached_results],
+                              job_count,
+                              bear_count=len(local_bear_list)))
+    # Every process stops at the first ``None`` it gets instead of waiting for
+    # the queue to time out.
+    fill_queue(filename_queue, [None] * job_count)
+    if pipe_results:
+        fill_queue(global_bear_queue, get_global_bear_groups(global_bear_list))
+    else:
+        fill_queue(global_bear_queue, range(len(global_bear_list)))
+    fill_queue(global_bear_queue, [None] * job_count)
+
+    process_args = get_process_args(bear_runner_args, pickled=(
+        pool is not None or
+        not debug and processing.get_start_method() != 'fork'))
 
-    fill_queue(filename_queue, file_dict.keys())
-    fill_queue(global_bear_queue, range(len(global_bear_list)))
+    if pool is not None:
+        processes = pool.get_processes(job_count, process_args)
+    else:
+        processes = [processing.Process(target=run, kwargs=process_args)
+                     for i in range(job_count)]
 
-    return ([processing.Process(target=run, kwargs=bear_runner_args)
-             for i in range(job_count)],
-            bear_runner_args)
+    cached_results = {filename: results
+                      for filename, results in cached_results.items()
+                      if filename in file_dict}
+    return processes, bear_runner_args, cached_results
 
 
 def get_ignore_scope(line, keyword):
@@ -504,16 +735,37 @@ def yield_ignore_ranges(file_dict):
                                            len(file[-1])))
 
 
-def get_file_list(results):
+def get_control_element(control_queue,
+                        local_result_dict,
+                        global_result_dict,
+                        timeout):
     """
-    Get the set of files that are affected in the given results.
-
-    :param results: A list of results from which the list of files is to be
-                    extracted.
-    :return:        A set of file paths containing the mentioned list of
-                    files.
+    Gets the next element from the control queue.
+
+    Results sent along with ``CONTROL_ELEMENT.LOCAL_RESULTS`` and
+    ``CONTROL_ELEMENT.GLOBAL_RESULTS`` are stored in the according result dict
+    and the element is returned as ``CONTROL_ELEMENT.LOCAL`` or
+    ``CONTROL_ELEMENT.GLOBAL`` respectively.
+
+    :param control_queue:      The queue to get the element from.
+    :param local_result_dict:  Dictionary to store local results in.
+    :param global_result_dict: Dictionary to store global results in.
+    :param timeout:            Time to block at most for the next element.
+    :raises queue.Empty:       If no element arrived within the timeout.
+    :return:                   The control element and its index.
     """
-    return {code.file for result in results for code in result.affected_code}
+    control_elem, index = control_queue.get(timeout=timeout)
+
+    if control_elem == CONTROL_ELEMENT.LOCAL_RESULTS:
+        index, results = index
+        local_result_dict[index] = results
+        control_elem = CONTROL_ELEMENT.LOCAL
+    elif control_elem == CONTROL_ELEMENT.GLOBAL_RESULTS:
+        index, results = index
+        global_result_dict[index] = results
+        control_elem = CONTROL_ELEMENT.GLOBAL
+
+    return control_elem, index
 
 
 def process_queues(processes,
@@ -526,7 +778,10 @@ def process_queues(processes,
                    cache,
                    log_printer,
                    console_printer,
-                   debug=False):
+                   debug=False,
+                   overlap_global_bears=False,
+                   replace_process=None,
+                   cached_results=None):
     """
     Iterate the control queue and send the results received to the print_result
     method so that they can be presented to the user.
@@ -548,10 +803,24 @@ def process_queues(processes,
                                filename as keys.
     :param print_results:      Prints all given results appropriate to the
                                output medium.
-    :param cache:              An instance of ``misc.Caching.FileCache`` to use
-                               as a file cache buffer.
+    :param cache:              An instance of ``misc.Caching.FileCache`` to
+                               store the results of local bears in, so they
+                               can be replayed for unchanged files. Files
+                               bears failed on or actions changed are
+                               untracked from it.
     :param debug:              Run in debug mode, expecting that no logger
                                thread is running.
+    :param overlap_global_bears:
+                               Whether global bears run along with the local
+                               ones. Their results are printed as soon as they
+                               arrive then instead of after all local results.
+    :param replace_process:    A callable starting a new process and returning
+                               it, called whenever a process retires with
+                               ``CONTROL_ELEMENT.WORKER_RETIRED``. The new
+                               process is added to ``processes``.
+    :param cached_results:     A dict of local results replayed from the
+                               cache, with filenames as keys. They are handled
+                               like the results of the processes.
     :return:                   Return True if all bears execute successfully and
                                Results were delivered to the user. Else False.
     """
@@ -563,21 +832,47 @@ def process_queues(processes,
     local_processes = len(processes)
     global_processes = len(processes)
     global_result_buffer = []
-    result_files = set()
+    # The results of files a bear failed on are incomplete, so they are not
+    # stored in the cache.
+    failed_files = set()
     ignore_ranges = list(yield_ignore_ranges(file_dict))
 
+    for filename, results in (cached_results or {}).items():
+        retval, local_result_dict[filename] = print_result(
+            results,
+            file_dict,
+            retval,
+            print_results,
+            section,
+            log_printer,
+            file_diff_dict,
+            ignore_ranges,
+            console_printer=console_printer)
+
     # One process is the logger thread (if not in debug mode)
     while local_processes > (1 if not debug else 0):
         try:
-            control_elem, index = control_queue.get(timeout=0.1)
+            control_elem, index = get_control_element(control_queue,
+                                                      local_result_dict,
+                                                      global_result_dict,
+                                                      timeout=0.1)
 
             if control_elem == CONTROL_ELEMENT.LOCAL_FINISHED:
                 local_processes -= 1
             elif control_elem == CONTROL_ELEMENT.GLOBAL_FINISHED:
                 global_processes -= 1
+            elif control_elem == CONTROL_ELEMENT.WORKER_RETIRED:
+                # The replacement takes over the finishing notifications of
+                # the retired process.
+                processes.append(replace_process())
+            elif control_elem == CONTROL_ELEMENT.LOCAL_FAILED:
+                failed_files.add(index)
             elif control_elem == CONTROL_ELEMENT.LOCAL:
                 assert local_processes != 0
-                result_files.update(get_file_list(local_result_dict[index]))
+                if cache and index not in failed_files:
+                    cache.set_results(section.name,
+                                      index,
+                                      local_result_dict[index])
                 retval, res = print_result(local_result_dict[index],
                                            file_dict,
                                            retval,
@@ -588,6 +883,18 @@ def process_queues(processes,
                                            ignore_ranges,
                                            console_printer=console_printer)
                 local_result_dict[index] = res
+            elif overlap_global_bears:
+                assert control_elem == CONTROL_ELEMENT.GLOBAL
+                retval, res = print_result(global_result_dict[index],
+                                           file_dict,
+                                           retval,
+                                           print_results,
+                                           section,
+                                           log_printer,
+                                           file_diff_dict,
+                                           ignore_ranges,
+                                           console_printer=console_printer)
+                global_result_dict[index] = res
             else:
                 assert control_elem == CONTROL_ELEMENT.GLOBAL
                 global_result_buffer.append(index)
@@ -599,7 +906,6 @@ def process_queues(processes,
 
     # Flush global result buffer
     for elem in global_result_buffer:
-        result_files.update(get_file_list(global_result_dict[elem]))
         retval, res = print_result(global_result_dict[elem],
                                    file_dict,
                                    retval,
@@ -614,10 +920,12 @@ def process_queues(processes,
     # One process is the logger thread
     while global_processes > 1:
         try:
-            control_elem, index = control_queue.get(timeout=0.1)
+            control_elem, index = get_control_element(control_queue,
+                                                      local_result_dict,
+                                                      global_result_dict,
+                                                      timeout=0.1)
 
             if control_elem == CONTROL_ELEMENT.GLOBAL:
-                result_files.update(get_file_list(global_result_dict[index]))
                 retval, res = print_result(global_result_dict[index],
                                            file_dict,
                                            retval,
@@ -638,7 +946,13 @@ def process_queues(processes,
                 break
 
     if cache:
-        cache.untrack_files(result_files)
+        # Analyze files again next run if bears failed on them or actions
+        # changed them, which may have happened within the second the cache
+        # stores as the time of this run. Changed files are analyzed again by
+        # all sections.
+        cache.untrack_files(failed_files, section.name)
+        cache.untrack_changed_files(set(file_diff_dict))
+
     return retval
 
 
@@ -677,7 +991,10 @@ def execute_section(section,
                     cache,
                     log_printer,
                     console_printer,
-                    debug=False):
+                    debug=False,
+                    pool=None,
+                    job_count=None,
+                    filename_list=None):
     """
     Executes the section with the given bears.
 
@@ -703,36 +1020,47 @@ def execute_section(section,
     :param console_printer:  Object to print messages on the console.
     :param debug:            Bypass multiprocessing and run bears in debug mode,
                              not catching any exceptions.
+    :param pool:             A ``BearRunnerPool`` to run the bears on instead
+                             of starting new processes for this section.
+    :param job_count:        The number of processes to use instead of the
+                             one given by the ``jobs`` setting.
+    :param filename_list:    The files of the section if they were already
+                             collected with ``collect_section_files``.
     :return:                 Tuple containing a bool (True if results were
                              yielded, False otherwise), a Manager.dict
                              containing all local results(filenames are key)
                              and a Manager.dict containing all global bear
                              results (bear names are key) as well as the
-                             file dictionary.
+                             file dictionary. If the ``pipe_results``
+                             setting is enabled or a pool is used, ordinary
+                             dicts are returned instead of the Manager.dicts.
     """
     if debug:
         running_processes = 1
+    elif job_count is not None:
+        running_processes = job_count
     else:
-        try:
-            running_processes = int(section['jobs'])
-        except ValueError:
-            log_printer.warn("Unable to convert setting 'jobs' into a number. "
-                             'Falling back to CPU count.')
-            running_processes = get_cpu_count()
-        except IndexError:
-            running_processes = get_cpu_count()
-
-    processes, arg_dict = instantiate_processes(section,
-                                                local_bear_list,
-                                                global_bear_list,
-                                                running_processes,
-                                                cache,
-                                                log_printer,
-                                                console_printer=console_printer,
-                                                debug=debug)
-
-    logger_thread = LogPrinterThread(arg_dict['message_queue'],
-                                     log_printer)
+        running_processes = get_job_count(section, log_printer)
+
+    processes, arg_dict, cached_results = instantiate_processes(
+        section,
+        local_bear_list,
+        global_bear_list,
+        running_processes,
+        cache,
+        log_printer,
+        console_printer=console_printer,
+        debug=debug,
+        pool=pool,
+        filename_list=filename_list)
+
+    # Pooled processes keep running after the section, so they mark the end
+    # of their messages themselves.
+    pooled_processes = list(processes) if pool is not None else []
+    logger_thread = LogPrinterThread(
+        arg_dict['message_queue'],
+        log_printer,
+        producer_count=1 + len(pooled_processes))
     # Start and join the logger thread along with the processes to run bears
     if not debug:
         # in debug mode the logging messages are directly processed by the
@@ -753,7 +1081,12 @@ def execute_section(section,
                                cache,
                                log_printer,
                                console_printer=console_printer,
-                               debug=debug),
+                               debug=debug,
+                               overlap_global_bears=arg_dict[
+                                   'overlap_global_bears'],
+                               replace_process=partial(
+                                   start_replacement_process, arg_dict),
+                               cached_results=cached_results),
                 arg_dict['local_result_dict'],
                 arg_dict['global_result_dict'],
                 arg_dict['file_dict'])
@@ -761,7 +1094,106 @@ def execute_section(section,
         if not debug:
             # in debug mode multiprocessing and logger_thread are disabled
             # ==> no need for following actions
-            logger_thread.running = False
-
             for runner in processes:
-                runner.join()
+                if runner is not logger_thread:
+                    runner.join()
+
+            # All messages of the joined processes are queued by now.
+            logger_thread.stop()
+            while logger_thread.is_alive():
+                logger_thread.join(timeout=0.1)
+                if not all(runner.is_alive() for runner in pooled_processes):
+                    # A dead pool process can't mark the end of its
+                    # messages.
+                    logger_thread.running = False
+
+
+def execute_sections_concurrently(sections,
+                                  global_bears,
+                                  local_bears,
+                                  print_results,
+                                  print_section_beginning,
+                                  cache,
+                                  log_printer,
+                                  console_printer,
+                                  job_count):
+    """
+    Executes the given sections concurrently, sharing ``job_count`` processes
+    between them.
+
+    Sections checking common files are executed one after another in the
+    given order, as their results may be applied to those files. The output
+    of each section is buffered and printed as a whole, in the order of the
+    sections. A section checking files of an earlier one only starts after
+    the output of the earlier section was printed, as actions applied then
+    may modify the files.
+
+    :param sections:                A list of tuples of section names and the
+                                    sections to execute.
+    :param global_bears:            A dict of lists of global bears, keyed by
+                                    section names.
+    :param local_bears:             A dict of lists of local bears, keyed by
+                                    section names.
+    :param print_results:           Prints all given results appropriate to
+                                    the output medium.
+    :param print_section_beginning: Prints the beginning of a section.
+    :param cache:                   An instance of ``misc.Caching.FileCache``
+                                    to use as a file cache buffer.
+    :param log_printer:             The log_printer to warn to.
+    :param console_printer:         Object to print messages on the console.
+    :param job_count:               The number of processes that may run at
+                                    the same time for all sections together.
+    :return:                        A generator yielding tuples of section
+                                    names and the results of
+                                    ``execute_section``, in the order of the
+                                    sections.
+    """
+    def execute(section_name, section, section_job_count, filename_list):
+        calls = [(print_section_beginning, (section,))]
+        file_diff_dicts = []
+
+        def buffer_results(log_printer, section, results, file_dict,
+                           file_diff_dict, console_printer):
+            calls.append((print_results, (log_printer, section, results,
+                                          file_dict, file_diff_dict,
+                                          console_printer)))
+            file_diff_dicts.append(file_diff_dict)
+
+        section_result = execute_section(
+            section=section,
+            global_bear_list=global_bears[section_name],
+            local_bear_list=local_bears[section_name],
+            print_results=buffer_results,
+            cache=cache,
+            log_printer=log_printer,
+            console_printer=console_printer,
+            job_count=section_job_count,
+            filename_list=filename_list)
+        return section_name, section_result, calls, file_diff_dicts
+
+    tasks = []
+    for section_name, section in sections:
+        filename_list = collect_section_files(section, log_printer)
+        section_job_count = min(get_job_count(section, log_printer),
+                                job_count)
+        tasks.append((section_job_count,
+                      set(filename_list),
+                      partial(execute,
+                              section_name,
+                              section,
+                              section_job_count,
+                              filename_list)))
+
+    for section_name, section_result, calls, file_diff_dicts in (
+            SectionScheduler(job_count).run(tasks)):
+        for function, args in calls:
+            function(*args)
+
+        if cache:
+            # Actions applied while printing may have changed files cached by
+            # any section, this one already finished.
+            cache.untrack_changed_files(
+                {file for file_diff_dict in file_diff_dicts
+                 for file in file_diff_dict})
+
+        yield section_name, section_result
@@ -0,0 +1,70 @@
+import os
+
+
+def get_file_cost(filename, bear_count=1):
+    """
+    Estimates the cost of running local bears on a file.
+
+    The estimate is proportional to the size of the file and the number of
+    bears to run on it. Files that can't be accessed are treated as empty.
+
+    :param filename:   The name of the file.
+    :param bear_count: The number of local bears that will run on the file.
+    :return:           The estimated cost as a number.
+    """
+    try:
+        size = os.path.getsize(filename)
+    except OSError:
+        size = 0
+
+    # Even empty files cost something to process.
+    return (size + 1) * bear_count
+
+
+def schedule_files(filenames, job_count, bear_count=1, batch_factor=4):
+    """
+    Orders files for processing so that the most expensive files get
+    processed first and groups cheap files into batches.
+
+    Processing the expensive files first avoids that a single big file picked
+    up at the end of a run keeps one process busy while all others are already
+    idle. Batching cheap files reduces the number of queue round-trips.
+
+    A batch gets at most ``1 / (job_count * batch_factor)`` of the estimated
+    cost that is not yet scheduled, so batches get smaller towards the end of
+    the schedule. Files exceeding that are always scheduled alone.
+
+    >>> schedule_files([], 2)
+    []
+
+    :param filenames:    The names of the files to schedule.
+    :param job_count:    The number of processes that will consume the
+                         schedule.
+    :param bear_count:   The number of local bears that will run on each file.
+    :param batch_factor: The higher the factor, the smaller the batches.
+    :return:             A list of tuples of filenames. Each tuple shall be
+                         processed as a whole by one process.
+    """
+    costs = {filename: get_file_cost(filename, bear_count)
+             for filename in filenames}
+    remaining_cost = sum(costs.values())
+    divisor = max(job_count, 1) * batch_factor
+
+    batches = []
+    batch = []
+    batch_cost = 0
+    for filename in sorted(costs, key=costs.get, reverse=True):
+        cost = costs[filename]
+        if batch and batch_cost + cost > remaining_cost / divisor:
+            batches.append(tuple(batch))
+            remaining_cost -= batch_cost
+            batch = []
+            batch_cost = 0
+
+        batch.append(filename)
+        batch_cost += cost
+
+    if batch:
+        batches.append(tuple(batch))
+
+    return batches
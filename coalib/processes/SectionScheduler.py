@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+
+class SectionScheduler:
+    """
+    Runs functions executing sections concurrently in threads while sharing a
+    budget of jobs between them.
+
+    Each function is given with the number of jobs it uses and the set of
+    files it checks. Functions checking common files never run at the same
+    time and keep their order, as their results may be applied to those
+    files. The files stay locked until the return value of the function was
+    handed out and processed, i.e. the next one is requested, since results
+    may only be applied then.
+
+    >>> scheduler = SectionScheduler(2)
+    >>> list(scheduler.run([(1, {'a.py'}, lambda: 'section1'),
+    ...                     (1, {'b.py'}, lambda: 'section2'),
+    ...                     (2, {'a.py'}, lambda: 'section3')]))
+    ['section1', 'section2', 'section3']
+    """
+
+    def __init__(self, job_count):
+        """
+        :param job_count: The number of jobs that may be used at the same time
+                          by all running functions together.
+        """
+        self.job_count = job_count
+        self.free_jobs = job_count
+        self.running_files = []
+        self.condition = threading.Condition()
+
+    def can_start(self, job_count, files):
+        """
+        Checks whether a function may start now. Must be called with the
+        ``condition`` acquired.
+
+        :param job_count: The number of jobs the function uses.
+        :param files:     The set of files the function checks.
+        :return:          True if enough jobs are free and no running function
+                          checks any of the files.
+        """
+        return (job_count <= self.free_jobs and
+                not any(files & running for running in self.running_files))
+
+    def _execute(self, job_count, function, finished):
+        try:
+            return function()
+        finally:
+            with self.condition:
+                self.free_jobs += job_count
+                finished.set()
+                self.condition.notify_all()
+
+    def _release_files(self, files):
+        with self.condition:
+            self.running_files.remove(files)
+            self.condition.notify_all()
+
+    def run(self, tasks):
+        """
+        Runs the given functions concurrently as far as the jobs and files
+        allow.
+
+        :param tasks: An iterable of tuples ``(job_count, files, function)``.
+                      ``job_count`` is capped to the budget of the scheduler.
+        :return:      A generator yielding the return values of the functions
+                      in the order of ``tasks``, as soon as a function and all
+                      functions before it are done. Exceptions raised by a
+                      function are raised there too. The files of a function
+                      are released when the next value is requested.
+        """
+        tasks = list(tasks)
+        pending = []
+
+        with ThreadPoolExecutor(max_workers=max(len(tasks), 1)) as executor:
+            for job_count, files, function in tasks:
+                job_count = min(max(job_count, 1), self.job_count)
+
+                while True:
+                    with self.condition:
+                        head_finished = (pending and
+                                         pending[0][1].is_set())
+                        if not head_finished:
+                            if self.can_start(job_count, files):
+                                self.free_jobs -= job_count
+                                self.running_files.append(files)
+                                break
+                            self.condition.wait()
+                            continue
+
+                    # Hand out the results which are ready while waiting.
+                    future, finished, done_files = pending.pop(0)
+                    yield future.result()
+                    self._release_files(done_files)
+
+                finished = threading.Event()
+                pending.append((executor.submit(self._execute,
+                                                job_count,
+                                                function,
+                                                finished),
+                                finished,
+                                files))
+
+            for future, finished, done_files in pending:
+                yield future.result()
+                self._release_files(done_files)
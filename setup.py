@@ -108,7 +108,8 @@ if __name__ == '__main__':
                   'coala-ci = coalib.coala_ci:main',
                   'coala-json = coalib.coala_json:main',
                   'coala-format = coalib.coala_format:main',
-                  'coala-delete-orig = coalib.coala_delete_orig:main']},
+                  'coala-delete-orig = coalib.coala_delete_orig:main',
+                  'coala-worker = coalib.coala_worker:main']},
           # from http://pypi.python.org/pypi?%3Aaction=list_classifiers
           classifiers=[
               'Development Status :: 4 - Beta',
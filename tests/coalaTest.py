@@ -53,6 +53,19 @@ class coalaTest(unittest.TestCase):
     def test_python_version_34(self):
         assert_supported_version()
 
+    @unittest.mock.patch('coalib.misc.CacheDatabase.CacheDatabase')
+    def test_cache_gc(self, database):
+        database.return_value.collect_garbage.return_value = ['/project']
+        retval, stdout, stderr = execute_coala(coala.main, 'coala',
+                                               '--cache-gc',
+                                               '--cache-max-age', '1',
+                                               '--cache-max-size', '0')
+        self.assertEqual(retval, 0)
+        self.assertIn('Evicted the caches of 1 projects.', stdout)
+        database.return_value.collect_garbage.assert_called_once_with(
+            24 * 60 * 60, None)
+        database.return_value.vacuum.assert_called_once_with()
+
     def test_did_nothing(self, debug=False):
         retval, stdout, stderr = execute_coala(coala.main, 'coala', '-I',
                                                '-S', 'cli.enabled=false',
@@ -179,6 +192,83 @@ class coalaTest(unittest.TestCase):
                 )[0]['cli'])
             )
 
+    def test_run_coala_persistent_workers(self):
+        with bear_test_module(), \
+                prepare_file(['#fixme  '], None) as (lines, filename):
+            results, exitcode, _ = run_coala(
+                console_printer=ConsolePrinter(),
+                log_printer=LogPrinter(),
+                arg_list=(
+                    '-c', os.devnull,
+                    '-f', re.escape(filename),
+                    '-b', 'SpaceConsistencyTestBear',
+                    '--persistent-workers',
+                    '-S', 'use_spaces=yeah'
+                ),
+                autoapply=False
+            )
+            self.assertEqual(1, len(results['cli']))
+            self.assertEqual(1, exitcode)
+
+    @unittest.mock.patch('coalib.coala_main.BearRunnerPool')
+    @unittest.mock.patch('coalib.coala_main.execute_sections',
+                         side_effect=RuntimeError)
+    def test_run_coala_persistent_workers_error(self, execute_sections,
+                                                pool):
+        with bear_test_module(), \
+                self.assertRaises(RuntimeError):
+            run_coala(console_printer=ConsolePrinter(),
+                      log_printer=LogPrinter(),
+                      arg_list=('-c', os.devnull,
+                                '-f', re.escape(__file__),
+                                '-b', 'SpaceConsistencyTestBear',
+                                '--persistent-workers',
+                                '-S', 'use_spaces=yeah'),
+                      debug=True)
+
+        pool.return_value.close.assert_called_once_with()
+
+    def test_run_coala_concurrent_sections(self):
+        with bear_test_module(), \
+                prepare_file(['#fixme  '], None) as (lines, filename):
+            printed = []
+            results, exitcode, _ = run_coala(
+                console_printer=ConsolePrinter(),
+                log_printer=LogPrinter(),
+                print_section_beginning=lambda section: printed.append(
+                    section.name),
+                arg_list=(
+                    '-c', os.devnull,
+                    '-f', re.escape(filename),
+                    '-b', 'SpaceConsistencyTestBear',
+                    '--concurrent-sections',
+                    '-S', 'use_spaces=yeah'
+                ),
+                autoapply=False
+            )
+            self.assertEqual(1, len(results['cli']))
+            self.assertEqual(['cli'], printed)
+            self.assertEqual(1, exitcode)
+
+    @unittest.mock.patch('coalib.coala_main.BearRunnerPool')
+    def test_run_coala_concurrent_sections_persistent_workers(self, pool):
+        with bear_test_module(), \
+                self.assertLogs() as cm:
+            run_coala(console_printer=ConsolePrinter(),
+                      log_printer=LogPrinter(),
+                      arg_list=('-c', os.devnull,
+                                '-f', re.escape(__file__),
+                                '-b', 'SpaceConsistencyTestBear',
+                                '--concurrent-sections',
+                                '--persistent-workers',
+                                '-S', 'use_spaces=yeah'),
+                      autoapply=False)
+
+        self.assertIn('The persistent_workers setting is ignored when '
+                      'sections are executed concurrently.',
+                      '\n'.join(cm.output))
+        pool.assert_not_called()
+
     def test_run_coala_no_autoapply_debug(self):
         self.test_run_coala_no_autoapply(debug=True)
 
@@ -0,0 +1,41 @@
+import os
+import unittest
+import unittest.mock
+
+from coalib import coala_worker
+from coalib.core.RemoteExecutor import (
+    AUTHKEY_VARIABLE, FILE_CONTENTS_CACHE_SIZE)
+from coala_utils.ContextManagers import retrieve_stderr
+
+
+@unittest.mock.patch('coalib.coala_worker.configure_logging')
+class coalaWorkerTest(unittest.TestCase):
+
+    def test_missing_authkey(self, mock_configure_logging):
+        environ = dict(os.environ)
+        environ.pop(AUTHKEY_VARIABLE, None)
+
+        with unittest.mock.patch.dict('os.environ', environ, clear=True), \
+                retrieve_stderr() as stderr:
+            retval = coala_worker.main(['127.0.0.1:0'])
+            self.assertIn(AUTHKEY_VARIABLE, stderr.getvalue())
+
+        self.assertEqual(retval, 255)
+
+    @unittest.mock.patch('coalib.coala_worker.serve')
+    def test_listen(self, mock_serve, mock_configure_logging):
+        with unittest.mock.patch.dict('os.environ',
+                                      {AUTHKEY_VARIABLE: 'secret'}), \
+                unittest.mock.patch('builtins.print') as mock_print:
+            coala_worker.main(['127.0.0.1:0'])
+
+        address = mock_print.call_args[0][0]
+        self.assertRegex(address, r'^127\.0\.0\.1:\d+$')
+        self.assertEqual(mock_serve.call_count, 1)
+        self.assertEqual(mock_serve.call_args[0][1], FILE_CONTENTS_CACHE_SIZE)
+
+        with unittest.mock.patch.dict('os.environ',
+                                      {AUTHKEY_VARIABLE: 'secret'}), \
+                unittest.mock.patch('builtins.print'):
+            coala_worker.main(['--max-file-contents', '10', '127.0.0.1:0'])
+        self.assertEqual(mock_serve.call_args[0][1], 10)
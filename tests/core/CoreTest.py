@@ -1,10 +1,19 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import logging
+import sys
+import threading
+import time
 import unittest
 import unittest.mock
 
 from coalib.settings.Section import Section
+from coalib.settings.Setting import Setting
 from coalib.core.Bear import Bear
-from coalib.core.Core import initialize_dependencies, run
+from coalib.core.Core import group, initialize_dependencies, run
+from coalib.core.RemoteExecutor import RemoteExecutor
+from coalib.core.TaskCache import TaskCache
+from coalib.core.TaskDurations import TaskDurations
 
 from coala_utils.decorators import generate_eq
 
@@ -117,6 +126,102 @@ class DynamicTaskBear(TestBearBase):
         return (((i,), {}) for i in range(tasks_count))
 
 
+class SignallingBear(TestBearBase):
+    BEAR_DEPS = {BearB}
+    executed = threading.Event()
+
+    def analyze(self, bear, section_name, file_dict):
+        self.executed.set()
+        return TestBearBase.analyze(self, bear, section_name, file_dict)
+
+
+class StreamingBear(TestBearBase):
+    handled = threading.Event()
+
+    def analyze(self, bear, section_name, file_dict):
+        yield 1
+        yield 2
+        # Only continue after the first results were handled.
+        if not self.handled.wait(timeout=10):
+            raise AssertionError('Results were not streamed.')
+        yield 3
+        raise ValueError
+
+
+class FileCountingBear(Bear):
+    BEAR_DEPS = set()
+    analyzed = []
+
+    def analyze(self, filename, factor: int=1):
+        self.analyzed.append(filename)
+        return [len(self.file_dict[filename]) * factor]
+
+    def generate_tasks(self):
+        return (((filename,), {'factor': int(self.section.get('factor', 1))})
+                for filename in self.file_dict)
+
+
+class SumBear(Bear):
+    BEAR_DEPS = {FileCountingBear}
+    analyzed = []
+
+    def analyze(self):
+        self.analyzed.append(None)
+        return [sum(self.dependency_results[FileCountingBear])]
+
+    def generate_tasks(self):
+        return ((), {}),
+
+
+class AsyncEchoBear(Bear):
+    BEAR_DEPS = set()
+
+    def __init__(self, section, file_dict, tasks_count=1):
+        Bear.__init__(self, section, file_dict)
+        self.tasks_count = tasks_count
+
+    @asyncio.coroutine
+    def analyze(self, run_id):
+        process = yield from asyncio.create_subprocess_exec(
+            sys.executable, '-c', 'print({})'.format(run_id),
+            stdout=asyncio.subprocess.PIPE)
+        output, _ = yield from process.communicate()
+        return [int(output)]
+
+    def generate_tasks(self):
+        return (((i,), {}) for i in range(self.tasks_count))
+
+
+class AsyncSleepBear(Bear):
+    BEAR_DEPS = set()
+
+    @asyncio.coroutine
+    def analyze(self, run_id):
+        yield from asyncio.sleep(0.5)
+        return [run_id]
+
+    def generate_tasks(self):
+        return (((i,), {}) for i in range(int(self.section.get('tasks', 1))))
+
+
+class AsyncFailingBear(AsyncSleepBear):
+
+    @asyncio.coroutine
+    def analyze(self, run_id):
+        yield from asyncio.sleep(0)
+        raise ValueError
+
+
+class AsyncSumBear(Bear):
+    BEAR_DEPS = {AsyncSleepBear}
+
+    def analyze(self):
+        return [sum(self.dependency_results[AsyncSleepBear])]
+
+    def generate_tasks(self):
+        return ((), {}),
+
+
 def get_next_instance(typ, iterable):
     """
     Reads all elements in the iterable and returns the first occurrence
@@ -136,6 +241,17 @@ def get_next_instance(typ, iterable):
         return None
 
 
+class GroupTest(unittest.TestCase):
+
+    def test_unhashable_keys(self):
+        data = [[1], (2,), [1], (2,), [3]]
+        self.assertEqual([(key, list(elements))
+                          for key, elements in group(data)],
+                         [([1], [[1], [1]]),
+                          ((2,), [(2,), (2,)]),
+                          ([3], [[3]])])
+
+
 class InitializeDependenciesTest(unittest.TestCase):
 
     def setUp(self):
@@ -341,6 +457,33 @@ class InitializeDependenciesTest(unittest.TestCase):
 
         self.assertEqual(bears_to_schedule, {bear_b, dependency})
 
+    def test_grouping_by_identity(self):
+        # Equal but distinct file-dictionaries are not compared, so bears using
+        # them get their own dependency instances.
+        class UncomparableDict(dict):
+            def __eq__(self, other):
+                if isinstance(other, dict):
+                    raise AssertionError(
+                        'File-dictionaries must not be compared.')
+                return dict.__eq__(self, other)
+
+            __hash__ = None
+
+        filedict1 = UncomparableDict(self.filedict1)
+        filedict2 = UncomparableDict(self.filedict1)
+        bear_c1 = BearC_NeedsB(self.section1, filedict1)
+        bear_c2 = BearC_NeedsB(self.section1, filedict2)
+        bear_c3 = BearC_NeedsB(self.section1, filedict1)
+
+        dependency_tracker, bears_to_schedule = initialize_dependencies(
+            {bear_c1, bear_c2, bear_c3})
+
+        self.assertEqual(dependency_tracker.get_dependencies(bear_c1),
+                         dependency_tracker.get_dependencies(bear_c3))
+        self.assertNotEqual(dependency_tracker.get_dependencies(bear_c1),
+                            dependency_tracker.get_dependencies(bear_c2))
+        self.assertEqual(len(bears_to_schedule), 2)
+
     def test_out_of_order_grouping(self):
         # Test whether the grouping supports out-of-order. Some implementations
         # (like the Python implementation of `groupby`) don't allow
@@ -387,6 +530,12 @@ class CoreTest(unittest.TestCase):
 
         return results
 
+    @staticmethod
+    def execute_run_with(bears, **kwargs):
+        results = []
+        run(bears, results.append, **kwargs)
+        return results
+
     @staticmethod
     def get_comparable_results(results):
         """
@@ -603,6 +752,289 @@ class CoreTest(unittest.TestCase):
         self.assertEqual(
             len(bear.dependency_results[BearA]), 1)
 
+    def test_run_custom_executor(self):
+        bear = MultiTaskBear(self.section1, self.filedict1, tasks_count=10)
+
+        results = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with unittest.mock.patch.object(
+                    executor, 'submit', wraps=executor.submit) as submit:
+                run({bear}, results.append, executor=executor)
+                self.assertEqual(submit.call_count, 10)
+
+            # The executor isn't shut down, so it can be reused.
+            run({MultiTaskBear(self.section1, self.filedict1, tasks_count=5)},
+                results.append,
+                executor=executor)
+
+        self.assertEqual(sorted(results),
+                         sorted(list(range(10)) + list(range(5))))
+
+    def test_run_custom_event_loop(self):
+        bear = MultiTaskBear(self.section1, self.filedict1, tasks_count=3)
+        event_loop = asyncio.SelectorEventLoop()
+
+        results = []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            run({bear}, results.append, executor=executor,
+                event_loop=event_loop)
+
+        self.assertEqual(set(results), {0, 1, 2})
+        self.assertFalse(event_loop.is_closed())
+        event_loop.close()
+
+    def test_run_threaded_result_callback(self):
+        bear = SignallingBear(self.section1, self.filedict1)
+        SignallingBear.executed.clear()
+
+        results = []
+        threads = set()
+
+        def on_result(result):
+            threads.add(threading.current_thread())
+            # A slow callback for the results of BearB must not hold back
+            # scheduling the bear depending on it.
+            self.assertTrue(SignallingBear.executed.wait(timeout=10))
+            results.append(result)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            run({bear}, on_result, executor=executor,
+                threaded_result_callback=True)
+
+        # Results of a bear are handled before the ones of its dependants.
+        self.assertEqual([result.bear.name for result in results],
+                         [BearB.name, SignallingBear.name])
+        self.assertEqual(len(threads), 1)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_run_threaded_result_callback_exception(self):
+        bear = MultiTaskBear(self.section1, self.filedict1, tasks_count=3)
+
+        on_result = unittest.mock.Mock(side_effect=ValueError)
+
+        with self.assertLogs(logging.getLogger()) as cm:
+            run({bear}, on_result, threaded_result_callback=True)
+
+        on_result.assert_has_calls([unittest.mock.call(i) for i in range(3)],
+                                   any_order=True)
+        self.assertEqual(len(cm.output), 3)
+
+    def test_run_tasks_per_chunk(self):
+        bear = MultiTaskBear(self.section1, self.filedict1, tasks_count=10)
+
+        results = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with unittest.mock.patch.object(
+                    executor, 'submit', wraps=executor.submit) as submit:
+                run({bear}, results.append, executor=executor,
+                    tasks_per_chunk=4)
+                self.assertEqual(submit.call_count, 3)
+
+        self.assertEqual(sorted(results), list(range(10)))
+
+    def test_run_cache_bears(self):
+        bear = MultiTaskBear(self.section1, self.filedict1, tasks_count=10)
+
+        with unittest.mock.patch.object(
+                MultiTaskBear, '__getstate__', create=True,
+                side_effect=lambda: dict(bear.__dict__)) as getstate:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results = self.execute_run_with(
+                    {bear}, executor=executor, tasks_per_chunk=2,
+                    cache_bears=True)
+
+        self.assertEqual(sorted(results), list(range(10)))
+        # The bear is transferred once to the worker, not with each chunk.
+        self.assertEqual(getstate.call_count, 1)
+
+    def test_run_bear_exception_in_chunk(self):
+        with self.assertLogs(logging.getLogger()) as cm:
+            results = self.execute_run_with(
+                {FailingBear(self.section1, self.filedict1),
+                 MultiTaskBear(self.section1, self.filedict1, tasks_count=3)},
+                tasks_per_chunk=2, cache_bears=True)
+
+        self.assertEqual(len(cm.output), 1)
+        self.assertTrue(cm.output[0].startswith(
+            'ERROR:root:An exception was thrown during bear execution.'))
+
+        self.assertEqual(set(results), {0, 1, 2})
+
+    def test_run_results_per_chunk(self):
+        bear = StreamingBear(self.section1, self.filedict1)
+        StreamingBear.handled.clear()
+
+        results = []
+
+        def on_result(result):
+            results.append(result)
+            StreamingBear.handled.set()
+
+        with self.assertLogs(logging.getLogger()) as cm:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                run({bear}, on_result, executor=executor, results_per_chunk=2)
+
+        # Results streamed before the bear failed are handled.
+        self.assertEqual(results, [1, 2])
+        self.assertEqual(len(cm.output), 1)
+        self.assertTrue(cm.output[0].startswith(
+            'ERROR:root:An exception was thrown during bear execution.'))
+
+    def test_run_results_per_chunk_remote_executor(self):
+        bear = StreamingBear(self.section1, self.filedict1)
+        executor = RemoteExecutor([], b'secret')
+
+        with self.assertRaisesRegex(ValueError,
+                                    'results_per_chunk is not supported'):
+            run({bear}, lambda result: None, executor=executor,
+                results_per_chunk=2)
+
+        executor.shutdown()
+
+    def test_run_results_per_chunk_with_dependencies(self):
+        bear = DynamicTaskBear(self.section1, self.filedict1)
+
+        results = self.execute_run_with({bear}, results_per_chunk=1,
+                                        tasks_per_chunk=2)
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(sorted(results[-3:]), [0, 1, 2])
+        self.assertEqual(
+            len(bear.dependency_results[MultiResultBear]), 2)
+        self.assertEqual(
+            len(bear.dependency_results[BearA]), 1)
+
+    def test_run_task_durations(self):
+        # BearE_NeedsAD depends on BearA and on the chain BearD -> BearC ->
+        # BearB. The bear starting the longest chain is run first.
+        for duration_a, first_bear in ((10, BearA), (0.1, BearB)):
+            task_durations = TaskDurations({'BearA': duration_a,
+                                            'BearB': 1,
+                                            'BearC_NeedsB': 1,
+                                            'BearD_NeedsC': 1,
+                                            'BearE_NeedsAD': 1})
+            bear_e = BearE_NeedsAD(self.section1, self.filedict1)
+
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                results = self.execute_run_with(
+                    {bear_e}, executor=executor,
+                    task_durations=task_durations, max_workers=1)
+
+            self.assertEqual(len(results), 5)
+            self.assertEqual(results[0].bear.name, first_bear.name)
+            self.assertEqual(results[-1].bear.name, bear_e.name)
+            # The durations are updated with the ones of this run.
+            self.assertLess(task_durations.get('BearB'), 1)
+            self.assertEqual(task_durations.current, {})
+
+    def test_run_task_cache(self):
+        file_dict = {'a': ['1\n'], 'b': ['1\n', '2\n']}
+        task_cache = TaskCache()
+
+        def run_cached(file_dict, tasks_per_chunk=1):
+            FileCountingBear.analyzed.clear()
+            SumBear.analyzed.clear()
+            bear = SumBear(self.section1, file_dict)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                results = self.execute_run_with(
+                    {bear}, executor=executor, task_cache=task_cache,
+                    tasks_per_chunk=tasks_per_chunk)
+            return sorted(results), bear
+
+        results, bear = run_cached(file_dict)
+        self.assertEqual(results, [1, 2, 3])
+        self.assertEqual(sorted(FileCountingBear.analyzed), ['a', 'b'])
+        self.assertEqual(len(SumBear.analyzed), 1)
+
+        # Nothing changed, so nothing is executed. Dependants still receive
+        # the cached results.
+        results, bear = run_cached(dict(file_dict))
+        self.assertEqual(results, [1, 2, 3])
+        self.assertEqual(FileCountingBear.analyzed, [])
+        self.assertEqual(SumBear.analyzed, [])
+        self.assertEqual(sorted(bear.dependency_results[FileCountingBear]),
+                         [1, 2])
+
+        # Only the changed file is analyzed again, and the dependant as its
+        # dependency results changed.
+        results, bear = run_cached({'a': ['1\n'], 'b': ['1\n']},
+                                   tasks_per_chunk=2)
+        self.assertEqual(results, [1, 1, 2])
+        self.assertEqual(FileCountingBear.analyzed, ['b'])
+        self.assertEqual(len(SumBear.analyzed), 1)
+
+        # Changing a setting the bear takes invalidates its results.
+        self.section1.append(Setting('factor', '2'))
+        results, bear = run_cached(dict(file_dict))
+        self.assertEqual(results, [2, 4, 6])
+        self.assertEqual(sorted(FileCountingBear.analyzed), ['a', 'b'])
+
+    def test_run_task_cache_exception(self):
+        task_cache = TaskCache()
+        with self.assertLogs(logging.getLogger()):
+            self.execute_run_with({FailingBear(self.section1,
+                                               self.filedict1)},
+                                  task_cache=task_cache)
+
+        self.assertEqual(task_cache.results, {})
+
+    def test_run_async_bear(self):
+        bear = AsyncEchoBear(self.section1, self.filedict1, tasks_count=3)
+
+        results = self.execute_run({bear})
+
+        self.assertEqual(sorted(results), [0, 1, 2])
+
+    def test_run_async_bear_concurrently(self):
+        self.section1.append(Setting('tasks', '50'))
+        bear = AsyncSumBear(self.section1, self.filedict1)
+
+        with ThreadPoolExecutor(max_workers=1) as executor, \
+                unittest.mock.patch.object(executor, 'submit',
+                                           wraps=executor.submit) as submit:
+            start = time.perf_counter()
+            results = self.execute_run_with({bear}, executor=executor,
+                                            tasks_per_chunk=10)
+            duration = time.perf_counter() - start
+
+        # Tasks of asynchronous bears wait concurrently on the event loop,
+        # only the synchronous dependant goes to the executor.
+        self.assertLess(duration, 5)
+        self.assertEqual(submit.call_count, 1)
+        self.assertEqual(sorted(results), list(range(50)) + [1225])
+
+    def test_run_async_bear_exception(self):
+        bear = AsyncFailingBear(self.section1, self.filedict1)
+
+        with self.assertLogs(logging.getLogger()) as cm:
+            results = self.execute_run({bear})
+
+        self.assertEqual(results, [])
+        self.assertIn('ValueError', cm.output[0])
+
+    def test_run_async_bear_task_cache(self):
+        self.section1.append(Setting('tasks', '2'))
+        task_cache = TaskCache()
+
+        for _ in range(2):
+            bear = AsyncSleepBear(self.section1, self.filedict1)
+            results = self.execute_run_with({bear}, task_cache=task_cache)
+            self.assertEqual(sorted(results), [0, 1])
+
+        self.assertEqual(len(task_cache.results), 2)
+
+    def test_run_async_bear_in_thread(self):
+        # No child watcher can be attached outside of the main thread.
+        bear = AsyncSleepBear(self.section1, self.filedict1)
+        results = []
+
+        thread = threading.Thread(
+            target=lambda: results.extend(self.execute_run({bear})))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(results, [0])
+
     def test_run_heavy_cpu_load(self):
         # No normal computer should expose 100 cores at once, so we can test
         # if the scheduler works properly.
@@ -194,3 +194,38 @@ class DependencyTrackerTest(unittest.TestCase):
         uut.resolve(1)
 
         self.assertTrue(uut.are_dependencies_resolved)
+
+    def test_resolve_scaling_benchmark(self):
+        # Counts hash computations, which is every lookup in the underlying
+        # sets and dicts, while resolving a tracker with one dependency and
+        # three dependants for each of ``count`` sections.
+        hash_calls = 0
+
+        class Node:
+
+            def __hash__(self):
+                nonlocal hash_calls
+                hash_calls += 1
+                return id(self)
+
+        def measure(count):
+            nonlocal hash_calls
+            uut = DependencyTracker()
+            dependencies = [Node() for i in range(count)]
+            for dependency in dependencies:
+                for i in range(3):
+                    uut.add(dependency, Node())
+
+            hash_calls = 0
+            for dependency in dependencies:
+                self.assertEqual(len(uut.resolve(dependency)), 3)
+                self.assertEqual(uut.get_dependencies(dependency), set())
+            self.assertTrue(uut.are_dependencies_resolved)
+            return hash_calls
+
+        small = measure(1000)
+        large = measure(4000)
+
+        # Resolving is linear in the number of relations, so 4 times the
+        # relations cost 4 times the lookups, not 16 times.
+        self.assertEqual(large, 4 * small)
@@ -0,0 +1,63 @@
+import unittest
+import unittest.mock
+
+from coalib.core.FileContents import FileContents
+
+
+class FileContentsTest(unittest.TestCase):
+
+    def test_get_digest(self):
+        content = ['line\n']
+        file_contents = FileContents()
+        file_contents.add_file_dict({'a': content,
+                                     'b': content,
+                                     'c': ['other\n']})
+
+        # Contents are only hashed when needed.
+        self.assertEqual(len(file_contents.digests), 0)
+        self.assertEqual(len(file_contents.get_digest(content)), 64)
+        self.assertEqual(len(file_contents.digests), 1)
+        # Contents are only known by identity.
+        self.assertIsNone(file_contents.get_digest(['line\n']))
+        self.assertIsNone(file_contents.get_digest('a'))
+
+        # Equal contents have the same hash.
+        equal_content = ['line\n']
+        file_contents.add_file_dict({'d': equal_content})
+        self.assertEqual(file_contents.get_digest(equal_content),
+                         file_contents.get_digest(content))
+
+    def test_add_file_dict_again(self):
+        file_dict = unittest.mock.MagicMock(wraps={'a': ('a\n',)})
+        file_contents = FileContents()
+        file_contents.add_file_dict(file_dict)
+        file_contents.add_file_dict(file_dict)
+
+        # The file-dictionary is only walked once.
+        self.assertEqual(file_dict.values.call_count, 1)
+
+    def test_max_size(self):
+        contents = [('a\n',), ('b\n',), ('c\n',)]
+        file_contents = FileContents(max_size=1)
+        file_contents.add_file_dict({'a': contents[0], 'b': contents[1]})
+        file_contents.add_file_dict({'c': contents[2]})
+        digests = [file_contents.get_digest(content) for content in contents]
+
+        # The hashes of the largest file-dictionary are kept, the least
+        # recently used one is dropped and computed again.
+        self.assertEqual(len(file_contents.digests), 2)
+        self.assertNotIn(id(contents[0]), file_contents.digests)
+        self.assertEqual(file_contents.get_digest(contents[0]), digests[0])
+
+    def test_max_file_dicts(self):
+        contents = [('a\n',), ('b\n',), ('c\n',)]
+        file_contents = FileContents(max_file_dicts=2)
+        file_contents.add_file_dict({'a': contents[0], 'b': contents[1]})
+        file_contents.add_file_dict({'b': contents[1]})
+        file_contents.add_file_dict({'c': contents[2]})
+
+        # Contents of dropped file-dictionaries are unknown, unless they
+        # are contained in others.
+        self.assertIsNone(file_contents.get_digest(contents[0]))
+        self.assertIsNotNone(file_contents.get_digest(contents[1]))
+        self.assertIsNotNone(file_contents.get_digest(contents[2]))
@@ -0,0 +1,360 @@
+import concurrent.futures
+import io
+import logging
+from multiprocessing.connection import Listener
+import os
+import pickle
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+
+from coalib.core.Bear import Bear
+from coalib.core.Core import run
+from coalib.core.FileContents import FileContents
+from coalib.core.RemoteExecutor import (
+    BoundedDict, CallPickler, CallUnpickler, RemoteExecutor, format_address,
+    parse_address, serve)
+from coalib.settings.Section import Section
+
+
+class LineCountBear(Bear):
+
+    def analyze(self, filename):
+        return [(filename, len(self.file_dict[filename]))]
+
+    def generate_tasks(self):
+        return (((filename,), {}) for filename in sorted(self.file_dict))
+
+
+class FailingBear(LineCountBear):
+
+    def analyze(self, filename):
+        raise ValueError(filename)
+
+
+class UnpicklableResultBear(LineCountBear):
+
+    def analyze(self, filename):
+        return [lambda: filename]
+
+
+class AddressTest(unittest.TestCase):
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('127.0.0.1:80'), ('127.0.0.1', 80))
+        self.assertEqual(parse_address('/tmp/a:b'), '/tmp/a:b')
+
+    def test_format_address(self):
+        self.assertEqual(format_address(('127.0.0.1', 80)), '127.0.0.1:80')
+        self.assertEqual(format_address('/tmp/a:b'), '/tmp/a:b')
+
+
+class BoundedDictTest(unittest.TestCase):
+
+    def test_max_size(self):
+        uut = BoundedDict(2)
+        uut['a'] = 1
+        uut['b'] = 2
+        # Using 'a' keeps it over 'b'.
+        self.assertEqual(uut['a'], 1)
+        uut['c'] = 3
+
+        self.assertEqual(len(uut), 2)
+        self.assertIn('a', uut)
+        self.assertNotIn('b', uut)
+        with self.assertRaises(KeyError):
+            uut['b']
+
+
+class CallPicklerTest(unittest.TestCase):
+
+    def test_pickling(self):
+        content = ('line\n',) * 3
+        bear = LineCountBear(Section('test'), {'a': content,
+                                               'b': content,
+                                               'c': ['other\n']})
+        file_contents = FileContents()
+
+        output = io.BytesIO()
+        pickler = CallPickler(output, file_contents)
+        pickler.dump((bear.execute_task, (('a',), {}), {}))
+
+        self.assertEqual(len(pickler.digests), 2)
+        self.assertNotIn(b'line', output.getvalue())
+
+        unpickler = CallUnpickler(io.BytesIO(output.getvalue()), {})
+        unpickler.load()
+        self.assertEqual(unpickler.missing_digests, set(pickler.digests))
+
+        unpickler = CallUnpickler(io.BytesIO(output.getvalue()),
+                                  pickler.digests)
+        function, args, kwargs = unpickler.load()
+        self.assertEqual(unpickler.missing_digests, set())
+        self.assertEqual(function(*args, **kwargs), [('a', 3)])
+        self.assertEqual(function.__self__.file_dict,
+                         {'a': content, 'b': content, 'c': ['other\n']})
+
+
+class RemoteExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.section = Section('test')
+        self.file_dict = {'a': ('1\n',), 'b': ('1\n', '2\n'), 'c': ()}
+        self.executor = RemoteExecutor.start_local(2)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_run(self):
+        results = []
+        run({LineCountBear(self.section, self.file_dict)}, results.append,
+            executor=self.executor)
+
+        self.assertEqual(sorted(results), [('a', 1), ('b', 2), ('c', 0)])
+
+        # The executor can be reused.
+        results = []
+        run({LineCountBear(self.section, self.file_dict)}, results.append,
+            executor=self.executor)
+
+        self.assertEqual(sorted(results), [('a', 1), ('b', 2), ('c', 0)])
+
+    def test_file_contents_sent_once(self):
+        bear = LineCountBear(self.section, self.file_dict)
+        sent_files = []
+
+        for connection in self.executor.connections:
+            send = connection.send
+
+            def record(message, send=send):
+                if message[0] == 'files':
+                    sent_files.extend(message[1])
+                send(message)
+
+            connection.send = record
+
+        futures = [self.executor.submit(bear.execute_task, ('a',), {})
+                   for _ in range(10)]
+        for future in futures:
+            self.assertEqual(future.result(timeout=30), [('a', 1)])
+
+        # At most once to each of the two workers, for each of the three
+        # files.
+        self.assertLessEqual(len(sent_files), 6)
+        self.assertEqual(len(set(sent_files)), 3)
+
+    def test_exception(self):
+        bear = FailingBear(self.section, self.file_dict)
+        future = self.executor.submit(bear.execute_task, ('a',), {})
+
+        with self.assertRaises(ValueError) as cm:
+            future.result(timeout=30)
+        self.assertEqual(cm.exception.args, ('a',))
+
+    def test_unpicklable_result(self):
+        bear = UnpicklableResultBear(self.section, self.file_dict)
+        future = self.executor.submit(bear.execute_task, ('a',), {})
+
+        with self.assertRaisesRegex(RuntimeError,
+                                    'Unable to send back the result'):
+            future.result(timeout=30)
+
+    def test_connection_lost(self):
+        for process in self.executor.processes:
+            process.kill()
+            process.wait()
+
+        futures = [self.executor.submit(max, 1, 2) for _ in range(3)]
+        for future in futures:
+            with self.assertRaises(ConnectionError):
+                future.result(timeout=30)
+
+        with self.assertRaises(ConnectionError):
+            self.executor.submit(max, 1, 2).result(timeout=30)
+
+    def test_submit_after_shutdown(self):
+        self.executor.shutdown()
+
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(max, 1, 2)
+
+    def test_start_local_error(self):
+        processes = []
+        popen = subprocess.Popen
+
+        def start(*args, **kwargs):
+            processes.append(popen(*args, **kwargs))
+            return processes[-1]
+
+        with unittest.mock.patch('subprocess.Popen', side_effect=start), \
+                unittest.mock.patch('coalib.core.RemoteExecutor.parse_address',
+                                    side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                RemoteExecutor.start_local(2)
+
+        # The worker started before the error is terminated.
+        self.assertEqual(len(processes), 1)
+        self.assertIsNotNone(processes[0].returncode)
+        self.assertTrue(processes[0].stdout.closed)
+
+
+class ServeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.section = Section('test')
+        self.file_dict = {'a': ('1\n',), 'b': ('1\n', '2\n'), 'c': ()}
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def start_executor(self, max_file_contents=4096,
+                       executor_max_file_contents=4096):
+        listener = Listener(os.path.join(self.directory.name, 'socket'),
+                            authkey=b'secret')
+        self.addCleanup(listener.close)
+        threading.Thread(target=serve,
+                         args=(listener, max_file_contents),
+                         daemon=True).start()
+        executor = RemoteExecutor([listener.address], b'secret',
+                                  max_file_contents=executor_max_file_contents)
+        self.addCleanup(executor.shutdown)
+        return executor
+
+    def test_refused_connection(self):
+        listener = Listener(('127.0.0.1', 0), authkey=b'secret')
+        threading.Thread(target=serve, args=(listener,), daemon=True).start()
+
+        with self.assertLogs(logging.getLogger()) as cm:
+            with self.assertRaises(Exception):
+                RemoteExecutor([listener.address], b'wrong')
+            # A correct key still connects afterwards.
+            executor = RemoteExecutor([listener.address], b'secret')
+
+        self.assertIn('Refused a connection', cm.output[0])
+        self.assertEqual(executor.submit(max, 1, 2).result(timeout=30), 2)
+        executor.shutdown()
+
+    def test_unix_socket(self):
+        executor = self.start_executor()
+
+        future = executor.submit(
+            LineCountBear(self.section, self.file_dict).execute_task,
+            ('b',), {})
+        self.assertEqual(future.result(timeout=30), [('b', 2)])
+
+        future = executor.submit(
+            FailingBear(self.section, self.file_dict).execute_task,
+            ('a',), {})
+        with self.assertRaises(ValueError):
+            future.result(timeout=30)
+
+        future = executor.submit(
+            UnpicklableResultBear(self.section, self.file_dict).execute_task,
+            ('a',), {})
+        with self.assertRaisesRegex(RuntimeError,
+                                    'Unable to send back the result'):
+            future.result(timeout=30)
+
+    def test_dropped_file_contents(self):
+        executor = self.start_executor(max_file_contents=1)
+        bear = LineCountBear(self.section, {'a': ('1\n',),
+                                            'b': ('1\n', '2\n'),
+                                            'c': ('3\n',)})
+        sent_files = []
+
+        send = executor.connections[0].send
+
+        def record(message):
+            if message[0] == 'files':
+                sent_files.append(sorted(message[1]))
+            send(message)
+
+        executor.connections[0].send = record
+
+        for _ in range(2):
+            self.assertEqual(
+                executor.submit(bear.execute_task, ('a',), {}).result(
+                    timeout=30),
+                [('a', 1)])
+
+        # The worker keeps only one of the three contents, so the other two
+        # are sent again for the second call.
+        self.assertEqual(len(sent_files), 2)
+        self.assertEqual(len(sent_files[0]), 3)
+        self.assertEqual(len(sent_files[1]), 2)
+        self.assertLess(set(sent_files[1]), set(sent_files[0]))
+
+    def test_calls_larger_than_max_file_contents(self):
+        executor = self.start_executor(executor_max_file_contents=1)
+        bear = LineCountBear(self.section, {'a': ('1\n',),
+                                            'b': ('1\n', '2\n'),
+                                            'c': ('3\n',)})
+        sent_files = []
+
+        send = executor.connections[0].send
+
+        def record(message):
+            if message[0] == 'files':
+                sent_files.append(sorted(message[1]))
+            send(message)
+
+        executor.connections[0].send = record
+
+        for _ in range(3):
+            self.assertEqual(
+                executor.submit(bear.execute_task, ('a',), {}).result(
+                    timeout=30),
+                [('a', 1)])
+
+        # The contents of a call are remembered even if there are more than
+        # the executor keeps, so they are only sent once.
+        self.assertEqual(len(sent_files), 1)
+        self.assertEqual(len(sent_files[0]), 3)
+
+    def test_unpicklable_call(self):
+        executor = self.start_executor()
+
+        with self.assertRaises((pickle.PicklingError, AttributeError)):
+            executor.submit(lambda: 1).result(timeout=30)
+
+        # The executor is still usable.
+        self.assertEqual(executor.submit(max, 1, 2).result(timeout=30), 2)
+
+    def test_cancelled_call(self):
+        executor = self.start_executor()
+
+        running = executor.submit(time.sleep, 0.5)
+        cancelled = executor.submit(max, 1, 2)
+        self.assertTrue(cancelled.cancel())
+
+        self.assertEqual(executor.submit(max, 3, 4).result(timeout=30), 4)
+        self.assertIsNone(running.result(timeout=30))
+        self.assertTrue(cancelled.cancelled())
+
+    def test_shutdown_without_wait(self):
+        executor = self.start_executor()
+        future = executor.submit(max, 1, 2)
+
+        executor.shutdown(wait=False)
+
+        # Calls submitted before are still run.
+        self.assertEqual(future.result(timeout=30), 2)
+        for thread in executor.threads:
+            thread.join(timeout=30)
+            self.assertFalse(thread.is_alive())
+
+    def test_all_connections_lost(self):
+        executor = self.start_executor()
+        executor.shutdown()
+
+        future = concurrent.futures.Future()
+        executor.alive_threads = 1
+        executor.calls.put((future, max, (1, 2), {}))
+        executor.calls.put(None)
+        executor._connection_lost()
+
+        with self.assertRaises(ConnectionError):
+            future.result(timeout=0)
+        self.assertTrue(executor.calls.empty())
@@ -0,0 +1,65 @@
+import logging
+import threading
+import unittest
+
+from coalib.core.ResultDispatcher import ResultDispatcher
+
+
+class ResultDispatcherTest(unittest.TestCase):
+
+    def test_dispatch(self):
+        handled = []
+        threads = set()
+
+        def on_result(result):
+            threads.add(threading.current_thread())
+            handled.append(result)
+
+        uut = ResultDispatcher(on_result)
+        uut.start()
+        uut.dispatch([1, 2, 3])
+        uut.dispatch([])
+        uut.dispatch((4, 5))
+        uut.stop()
+
+        self.assertEqual(handled, [1, 2, 3, 4, 5])
+        self.assertEqual(threads, {uut.thread})
+        self.assertFalse(uut.thread.is_alive())
+
+    def test_slow_callback(self):
+        proceed = threading.Event()
+        handled = []
+
+        def on_result(result):
+            proceed.wait(timeout=10)
+            handled.append(result)
+
+        uut = ResultDispatcher(on_result)
+        uut.start()
+        # Dispatching doesn't wait for the callback.
+        for i in range(10):
+            uut.dispatch([i])
+        self.assertEqual(handled, [])
+
+        proceed.set()
+        uut.stop()
+        self.assertEqual(handled, list(range(10)))
+
+    def test_exception(self):
+        handled = []
+
+        def on_result(result):
+            if result == 2:
+                raise ValueError
+            handled.append(result)
+
+        uut = ResultDispatcher(on_result)
+        uut.start()
+        with self.assertLogs(logging.getLogger()) as cm:
+            uut.dispatch([1, 2, 3])
+            uut.stop()
+
+        self.assertEqual(handled, [1, 3])
+        self.assertEqual(len(cm.output), 1)
+        self.assertTrue(cm.output[0].startswith(
+            'ERROR:root:An exception was thrown during result-handling.'))
@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+
+from coalib.core.ResultStream import ResultStream
+
+
+class ResultStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.event_loop = asyncio.SelectorEventLoop()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.uut = ResultStream(self.event_loop, self.executor, 2)
+
+    def tearDown(self):
+        self.uut.close()
+        self.executor.shutdown()
+        self.event_loop.close()
+
+    def test_wait(self):
+        handled = []
+        writer = self.uut.open(handled.append)
+        for result in range(5):
+            writer.write(result)
+
+        self.event_loop.run_until_complete(
+            self.uut.wait(writer.task_id, writer.count))
+
+        self.assertEqual(handled, [[0, 1], [2, 3]])
+        self.assertEqual(writer.buffer, [4])
+        self.assertEqual(self.uut.handlers, {})
+
+    def test_wait_without_chunks(self):
+        handled = []
+        writer = self.uut.open(handled.append)
+        writer.write(0)
+
+        self.event_loop.run_until_complete(
+            self.uut.wait(writer.task_id, writer.count))
+
+        self.assertEqual(handled, [])
+        self.assertEqual(writer.buffer, [0])
+
+    def test_discard(self):
+        handled = []
+        writer = self.uut.open(handled.append)
+        self.uut.discard(writer.task_id)
+        writer.write(0)
+        writer.write(1)
+
+        other_writer = self.uut.open(handled.append)
+        other_writer.write(2)
+        other_writer.write(3)
+        self.event_loop.run_until_complete(
+            self.uut.wait(other_writer.task_id, other_writer.count))
+
+        self.assertEqual(handled, [[2, 3]])
@@ -0,0 +1,125 @@
+import logging
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from coalib.core.Bear import Bear
+from coalib.core.TaskCache import TaskCache
+from coalib.settings.Section import Section
+from coalib.settings.Setting import Setting
+
+
+class TestBear(Bear):
+
+    def analyze(self, filename, setting: int=0):
+        return [filename]
+
+
+class OtherBear(TestBear):
+    pass
+
+
+class TaskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.section = Section('test')
+        self.file_dict = {'a': ('1\n',), 'b': ('2\n',)}
+        self.uut = TaskCache()
+
+    def get_key(self, bear, *args, **kwargs):
+        return self.uut.get_key(bear, args, kwargs)
+
+    def test_get_task_files(self):
+        bear = TestBear(self.section, self.file_dict)
+
+        self.assertEqual(self.uut.get_task_files(bear, ('a', 1), {}), ['a'])
+        self.assertEqual(self.uut.get_task_files(bear, (), {'x': 'b'}), ['b'])
+        self.assertEqual(self.uut.get_task_files(bear, ('c',), {}),
+                         ['a', 'b'])
+
+    def test_get_key(self):
+        bear = TestBear(self.section, self.file_dict)
+        key = self.get_key(bear, 'a')
+
+        self.assertEqual(key, self.get_key(TestBear(self.section,
+                                                    dict(self.file_dict)),
+                                           'a'))
+        self.assertNotEqual(key, self.get_key(bear, 'b'))
+        self.assertNotEqual(key, self.get_key(bear, 'a', setting=1))
+        self.assertNotEqual(key, self.get_key(OtherBear(self.section,
+                                                        self.file_dict),
+                                              'a'))
+
+        # Only the files a task reads matter.
+        changed_file_dict = dict(self.file_dict, b=('3\n',))
+        self.assertEqual(key, self.get_key(TestBear(self.section,
+                                                    changed_file_dict),
+                                           'a'))
+        changed_file_dict = dict(self.file_dict, a=('3\n',))
+        self.assertNotEqual(key, self.get_key(TestBear(self.section,
+                                                       changed_file_dict),
+                                              'a'))
+
+        # Only settings the bear takes matter.
+        self.section.append(Setting('other', 'value'))
+        self.assertEqual(key, self.get_key(bear, 'a'))
+        self.section.append(Setting('setting', '1'))
+        self.assertNotEqual(key, self.get_key(bear, 'a'))
+
+    def test_get_bear_fingerprint_without_source(self):
+        fingerprint = self.uut.get_bear_fingerprint(TestBear)
+
+        # Without its source, a bear is still fingerprinted by its name and
+        # the coala version.
+        for patch_kwargs in ({'side_effect': TypeError},
+                             {'return_value': '/nonexistent/TestBear.py'}):
+            uut = TaskCache()
+            with unittest.mock.patch('inspect.getsourcefile',
+                                     **patch_kwargs):
+                self.assertNotEqual(uut.get_bear_fingerprint(TestBear),
+                                    fingerprint)
+                self.assertNotEqual(uut.get_bear_fingerprint(TestBear),
+                                    uut.get_bear_fingerprint(OtherBear))
+
+    def test_get_key_dependency_results(self):
+        bear = TestBear(self.section, self.file_dict)
+        key = self.get_key(bear, 'a')
+
+        bear.dependency_results[OtherBear] += [1, 2]
+        key_with_results = self.get_key(bear, 'a')
+        self.assertNotEqual(key, key_with_results)
+
+        other_bear = TestBear(self.section, self.file_dict)
+        other_bear.dependency_results[OtherBear] += [2, 1]
+        self.assertEqual(key_with_results, self.get_key(other_bear, 'a'))
+
+    def test_get_key_unpicklable(self):
+        bear = TestBear(self.section, self.file_dict)
+        self.assertIsNone(self.get_key(bear, lambda: None))
+
+        bear.dependency_results[OtherBear].append(lambda: None)
+        self.assertIsNone(self.get_key(bear, 'a'))
+
+    def test_save(self):
+        self.uut.save()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache')
+            uut = TaskCache(path)
+            self.assertIsNone(uut.get('key'))
+            uut.set('key', [1, 2])
+            uut.save()
+
+            self.assertEqual(TaskCache(path).get('key'), [1, 2])
+
+            with self.assertLogs(logging.getLogger()) as cm:
+                uut.set('key', [lambda: None])
+                uut.save()
+            self.assertIn('could not be saved', cm.output[0])
+
+            with open(path, 'wb') as file:
+                file.write(b'garbage')
+            with self.assertLogs(logging.getLogger()) as cm:
+                self.assertIsNone(TaskCache(path).get('key'))
+            self.assertIn('could not be loaded', cm.output[0])
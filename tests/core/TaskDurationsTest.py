@@ -0,0 +1,59 @@
+import unittest
+
+from pyprint.NullPrinter import NullPrinter
+
+from coalib.core.TaskDurations import (
+    TaskDurations, call_timed, get_durations_identifier)
+from coalib.misc.CachingUtilities import delete_files
+from coalib.output.printers.LogPrinter import LogPrinter
+
+
+class TaskDurationsTest(unittest.TestCase):
+
+    def test_get(self):
+        uut = TaskDurations()
+        # Without any known bear, every bear is assumed to take a second.
+        self.assertEqual(uut.get('SomeBear'), 1)
+
+        uut = TaskDurations({'SomeBear': 2, 'OtherBear': 4})
+        self.assertEqual(uut.get('SomeBear'), 2)
+        self.assertEqual(uut.get('UnknownBear'), 3)
+
+    def test_commit(self):
+        uut = TaskDurations({'SomeBear': 2}, weight=0.75)
+        uut.record('SomeBear', 3)
+        uut.record('SomeBear', 3)
+        uut.record('NewBear', 1)
+        uut.commit()
+
+        self.assertEqual(uut.durations, {'SomeBear': 5, 'NewBear': 1})
+        self.assertEqual(uut.current, {})
+
+        # Nothing recorded leaves the durations alone.
+        uut.commit()
+        self.assertEqual(uut.durations, {'SomeBear': 5, 'NewBear': 1})
+
+    def test_load_save(self):
+        log_printer = LogPrinter(NullPrinter())
+        project_dir = 'task_durations_test'
+        self.addCleanup(delete_files, log_printer,
+                        [get_durations_identifier(project_dir)])
+
+        uut = TaskDurations.load(log_printer, project_dir, weight=0.75)
+        self.assertEqual(uut.durations, {})
+        self.assertEqual(uut.weight, 0.75)
+
+        uut.record('SomeBear', 2)
+        uut.commit()
+        uut.record('SomeBear', 4)
+        self.assertTrue(uut.save(log_printer, project_dir))
+
+        # Only committed durations are stored.
+        uut = TaskDurations.load(log_printer, project_dir)
+        self.assertEqual(uut.durations, {'SomeBear': 2})
+        self.assertEqual(uut.current, {})
+
+    def test_call_timed(self):
+        duration, result = call_timed(sorted, [2, 1])
+        self.assertEqual(result, [1, 2])
+        self.assertGreaterEqual(duration, 0)
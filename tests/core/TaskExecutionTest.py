@@ -0,0 +1,77 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+import unittest.mock
+
+from coalib.core import TaskExecution
+from coalib.core.TaskExecution import (
+    chunk_tasks, execute_cached_tasks, execute_tasks, run_tasks)
+
+
+class TestBear:
+
+    def __init__(self, factor):
+        self.factor = factor
+
+    def execute_task(self, args, kwargs):
+        return [args[0] * self.factor]
+
+
+class TaskExecutionTest(unittest.TestCase):
+
+    def setUp(self):
+        TaskExecution._bear_cache.clear()
+
+    def test_chunk_tasks(self):
+        self.assertEqual(list(chunk_tasks([], 3)), [])
+        self.assertEqual(list(chunk_tasks(iter(range(6)), 3)),
+                         [(0, 1, 2), (3, 4, 5)])
+
+    def test_execute_tasks(self):
+        self.assertEqual(
+            execute_tasks(TestBear(2), [((1,), {}), ((2,), {})]), [[2], [4]])
+        self.assertEqual(execute_tasks(TestBear(2), []), [])
+
+    def test_execute_cached_tasks_eviction(self):
+        with unittest.mock.patch.object(TaskExecution, 'BEAR_CACHE_SIZE', 2):
+            execute_cached_tasks('a', TestBear(1), [])
+            execute_cached_tasks('b', TestBear(2), [])
+            # Accessing 'a' keeps it, so 'b' is evicted.
+            self.assertEqual(execute_cached_tasks('a', None, [((1,), {})]),
+                             [[1]])
+            execute_cached_tasks('c', TestBear(3), [])
+
+            self.assertEqual(list(TaskExecution._bear_cache), ['a', 'c'])
+            self.assertIsNone(execute_cached_tasks('b', None, [((1,), {})]))
+
+    def test_run_tasks_worker_cache_miss(self):
+        bear = TestBear(3)
+        event_loop = asyncio.new_event_loop()
+        self.addCleanup(event_loop.close)
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        stored = []
+
+        # The first chunk sends the bear right away.
+        self.assertEqual(
+            event_loop.run_until_complete(run_tasks(
+                bear, 'key', (((1,), {}),), event_loop, executor,
+                send_bear=True, store_results=stored.append)),
+            [3])
+        self.assertEqual(stored, [[[3]]])
+
+        # A later chunk lands on a worker that doesn't have the bear cached,
+        # so it's sent along with another call.
+        TaskExecution._bear_cache.clear()
+        with unittest.mock.patch.object(
+                TaskExecution, 'execute_cached_tasks',
+                wraps=execute_cached_tasks) as execute:
+            self.assertEqual(
+                event_loop.run_until_complete(run_tasks(
+                    bear, 'key', (((2,), {}), ((3,), {})), event_loop,
+                    executor)),
+                [6, 9])
+
+        self.assertEqual([call[0][1] for call in execute.call_args_list],
+                         [None, bear])
+        self.assertIs(TaskExecution._bear_cache['key'], bear)
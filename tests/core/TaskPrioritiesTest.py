@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+
+from coalib.core.DependencyTracker import DependencyTracker
+from coalib.core.TaskDurations import TaskDurations
+from coalib.core.TaskPriorities import TaskPriorities
+
+
+class TestBear:
+
+    def __init__(self, name):
+        self.name = name
+
+
+class TaskPrioritiesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.event_loop = asyncio.SelectorEventLoop()
+        self.dependency_tracker = DependencyTracker()
+        self.task_durations = TaskDurations({'A': 1, 'B': 2, 'C': 4})
+
+    def tearDown(self):
+        self.event_loop.close()
+
+    def test_get_priority(self):
+        bear_a, bear_b, bear_c, bear_d = (
+            TestBear(name) for name in ('A', 'B', 'C', 'D'))
+        # A -> B -> C and A -> D, where D is unknown.
+        self.dependency_tracker.add(bear_a, bear_b)
+        self.dependency_tracker.add(bear_b, bear_c)
+        self.dependency_tracker.add(bear_a, bear_d)
+
+        uut = TaskPriorities(self.task_durations, self.dependency_tracker,
+                             self.event_loop, 1)
+
+        self.assertEqual(uut.get_priority(bear_c), 4)
+        self.assertEqual(uut.get_priority(bear_d), 7 / 3)
+        self.assertEqual(uut.get_priority(bear_b), 6)
+        self.assertEqual(uut.get_priority(bear_a), 7)
+
+    def test_acquire_release(self):
+        uut = TaskPriorities(self.task_durations, self.dependency_tracker,
+                             self.event_loop, 1)
+        order = []
+
+        @asyncio.coroutine
+        def task(name, priority):
+            yield from uut.acquire(priority)
+            order.append(name)
+            # Let the other tasks queue up.
+            yield from asyncio.sleep(0, loop=self.event_loop)
+            uut.release()
+
+        tasks = [self.event_loop.create_task(task(name, priority))
+                 for name, priority in (('first', 0),
+                                        ('low', 1),
+                                        ('high', 5),
+                                        ('low2', 1))]
+        self.event_loop.run_until_complete(asyncio.gather(
+            *tasks, loop=self.event_loop))
+
+        self.assertEqual(order, ['first', 'high', 'low', 'low2'])
+        self.assertEqual(uut.free_slots, 1)
+
+    def test_release_cancelled(self):
+        uut = TaskPriorities(self.task_durations, self.dependency_tracker,
+                             self.event_loop, 1)
+        self.event_loop.run_until_complete(uut.acquire(0))
+
+        waiting = self.event_loop.create_task(uut.acquire(1))
+        self.event_loop.run_until_complete(asyncio.sleep(0,
+                                                         loop=self.event_loop))
+        waiting.cancel()
+        self.event_loop.run_until_complete(asyncio.sleep(0,
+                                                         loop=self.event_loop))
+
+        uut.release()
+        self.assertEqual(uut.free_slots, 1)
+        self.assertEqual(uut.waiting, [])
+
+    def test_record(self):
+        uut = TaskPriorities(self.task_durations, self.dependency_tracker,
+                             self.event_loop, 1)
+        uut.record(TestBear('A'), 3)
+        uut.record(TestBear('A'), 1)
+
+        self.assertEqual(self.task_durations.current, {'A': 4})
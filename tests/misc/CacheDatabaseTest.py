@@ -0,0 +1,243 @@
+import os
+import pickle
+import time
+from tempfile import TemporaryDirectory
+import unittest
+from unittest.mock import patch
+
+from pyprint.NullPrinter import NullPrinter
+
+from coalib.misc.CacheDatabase import CacheDatabase
+from coalib.misc.CachingUtilities import hash_id
+from coalib.output.printers.LogPrinter import LogPrinter
+
+
+class CacheDatabaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.log_printer = LogPrinter(NullPrinter())
+        self.database = CacheDatabase(self.log_printer, ':memory:')
+
+    def test_project_values(self):
+        self.assertEqual(self.database.get_time('project'), -1)
+
+        self.database.set_time('project', 42)
+        self.assertEqual(self.database.get_time('project'), 42)
+        self.assertEqual(self.database.get_time('other'), -1)
+
+    def test_files(self):
+        self.database.set_files('project', {('a', 'a.c'): None,
+                                            ('a', 'b.c'): (1, 2, 'digest'),
+                                            ('b', 'a.c'): None})
+        self.database.set_files('other', {('a', 'c.c'): None})
+        self.assertEqual(self.database.get_files('project'),
+                         {('a', 'a.c'): None,
+                          ('a', 'b.c'): (1, 2, 'digest'),
+                          ('b', 'a.c'): None})
+
+        self.database.set_files('project', {('a', 'a.c'): (3, 4, 'digest')})
+        self.assertEqual(self.database.get_files('project')[('a', 'a.c')],
+                         (3, 4, 'digest'))
+
+        # Files are untracked per section.
+        self.database.set_results('project', 'a', 'a.c', [1])
+        self.database.set_results('project', 'b', 'a.c', [1])
+        self.database.remove_files('project', {('a', 'a.c')})
+        self.assertEqual(self.database.get_files('project'),
+                         {('a', 'b.c'): (1, 2, 'digest'),
+                          ('b', 'a.c'): None})
+        self.assertEqual(set(self.database.get_results('project')),
+                         {('b', 'a.c')})
+
+    def test_results(self):
+        self.database.set_results('project', 'section', 'a.c', [1, 2])
+        self.database.set_results('project', 'section', 'b.c', [3])
+        self.database.set_results('project', 'section', 'b.c', [])
+        self.assertEqual(
+            {key: pickle.loads(results)
+             for key, results in self.database.get_results(
+                 'project').items()},
+            {('section', 'a.c'): [1, 2]})
+
+    def test_section_settings(self):
+        self.database.set_section_settings('project', {'a': 'hash',
+                                                       'b': 'hash'})
+        self.database.set_section_settings('project', {'a': 'changed'})
+        self.assertEqual(self.database.get_section_settings('project'),
+                         {'a': 'changed', 'b': 'hash'})
+        self.assertEqual(self.database.get_section_settings('other'), {})
+
+    def test_clear(self):
+        self.database.set_time('project', 42)
+        self.database.set_section_settings('project', {'a': 'hash'})
+        self.database.set_files('project', {('section', 'a.c'): None})
+        self.database.set_results('project', 'section', 'a.c', [1])
+        self.database.set_files('other', {('section', 'a.c'): None})
+
+        self.database.clear('project')
+        self.assertEqual(self.database.get_time('project'), -1)
+        self.assertEqual(self.database.get_files('project'), {})
+        self.assertEqual(self.database.get_results('project'), {})
+        self.assertEqual(self.database.get_section_settings('project'), {})
+        self.assertEqual(self.database.get_files('other'),
+                         {('section', 'a.c'): None})
+
+    def test_collect_garbage(self):
+        self.database.set_time('old', int(time.time()) - 100)
+        self.database.set_time('older', int(time.time()) - 200)
+        self.database.set_time('new', int(time.time()))
+        self.database.set_time('unused', 42)
+        self.database.clear('unused')
+        self.database.set_results('older', 'section', 'a.c', [1])
+
+        self.assertEqual(self.database.collect_garbage(), [])
+        # Caches that were never written are evicted first.
+        self.assertEqual(self.database.collect_garbage(max_age=1000),
+                         ['unused'])
+        self.assertEqual(self.database.collect_garbage(max_age=50,
+                                                       keep='older'),
+                         ['old'])
+        self.assertEqual(self.database.get_time('older'),
+                         int(time.time()) - 200)
+        self.assertEqual(self.database.collect_garbage(max_age=50),
+                         ['older'])
+        self.assertEqual(self.database.get_time('older'), -1)
+        self.assertEqual(self.database.get_results('older'), {})
+        self.assertEqual(self.database.get_time('new'), int(time.time()))
+
+    def test_collect_garbage_size(self):
+        for project in ('a', 'b', 'c'):
+            self.database.set_time(project, ord(project))
+            self.database.set_results(project, 'section', 'a.c',
+                                      [os.urandom(100000)])
+        size = self.database.get_size()
+
+        self.assertEqual(self.database.collect_garbage(max_size=size), [])
+        self.assertEqual(self.database.collect_garbage(max_size=size - 1),
+                         ['a'])
+        self.assertLess(self.database.get_size(), size)
+        self.assertEqual(self.database.collect_garbage(max_size=0, keep='c'),
+                         ['b'])
+        self.assertEqual(self.database.get_time('c'), ord('c'))
+
+    def test_vacuum(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            database = CacheDatabase(self.log_printer, path)
+            database.set_time('project', 42)
+            database.set_results('project', 'section', 'a.c',
+                                 [os.urandom(100000)])
+            database.collect_garbage(max_age=0)
+            database.vacuum()
+            self.assertEqual(os.path.getsize(path), database.get_size())
+            self.assertEqual(os.path.getsize(path + '-wal'), 0)
+            database.close()
+
+    def test_transaction(self):
+        with self.assertRaises(ValueError):
+            with self.database.transaction():
+                self.database.set_time('project', 42)
+                raise ValueError
+
+        self.assertEqual(self.database.get_time('project'), -1)
+
+        with self.database.transaction():
+            self.database.set_time('project', 42)
+
+        self.assertEqual(self.database.get_time('project'), 42)
+
+    def test_concurrent_connections(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            first = CacheDatabase(self.log_printer, path)
+            second = CacheDatabase(self.log_printer, path)
+
+            with first.transaction():
+                first.set_time('project', 42)
+                # Readers see the last committed state meanwhile.
+                self.assertEqual(second.get_time('project'), -1)
+
+            self.assertEqual(second.get_time('project'), 42)
+            first.close()
+            second.close()
+
+    def test_migration(self):
+        with TemporaryDirectory() as directory:
+            def dump(identifier, data):
+                with open(os.path.join(directory, hash_id(identifier)),
+                          'wb') as file:
+                    pickle.dump(data, file)
+
+            dump('project', {'time': 42,
+                             'files': {'a.c': 42, 'b.c': 42},
+                             'results': {('section', 'a.c'): [1]},
+                             'fingerprints': {'b.c': (1, 2, 'digest')}})
+            dump('other', {'answer': 42})
+            dump('list', [42])
+            with open(os.path.join(directory, hash_id('corrupt')),
+                      'wb') as file:
+                file.write(b'corrupt')
+
+            database = CacheDatabase(
+                self.log_printer, os.path.join(directory, 'cache.sqlite3'))
+            self.assertEqual(database.get_time('project'), 42)
+            # Pickled caches don't know which sections analyzed the files.
+            self.assertEqual(database.get_files('project'), {})
+            self.assertEqual(database.get_results('project'), {})
+            database.close()
+
+            # Only the migrated pickles are removed.
+            self.assertEqual(
+                sorted(os.listdir(directory)),
+                sorted([hash_id('other'), hash_id('list'),
+                        hash_id('corrupt'), 'cache.sqlite3']))
+
+    def test_existing_database(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            CacheDatabase(self.log_printer, path).close()
+
+            with open(os.path.join(directory, hash_id('project')),
+                      'wb') as file:
+                pickle.dump({'files': {}}, file)
+
+            database = CacheDatabase(self.log_printer, path)
+            database.set_files('project', {('a', 'a.c'): None})
+            self.assertEqual(database.get_files('project'),
+                             {('a', 'a.c'): None})
+            database.close()
+
+            # Pickles are only migrated into new databases.
+            self.assertIn(hash_id('project'), os.listdir(directory))
+
+    def test_corrupt_database(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            with open(path, 'wb') as file:
+                file.write(b'corrupt' * 1000)
+
+            with patch.object(self.log_printer, 'warn') as warn:
+                database = CacheDatabase(self.log_printer, path)
+            self.assertIn('corrupted', warn.call_args[0][0])
+
+            database.set_time('project', 42)
+            self.assertEqual(database.get_time('project'), 42)
+            database.close()
+
+    @patch('coalib.misc.CacheDatabase.os.makedirs',
+           side_effect=PermissionError)
+    def test_permission_error(self, makedirs):
+        with patch.object(self.log_printer, 'err') as err:
+            database = CacheDatabase(self.log_printer)
+
+        self.assertEqual(database.path, ':memory:')
+        self.assertIn('Continuing without caching', err.call_args[0][0])
+
+    @patch('coalib.misc.CacheDatabase.sqlite3.connect')
+    def test_connection_closed_on_error(self, connect):
+        connect.return_value.execute.side_effect = RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            CacheDatabase(self.log_printer, ':memory:')
+
+        connect.return_value.close.assert_called_once_with()
@@ -1,12 +1,17 @@
 import unittest
+import logging
 import re
 import os
+import threading
+import time
+from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
 from pyprint.NullPrinter import NullPrinter
 
-from coalib.misc.Caching import FileCache
-from coalib.misc.CachingUtilities import pickle_load, pickle_dump
+from coalib.misc.CacheDatabase import CacheDatabase
+from coalib.misc.Caching import DEFAULT_SECTION_NAME, FileCache
+from coalib.misc.CachingUtilities import hash_file
 from coalib.output.printers.LogPrinter import LogPrinter
 from coalib import coala
 from coala_utils.ContextManagers import prepare_file
@@ -25,26 +30,150 @@ class CachingTest(unittest.TestCase):
         self.cache = FileCache(self.log_printer, 'coala_test', flush_cache=True)
 
     def test_file_tracking(self):
-        self.cache.track_files({'test.c', 'file.py'})
-        self.assertEqual(self.cache.data, {'test.c': -1, 'file.py': -1})
+        self.cache.track_files({'test.c', 'file.py'}, 'section')
+        self.cache.track_files({'test.c'}, 'other')
+        self.assertEqual(self.cache.data, {('section', 'test.c'): -1,
+                                           ('section', 'file.py'): -1,
+                                           ('other', 'test.c'): -1})
 
-        self.cache.untrack_files({'test.c'})
-        self.cache.track_files({'test.c'})
+        self.cache.untrack_files({'test.c'}, 'section')
+        self.cache.track_files({'test.c'}, 'section')
         self.cache.write()
-        self.assertFalse('test.c' in self.cache.data)
-        self.assertTrue('file.py' in self.cache.data)
+        self.assertFalse(('section', 'test.c') in self.cache.data)
+        self.assertTrue(('section', 'file.py') in self.cache.data)
+        # Files are untracked per section.
+        self.assertTrue(('other', 'test.c') in self.cache.data)
 
-        self.cache.untrack_files({'test.c', 'file.py'})
+        self.cache.untrack_files({'test.c', 'file.py'}, 'section')
         self.cache.write()
-        self.assertFalse('test.c' in self.cache.data)
-        self.assertFalse('file.py' in self.cache.data)
+        self.assertEqual(set(self.cache.data), {('other', 'test.c')})
+
+        # Files are only untracked once.
+        self.cache.track_files({'test.c'}, 'section')
+        self.cache.write()
+        self.assertTrue(('section', 'test.c') in self.cache.data)
+
+        # Changed files are untracked for all sections.
+        self.cache.untrack_changed_files({'test.c'})
+        self.cache.write()
+        self.assertEqual(set(self.cache.data), set())
+
+    def test_deprecated_default_section(self):
+        with self.assertLogs(logging.getLogger()) as cm:
+            self.assertEqual(self.cache.get_uncached_files({'test.c'}),
+                             {'test.c'})
+            self.cache.track_files({'test.c'})
+            self.cache.untrack_files({'test.c'})
+
+        self.assertEqual(set(self.cache.data),
+                         {(DEFAULT_SECTION_NAME, 'test.c')})
+        self.assertEqual(self.cache.to_untrack,
+                         {(DEFAULT_SECTION_NAME, 'test.c')})
+        self.assertEqual(len(cm.output), 3)
+        self.assertIn('FileCache.get_uncached_files without a section_name is '
+                      'deprecated', cm.output[0])
 
     def test_write(self):
-        self.cache.track_files({'test2.c'})
-        self.assertEqual(self.cache.data['test2.c'], -1)
+        self.cache.track_files({'test2.c'}, 'section')
+        self.assertEqual(self.cache.data[('section', 'test2.c')], -1)
+
+        self.cache.write()
+        self.assertNotEqual(self.cache.data[('section', 'test2.c')], -1)
+        # The connection is closed and opened again by the next write.
+        self.assertIsNone(self.cache.database)
+
+        self.cache.untrack_files({'test2.c'}, 'section')
+        self.cache.write()
+        self.assertIsNone(self.cache.database)
+        cache = FileCache(self.log_printer, 'coala_test', flush_cache=False)
+        self.assertNotIn(('section', 'test2.c'), cache.data)
+        cache.write()
+
+    @patch('coalib.misc.CacheDatabase.CacheDatabase.set_time',
+           side_effect=RuntimeError)
+    def test_write_error(self, set_time):
+        with self.assertRaises(RuntimeError):
+            self.cache.write()
+        self.assertIsNone(self.cache.database)
 
+    def test_results(self):
+        self.cache.track_files({'test.c', 'file.py'}, 'section')
+        self.cache.set_results('section', 'test.c', ['result'])
+        self.cache.set_results('section', 'file.py', ['result'])
+        self.cache.set_results('section', 'file.py', [])
         self.cache.write()
-        self.assertNotEqual(self.cache.data['test2.c'], -1)
+        self.assertEqual(self.cache.get_results('section', 'test.c'),
+                         ['result'])
+        self.assertEqual(self.cache.get_results('section', 'file.py'), [])
+        self.assertEqual(self.cache.get_results('other', 'test.c'), [])
+
+        cache = FileCache(self.log_printer, 'coala_test', flush_cache=False)
+        self.assertEqual(cache.get_results('section', 'test.c'), ['result'])
+
+        # Results of untracked files are dropped.
+        cache.set_results('section', 'test.c', ['other result'])
+        cache.untrack_files({'test.c'}, 'section')
+        cache.write()
+        self.assertEqual(cache.get_results('section', 'test.c'), [])
+
+        # Files whose results can't be loaded any more are analyzed again.
+        database = CacheDatabase(self.log_printer)
+        try:
+            database.set_results('coala_test', 'section', 'file.py',
+                                 ['result'])
+            database.connection.execute("UPDATE results SET results = x'00'")
+        finally:
+            database.close()
+        cache = FileCache(self.log_printer, 'coala_test', flush_cache=False)
+        self.assertNotIn(('section', 'file.py'), cache.data)
+
+        cache.set_results('section', 'file.py', ['result'])
+        cache.flush_cache()
+        self.assertEqual(cache.get_results('section', 'file.py'), [])
+
+    def test_section_settings(self):
+        self.cache.track_files({'test.c', 'other.c'}, 'a')
+        self.assertTrue(self.cache.section_settings_changed(
+            'a', 'hash', {'test.c', 'other.c'}))
+        self.cache.track_files({'test.c'}, 'b')
+        self.assertTrue(self.cache.section_settings_changed(
+            'b', 'hash', {'test.c'}))
+        self.cache.set_results('a', 'test.c', ['result'])
+        self.cache.set_results('b', 'test.c', ['result'])
+        self.cache.write()
+        # Sections don't untrack the files of other sections.
+        self.assertEqual(set(self.cache.data), {('a', 'test.c'),
+                                                ('a', 'other.c'),
+                                                ('b', 'test.c')})
+
+        cache = FileCache(self.log_printer, 'coala_test', flush_cache=False)
+        self.assertFalse(cache.section_settings_changed('a', 'hash', set()))
+        self.assertFalse(cache.section_settings_changed('b', 'hash', set()))
+
+        # Only the results of the changed section are dropped.
+        self.assertTrue(cache.section_settings_changed(
+            'a', 'changed', {'test.c', 'other.c'}))
+        self.assertEqual(cache.get_results('a', 'test.c'), [])
+        self.assertEqual(cache.get_results('b', 'test.c'), ['result'])
+        cache.write()
+
+        cache = FileCache(self.log_printer, 'coala_test', flush_cache=False)
+        self.assertFalse(cache.section_settings_changed('a', 'changed', set()))
+        self.assertEqual(cache.get_results('a', 'test.c'), [])
+        self.assertEqual(cache.get_results('b', 'test.c'), ['result'])
+
+        # Files not analyzed with the new settings are analyzed when the
+        # section runs on them again, the ones of other sections are kept.
+        cache.set_results('a', 'other.c', ['result'])
+        self.assertTrue(cache.section_settings_changed(
+            'a', 'hash', {'test.c'}))
+        cache.write()
+        self.assertEqual(set(cache.data), {('a', 'test.c'), ('b', 'test.c')})
+        self.assertEqual(cache.get_results('a', 'other.c'), [])
+        self.assertEqual(cache.get_results('b', 'test.c'), ['result'])
+
+        cache.flush_cache()
+        self.assertTrue(cache.section_settings_changed('b', 'hash', set()))
 
     @patch('coalib.misc.Caching.os')
     def test_get_uncached_files(self, mock_os):
@@ -52,49 +181,162 @@ class CachingTest(unittest.TestCase):
         cache = FileCache(self.log_printer, 'coala_test3', flush_cache=True)
 
         # Since this is a new FileCache object, the return must be the full set
-        cache.current_time = 0
+        cache.current_time = 1
         mock_os.path.getmtime.return_value = 0
-        self.assertEqual(cache.get_uncached_files({file_path}), {file_path})
+        self.assertEqual(cache.get_uncached_files({file_path}, 'section'),
+                         {file_path})
 
-        cache.track_files({file_path})
-        self.assertEqual(cache.get_uncached_files({file_path}), {file_path})
+        cache.track_files({file_path}, 'section')
+        self.assertEqual(cache.get_uncached_files({file_path}, 'section'),
+                         {file_path})
 
         cache.write()
-        self.assertEqual(cache.get_uncached_files({file_path}), set())
+        self.assertEqual(cache.get_uncached_files({file_path}, 'section'),
+                         set())
 
         # Simulate changing the file and then getting uncached files
         # Since the file has been edited since the last run it's returned
-        cache.current_time = 1
-        mock_os.path.getmtime.return_value = 1
-        cache.track_files({file_path})
-        self.assertEqual(cache.get_uncached_files({file_path}), {file_path})
+        cache.current_time = 3
+        mock_os.path.getmtime.return_value = 2
+        cache.track_files({file_path}, 'section')
+        self.assertEqual(cache.get_uncached_files({file_path}, 'section'),
+                         {file_path})
         cache.write()
 
         # Not changing the file should NOT return it the next time
-        cache.current_time = 2
-        self.assertEqual(cache.get_uncached_files({file_path}), set())
+        cache.current_time = 4
+        self.assertEqual(cache.get_uncached_files({file_path}, 'section'),
+                         set())
+
+        # A file changed within the second the last run started in may have
+        # been changed after it was analyzed, so it's returned
+        mock_os.path.getmtime.return_value = 3
+        self.assertEqual(cache.get_uncached_files({file_path}, 'section'),
+                         {file_path})
+
+        # Files are tracked per section.
+        mock_os.path.getmtime.return_value = 0
+        self.assertEqual(cache.get_uncached_files({file_path}, 'other'),
+                         {file_path})
 
     def test_persistence(self):
         with FileCache(self.log_printer, 'test3', flush_cache=True) as cache:
-            cache.track_files({'file.c'})
-        self.assertTrue('file.c' in cache.data)
+            cache.track_files({'file.c'}, 'section')
+        self.assertTrue(('section', 'file.c') in cache.data)
 
         with FileCache(self.log_printer, 'test3', flush_cache=False) as cache:
-            self.assertTrue('file.c' in cache.data)
+            self.assertTrue(('section', 'file.c') in cache.data)
+
+    def test_content_hashes(self):
+        with TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'test.c')
+            missing_path = os.path.join(directory, 'missing.c')
+            with open(file_path, 'w') as file:
+                file.write('int main() {}\n')
+            # Pretend the file was last modified long ago, so it's not
+            # modified in the same second as a run started.
+            os.utime(file_path, (1000, 1000))
+
+            cache = FileCache(self.log_printer, 'coala_test4',
+                              flush_cache=True, content_hashes=True)
+            cache.track_files({file_path, missing_path}, 'section')
+            self.assertEqual(
+                cache.get_uncached_files({file_path, missing_path}, 'section'),
+                {file_path, missing_path})
+            cache.write()
+            self.assertEqual(set(cache.fingerprints), {('section', file_path)})
+
+            def get_uncached_files():
+                cache = FileCache(self.log_printer, 'coala_test4',
+                                  content_hashes=True)
+                cache.track_files({file_path}, 'section')
+                with patch('coalib.misc.Caching.hash_file',
+                           wraps=hash_file) as hash_file_mock:
+                    uncached_files = cache.get_uncached_files(
+                        {file_path}, 'section')
+                cache.write()
+                return uncached_files, hash_file_mock.call_count
+
+            # Unchanged files aren't hashed again.
+            self.assertEqual(get_uncached_files(), (set(), 0))
+
+            # Only touched files are hashed again, but not considered changed.
+            os.utime(file_path, (2000, 2000))
+            self.assertEqual(get_uncached_files(), (set(), 1))
+            self.assertEqual(get_uncached_files(), (set(), 0))
+
+            # Changes are detected per section, so a section seeing a change
+            # doesn't hide it from the others.
+            cache = FileCache(self.log_printer, 'coala_test4',
+                              content_hashes=True)
+            cache.track_files({file_path}, 'other')
+            cache.get_uncached_files({file_path}, 'other')
+            cache.write()
+            with open(file_path, 'w') as file:
+                file.write('int main() { return 0; }\n')
+            os.utime(file_path, (2000, 2000))
+            cache = FileCache(self.log_printer, 'coala_test4',
+                              content_hashes=True)
+            self.assertEqual(cache.get_uncached_files({file_path}, 'other'),
+                             {file_path})
+            self.assertEqual(cache.get_uncached_files({file_path}, 'section'),
+                             {file_path})
+            cache.write()
+            self.assertEqual(get_uncached_files(), (set(), 0))
+
+            # Files modified in the second the last run started may have
+            # been modified after they were hashed, so they are hashed again.
+            now = time.time()
+            os.utime(file_path, (now, now))
+            self.assertEqual(get_uncached_files(), (set(), 1))
+            self.assertEqual(get_uncached_files(), (set(), 1))
+
+            with patch('coalib.misc.Caching.hash_file',
+                       side_effect=PermissionError):
+                self.assertEqual(
+                    cache.get_uncached_files({file_path}, 'section'),
+                    {file_path})
+            self.assertNotIn(('section', file_path), cache.fingerprints)
+
+    @patch('coalib.misc.CacheDatabase.CacheDatabase.collect_garbage')
+    def test_collect_garbage(self, collect_garbage):
+        self.cache.write()
+        self.assertFalse(collect_garbage.called)
+
+        # The cache being written is kept regardless of the limits.
+        cache = FileCache(self.log_printer, 'coala_test', max_age=1000,
+                          max_size=0)
+        cache.write()
+        collect_garbage.assert_called_once_with(1000, 0, keep='coala_test')
+
+    def test_lock(self):
+        thread = threading.Thread(target=self.cache.track_files,
+                                  args=({'test.c'}, 'section'))
+        with self.cache.lock:
+            thread.start()
+            thread.join(timeout=0.05)
+            # Sections executed concurrently wait for each other.
+            self.assertTrue(thread.is_alive())
+            self.assertNotIn(('section', 'test.c'), self.cache.data)
+
+        thread.join()
+        self.assertIn(('section', 'test.c'), self.cache.data)
 
     def test_time_travel(self):
         cache = FileCache(self.log_printer, 'coala_test2', flush_cache=True)
-        cache.track_files({'file.c'})
+        cache.track_files({'file.c'}, 'section')
         cache.write()
-        self.assertTrue('file.c' in cache.data)
+        self.assertTrue(('section', 'file.c') in cache.data)
 
-        cache_data = pickle_load(self.log_printer, 'coala_test2', {})
         # Back to the future :)
-        cache_data['time'] = 2000000000
-        pickle_dump(self.log_printer, 'coala_test2', cache_data)
+        database = CacheDatabase(self.log_printer)
+        try:
+            database.set_time('coala_test2', 2000000000)
+        finally:
+            database.close()
 
         cache = FileCache(self.log_printer, 'coala_test2', flush_cache=False)
-        self.assertFalse('file.c' in cache.data)
+        self.assertFalse(('section', 'file.c') in cache.data)
 
     def test_caching_results(self):
         """
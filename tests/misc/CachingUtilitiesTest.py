@@ -1,13 +1,17 @@
+import logging
 import os
 import unittest
 
 from pyprint.NullPrinter import NullPrinter
 
+from coalib.bears.LocalBear import LocalBear
 from coalib.misc.CachingUtilities import (
-    get_settings_hash, settings_changed, update_settings_db,
-    get_data_path, pickle_load, pickle_dump, delete_files)
+    DEFAULT_CACHE_MAX_AGE, get_bear_settings_hash, get_cache_limits,
+    get_section_settings_hash, get_data_path, pickle_load, pickle_dump,
+    delete_files, settings_changed, update_settings_db)
 from coalib.output.printers.LogPrinter import LogPrinter
 from coalib.settings.Section import Section
+from coalib.settings.Setting import Setting
 
 
 class CachingUtilitiesTest(unittest.TestCase):
@@ -56,17 +60,57 @@ class SettingsTest(unittest.TestCase):
     def setUp(self):
         self.log_printer = LogPrinter(NullPrinter())
 
-    def test_settings_change(self):
-        sections = {}
-        settings_hash = get_settings_hash(sections)
-        update_settings_db(self.log_printer, settings_hash)
-        self.assertFalse(settings_changed(self.log_printer, settings_hash))
-
-        sections = {'a': Section('a')}
-        settings_hash = get_settings_hash(sections)
-        self.assertTrue(settings_changed(self.log_printer, settings_hash))
-
-    def test_targets_change(self):
-        sections = {'a': Section('a'), 'b': Section('b')}
-        self.assertNotEqual(get_settings_hash(sections),
-                            get_settings_hash(sections, targets=['a']))
+    def test_deprecated_settings_db(self):
+        with self.assertLogs(logging.getLogger()) as cm:
+            update_settings_db(self.log_printer, 'hash')
+            self.assertFalse(settings_changed(self.log_printer, 'other'))
+
+        self.assertEqual(len(cm.output), 2)
+        self.assertIn('update_settings_db is deprecated', cm.output[0])
+        self.assertIn('settings_changed is deprecated', cm.output[1])
+
+    def test_bear_settings_hash(self):
+        class SomeBear(LocalBear):
+            def run(self, filename, file, max_line_length: int=79):
+                pass
+
+        class OtherBear(SomeBear):
+            pass
+
+        section = Section('a')
+        section.append(Setting('unrelated', '1'))
+        settings_hash = get_bear_settings_hash(SomeBear, section)
+        self.assertNotEqual(get_bear_settings_hash(OtherBear, section),
+                            settings_hash)
+
+        # Only settings the bear takes matter.
+        section.append(Setting('unrelated', '2'))
+        self.assertEqual(get_bear_settings_hash(SomeBear, section),
+                         settings_hash)
+
+        section.append(Setting('max_line_length', '80'))
+        self.assertNotEqual(get_bear_settings_hash(SomeBear, section),
+                            settings_hash)
+
+        self.assertEqual(
+            get_section_settings_hash(section, [SomeBear, OtherBear]),
+            get_section_settings_hash(section, [OtherBear, SomeBear]))
+        self.assertNotEqual(
+            get_section_settings_hash(section, [SomeBear, OtherBear]),
+            get_section_settings_hash(section, [SomeBear]))
+
+    def test_cache_limits(self):
+        section = Section('cli')
+        self.assertEqual(get_cache_limits(section, self.log_printer),
+                         (90 * 24 * 60 * 60, 512 * 1024 * 1024))
+
+        section.append(Setting('cache_max_age', '0.5'))
+        section.append(Setting('cache_max_size', '0'))
+        self.assertEqual(get_cache_limits(section, self.log_printer),
+                         (12 * 60 * 60, None))
+
+        section.append(Setting('cache_max_age', 'forever'))
+        with unittest.mock.patch.object(self.log_printer, 'warn') as warn:
+            max_age, _ = get_cache_limits(section, self.log_printer)
+        self.assertEqual(max_age, DEFAULT_CACHE_MAX_AGE * 24 * 60 * 60)
+        self.assertIn('cache_max_age', warn.call_args[0][0])
@@ -1,10 +1,13 @@
 from contextlib import ExitStack
 import os
+import platform
 import sys
 from tempfile import NamedTemporaryFile
+import time
 import unittest
 
-from coalib.misc.Shell import run_interactive_shell_command, run_shell_command
+from coalib.misc.Shell import (
+    kill_process_group, run_interactive_shell_command, run_shell_command)
 
 
 class RunShellCommandTest(unittest.TestCase):
@@ -62,6 +65,62 @@ class RunShellCommandTest(unittest.TestCase):
                                                weird_parameter=30):
                 pass
 
+    @unittest.skipIf(platform.system() == 'Windows',
+                     'Process groups are killed differently on Windows.')
+    def test_run_interactive_shell_command_interrupted(self):
+        command = [sys.executable, '-c',
+                   'import subprocess, sys, time\n'
+                   'child = subprocess.Popen([sys.executable, "-c", '
+                   '"import time; time.sleep(60)"])\n'
+                   'print(child.pid, flush=True)\n'
+                   'time.sleep(60)\n']
+
+        start = time.time()
+        with self.assertRaises(ValueError):
+            with run_interactive_shell_command(command,
+                                               new_session=True) as p:
+                child_pid = int(p.stdout.readline())
+                raise ValueError
+
+        # The command and the process started by it are killed.
+        self.assertLess(time.time() - start, 30)
+        self.assertIsNotNone(p.returncode)
+        for i in range(100):
+            try:
+                os.kill(child_pid, 0)
+            except ProcessLookupError:
+                break
+            time.sleep(0.1)
+        else:
+            self.fail('The process started by the command is still running.')
+
+    @unittest.skipIf(platform.system() == 'Windows',
+                     'Sessions only exist on POSIX systems.')
+    def test_run_interactive_shell_command_session(self):
+        command = [sys.executable, '-c', 'import os; print(os.getsid(0))']
+        with run_interactive_shell_command(command) as p:
+            self.assertEqual(int(p.stdout.read()), os.getsid(0))
+
+        with run_interactive_shell_command(command, new_session=True) as p:
+            self.assertEqual(int(p.stdout.read()), p.pid)
+
+    def test_run_interactive_shell_command_interrupted_same_session(self):
+        with self.assertRaises(ValueError):
+            with run_interactive_shell_command(
+                    [sys.executable, '-c', '']) as p:
+                raise ValueError
+
+        # The command is waited for.
+        self.assertEqual(p.returncode, 0)
+
+    def test_kill_process_group_finished(self):
+        with run_interactive_shell_command([sys.executable, '-c', '']) as p:
+            pass
+
+        # Killing a process that is already gone doesn't fail.
+        kill_process_group(p)
+        self.assertEqual(p.returncode, 0)
+
     def test_run_shell_command_without_stdin(self):
         command = RunShellCommandTest.construct_testscript_command(
             'test_program.py')
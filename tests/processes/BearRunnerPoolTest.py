@@ -0,0 +1,115 @@
+import os
+import queue
+import re
+import unittest
+from unittest.mock import patch
+
+from pyprint.ConsolePrinter import ConsolePrinter
+
+from coalib.output.printers.LogPrinter import LogPrinter
+from coalib.processes.BearRunnerPool import (
+    BearRunnerPool, detach_bears, run_jobs)
+from coalib.processes.Processing import execute_section
+from coalib.settings.ConfigurationGathering import gather_configuration
+from coalib.settings.Section import Section
+from coalib.settings.Setting import Setting
+from tests.processes.BearRunningTest import SimpleBear
+
+
+class BearRunnerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        config_path = os.path.abspath(os.path.join(
+            os.path.dirname(__file__),
+            'section_executor_test_files',
+            '.coafile'))
+        self.result_queue = queue.Queue()
+        self.console_printer = ConsolePrinter()
+        self.log_printer = LogPrinter(ConsolePrinter())
+
+        (self.sections,
+         self.local_bears,
+         self.global_bears,
+         targets) = gather_configuration(lambda *args: True,
+                                         self.log_printer,
+                                         arg_list=['--config',
+                                                   re.escape(config_path)])
+
+    def execute_section(self, pool, jobs):
+        section = self.sections['cli'].copy()
+        section.append(Setting('jobs', str(jobs)))
+        return execute_section(section,
+                               list(self.global_bears['cli']),
+                               list(self.local_bears['cli']),
+                               lambda *args: self.result_queue.put(args[2]),
+                               None,
+                               self.log_printer,
+                               console_printer=self.console_printer,
+                               pool=pool)
+
+    def test_sections_share_processes(self):
+        with BearRunnerPool() as pool:
+            results = self.execute_section(pool, 1)
+            self.assertEqual(len(pool.processes), 1)
+            first_process = pool.processes[0]
+
+            self.assertTrue(results[0])
+            self.assertEqual(len(results[1]), 1)
+            self.assertEqual(len(results[2]), 1)
+
+            # More processes get started only when needed.
+            results = self.execute_section(pool, 2)
+            self.assertEqual(len(pool.processes), 2)
+            self.assertIs(pool.processes[0], first_process)
+            self.assertTrue(results[0])
+
+            self.execute_section(pool, 1)
+            self.assertEqual(len(pool.processes), 2)
+            processes = pool.processes
+
+        self.assertEqual(pool.processes, [])
+        self.assertFalse(any(process.is_alive() for process in processes))
+
+        origins = []
+        while not self.result_queue.empty():
+            origins.extend(result.origin
+                           for result in self.result_queue.get(timeout=0))
+        self.assertEqual(sorted(origins),
+                         ['GlobalTestBear'] * 3 + ['LocalTestBear'] * 3)
+
+    def test_dead_process(self):
+        with BearRunnerPool() as pool:
+            self.execute_section(pool, 1)
+            pool.processes[0].terminate()
+            pool.processes[0].join()
+
+            # The section doesn't wait for the end of the messages of the
+            # dead process.
+            results = self.execute_section(pool, 1)
+            self.assertFalse(results[0])
+
+    @patch('coalib.processes.BearRunnerPool.run')
+    def test_run_jobs(self, run):
+        job_queue = queue.Queue()
+        message_queue = queue.Queue()
+        bear = SimpleBear(Section('name'), None)
+        job_queue.put({'local_bear_list': [bear], 'global_bear_list': []})
+        job_queue.put(None)
+        run.side_effect = lambda **kwargs: message_queue.put('message')
+
+        run_jobs(job_queue, None, None, message_queue, None)
+        self.assertIs(bear.message_queue, message_queue)
+        # The end of the messages of each job is marked.
+        self.assertEqual(message_queue.get(timeout=0), 'message')
+        self.assertIsNone(message_queue.get(timeout=0))
+        self.assertTrue(message_queue.empty())
+
+    def test_detach_bears(self):
+        message_queue = queue.Queue()
+        bear = SimpleBear(Section('name'), message_queue)
+        detached = detach_bears([bear, 'not a bear'])
+
+        self.assertIsNot(detached[0], bear)
+        self.assertIsNone(detached[0].message_queue)
+        self.assertIs(bear.message_queue, message_queue)
+        self.assertEqual(detached[1], 'not a bear')
@@ -1,14 +1,20 @@
 import multiprocessing
 import queue
+import sys
+import time
 import unittest
+from unittest.mock import patch
 
 from coalib.bears.GlobalBear import GlobalBear
 from coalib.bears.LocalBear import LocalBear
+from coalib.misc.Shell import run_shell_command
 from coalib.processes.BearRunning import (
-    LOG_LEVEL, LogMessage, run, send_msg, task_done)
+    LOG_LEVEL, LogMessage, get_rss, get_time_budget, run, send_msg,
+    should_retire, task_done)
 from coalib.processes.CONTROL_ELEMENT import CONTROL_ELEMENT
 from coalib.results.Result import RESULT_SEVERITY, Result
 from coalib.settings.Section import Section
+from coalib.settings.Setting import Setting
 
 
 class LocalTestBear(LocalBear):
@@ -108,6 +114,16 @@ class UnexpectedBear2(LocalBear):
         return 1
 
 
+class HangingBear(LocalBear):
+
+    def run(self, filename, file):
+        if filename == 'hang':
+            run_shell_command([sys.executable, '-c',
+                               'import time; time.sleep(60)'],
+                              new_session=True)
+        return [Result.from_values('HangingBear', 'test result', filename)]
+
+
 class BearRunningUnitTest(unittest.TestCase):
 
     def setUp(self):
@@ -176,6 +192,276 @@ class BearRunningUnitTest(unittest.TestCase):
         except queue.Empty:
             pass
 
+    def test_dependencies_pipe_results(self):
+        self.local_bear_list.append(SimpleBear(self.settings,
+                                               self.message_queue))
+        self.local_bear_list.append(DependentBear(self.settings,
+                                                  self.message_queue))
+        self.global_bear_list.append(SimpleGlobalBear({},
+                                                      self.settings,
+                                                      self.message_queue))
+        self.global_bear_list.append(DependentGlobalBear({},
+                                                         self.settings,
+                                                         self.message_queue))
+        self.global_bear_queue.put((0, 1))
+        self.file_name_queue.put('t')
+        self.file_dict['t'] = []
+        local_result_dict = {}
+        global_result_dict = {}
+
+        run(self.file_name_queue,
+            self.local_bear_list,
+            self.global_bear_list,
+            self.global_bear_queue,
+            self.file_dict,
+            local_result_dict,
+            global_result_dict,
+            self.message_queue,
+            self.control_queue,
+            pipe_results=True)
+
+        control_elem, (filename, results) = self.control_queue.get(timeout=0)
+        self.assertEqual(control_elem, CONTROL_ELEMENT.LOCAL_RESULTS)
+        self.assertEqual(filename, 't')
+        self.assertEqual(len(results), 3)
+        # Local results are not kept in the process.
+        self.assertEqual(local_result_dict, {})
+
+        control_elem, index = self.control_queue.get(timeout=0)
+        self.assertEqual(control_elem, CONTROL_ELEMENT.LOCAL_FINISHED)
+
+        control_elem, (bearname, results) = self.control_queue.get(timeout=0)
+        self.assertEqual(control_elem, CONTROL_ELEMENT.GLOBAL_RESULTS)
+        self.assertEqual(bearname, 'SimpleGlobalBear')
+        self.assertEqual(len(results), 3)
+
+        # DependentGlobalBear got its dependency results and yields nothing.
+        control_elem, index = self.control_queue.get(timeout=0)
+        self.assertEqual(control_elem, CONTROL_ELEMENT.GLOBAL_FINISHED)
+        self.assertEqual(global_result_dict,
+                         {'SimpleGlobalBear': results,
+                          'DependentGlobalBear': None})
+
+        try:
+            while True:
+                msg = self.message_queue.get(timeout=0)
+                self.assertEqual(msg.log_level, LOG_LEVEL.DEBUG)
+        except queue.Empty:
+            pass
+
+    def test_file_batches(self):
+        self.local_bear_list.append(SimpleBear(self.settings,
+                                               self.message_queue))
+        self.file_name_queue.put(('t', 'u'))
+        self.file_name_queue.put('v')
+        self.file_dict.update({'t': [], 'u': [], 'v': []})
+
+        run(self.file_name_queue,
+            self.local_bear_list,
+            self.global_bear_list,
+            self.global_bear_queue,
+            self.file_dict,
+            self.local_result_dict,
+            self.global_result_dict,
+            self.message_queue,
+            self.control_queue)
+
+        for filename in ('t', 'u', 'v'):
+            self.assertEqual(self.control_queue.get(timeout=0),
+                             (CONTROL_ELEMENT.LOCAL, filename))
+            self.assertEqual(len(self.local_result_dict[filename]), 3)
+
+    def test_end_of_queue(self):
+        self.local_bear_list.append(SimpleBear(self.settings,
+                                               self.message_queue))
+        self.file_name_queue.put('t')
+        self.file_name_queue.put(None)
+        self.file_name_queue.put('u')
+        self.global_bear_queue.put(None)
+        self.file_dict.update({'t': [], 'u': []})
+
+        # Would block for a minute if the end of the queues was not detected
+        run(self.file_name_queue,
+            self.local_bear_list,
+            self.global_bear_list,
+            self.global_bear_queue,
+            self.file_dict,
+            self.local_result_dict,
+            self.global_result_dict,
+            self.message_queue,
+            self.control_queue,
+            timeout=60,
+            pipe_results=True)
+
+        control_elem, (filename, results) = self.control_queue.get(timeout=0)
+        self.assertEqual(control_elem, CONTROL_ELEMENT.LOCAL_RESULTS)
+        self.assertEqual(filename, 't')
+        self.assertEqual(self.control_queue.get(timeout=0),
+                         (CONTROL_ELEMENT.LOCAL_FINISHED, None))
+        self.assertEqual(self.control_queue.get(timeout=0),
+                         (CONTROL_ELEMENT.GLOBAL_FINISHED, None))
+        # Elements after the end are left for other processes.
+        self.assertEqual(self.file_name_queue.get(timeout=0), 'u')
+
+    def test_end_of_global_queue(self):
+        self.global_bear_list.append(SimpleGlobalBear({},
+                                                      self.settings,
+                                                      self.message_queue))
+        self.global_bear_list.append(DependentGlobalBear({},
+                                                         self.settings,
+                                                         self.message_queue))
+        self.global_bear_queue.put(1)
+        self.global_bear_queue.put(None)
+        self.global_bear_queue.put(0)
+        self.file_name_queue.put(None)
+
+        def finish_dependency(interval):
+            # Another process runs the dependency meanwhile.
+            self.global_result_dict['SimpleGlobalBear'] = (
+                self.global_bear_list[0].run())
+
+        with patch('coalib.processes.BearRunning.time.sleep',
+                   side_effect=finish_dependency) as sleep:
+            # Would block for a minute if the end of the queue was not
+            # detected
+            run(self.file_name_queue,
+                self.local_bear_list,
+                self.global_bear_list,
+                self.global_bear_queue,
+                self.file_dict,
+                self.local_result_dict,
+                self.global_result_dict,
+                self.message_queue,
+                self.control_queue,
+                timeout=60)
+
+        sleep.assert_called_once_with(0.01)
+        self.assertEqual(self.control_queue.get(timeout=0),
+                         (CONTROL_ELEMENT.LOCAL_FINISHED, None))
+        self.assertEqual(self.control_queue.get(timeout=0),
+                         (CONTROL_ELEMENT.GLOBAL_FINISHED, None))
+        self.assertEqual(self.global_result_dict['DependentGlobalBear'], None)
+        self.assertEqual(self.global_bear_queue.get(timeout=0), 0)
+
+    def test_retire(self):
+        self.local_bear_list.append(SimpleBear(self.settings,
+                                               self.message_queue))
+        self.file_name_queue.put('t')
+        self.file_name_queue.put('u')
+        self.file_dict.update({'t': [], 'u': []})
+
+        run(self.file_name_queue,
+            self.local_bear_list,
+            self.global_bear_list,
+            self.global_bear_queue,
+            self.file_dict,
+            self.local_result_dict,
+            self.global_result_dict,
+            self.message_queue,
+            self.control_queue,
+            max_files_per_worker=1)
+
+        self.assertEqual(self.control_queue.get(timeout=0),
+                         (CONTROL_ELEMENT.LOCAL, 't'))
+        self.assertEqual(self.control_queue.get(timeout=0),
+                         (CONTROL_ELEMENT.WORKER_RETIRED, None))
+        self.assertTrue(self.control_queue.empty())
+        # The remaining files are left for the replacement.
+        self.assertEqual(self.file_name_queue.get(timeout=0), 'u')
+
+    def test_should_retire(self):
+        self.assertFalse(should_retire(100))
+        self.assertFalse(should_retire(9, max_files_per_worker=10))
+        self.assertTrue(should_retire(10, max_files_per_worker=10))
+        self.assertTrue(should_retire(0, max_worker_rss=1))
+        self.assertFalse(should_retire(0, max_worker_rss=10 ** 9))
+
+        with patch('coalib.processes.BearRunning.get_rss', return_value=500):
+            # Only the growth since the process started counts, not what it
+            # inherited from its parent.
+            self.assertFalse(should_retire(0, max_worker_rss=100,
+                                           start_rss=450))
+            self.assertTrue(should_retire(0, max_worker_rss=100,
+                                          start_rss=400))
+
+        with patch('coalib.processes.BearRunning.get_rss', return_value=None):
+            self.assertFalse(should_retire(0, max_worker_rss=1))
+
+    def test_get_rss(self):
+        self.assertGreater(get_rss(), 0)
+
+        # Without /proc the peak resident set size is used.
+        with patch('coalib.processes.BearRunning.open', create=True,
+                   side_effect=OSError):
+            self.assertGreater(get_rss(), 0)
+
+    def test_global_bears_done(self):
+        self.global_bear_list.append(SimpleGlobalBear({},
+                                                      self.settings,
+                                                      self.message_queue))
+        self.global_bear_queue.put(0)
+        self.file_name_queue.put(None)
+
+        run(self.file_name_queue,
+            self.local_bear_list,
+            self.global_bear_list,
+            self.global_bear_queue,
+            self.file_dict,
+            self.local_result_dict,
+            self.global_result_dict,
+            self.message_queue,
+            self.control_queue,
+            global_bears_done=True)
+
+        self.assertEqual(self.control_queue.get(timeout=0),
+                         (CONTROL_ELEMENT.LOCAL_FINISHED, None))
+        self.assertTrue(self.control_queue.empty())
+        # The global bears were run by the retired process already.
+        self.assertEqual(self.global_bear_queue.get(timeout=0), 0)
+
+    def test_bear_timeout(self):
+        self.settings.append(Setting('bear_timeout', '0.5'))
+        self.local_bear_list.append(HangingBear(self.settings,
+                                                self.message_queue))
+        self.file_name_queue.put('hang')
+        self.file_name_queue.put('t')
+        self.file_dict.update({'hang': [], 't': []})
+
+        start = time.time()
+        run(self.file_name_queue,
+            self.local_bear_list,
+            self.global_bear_list,
+            self.global_bear_queue,
+            self.file_dict,
+            self.local_result_dict,
+            self.global_result_dict,
+            self.message_queue,
+            self.control_queue)
+        self.assertLess(time.time() - start, 30)
+
+        # The remaining files are still checked.
+        self.assertEqual(self.local_result_dict['hang'], [])
+        self.assertEqual(len(self.local_result_dict['t']), 1)
+
+        warnings = []
+        while not self.message_queue.empty():
+            msg = self.message_queue.get(timeout=0)
+            if msg.log_level == LOG_LEVEL.WARNING:
+                warnings.append(msg.message)
+        self.assertEqual(warnings,
+                         ['The bear HangingBear exceeded its time budget of '
+                          '0.5 seconds on file hang and was cancelled. '
+                          'Continuing with the remaining work...'])
+
+    def test_get_time_budget(self):
+        bear = SimpleBear(self.settings, self.message_queue)
+        self.assertEqual(get_time_budget(bear), 0)
+        self.settings.append(Setting('bear_timeout', '2.5'))
+        self.assertEqual(get_time_budget(bear), 2.5)
+        self.settings.append(Setting('bear_timeout', 'forever'))
+        self.assertEqual(get_time_budget(bear), 0)
+        self.assertEqual(get_time_budget(object()), 0)
+
     def test_evil_bear(self):
         self.local_bear_list.append(EvilBear(self.settings,
                                              self.message_queue))
@@ -288,7 +574,12 @@ d
                                                      'something went wrong',
                                                      'arbitrary')]
                                  ]
-        for expected in local_result_expected:
+        for filename, expected in zip((self.file1, self.file2),
+                                      local_result_expected):
+            # The invalid bear fails on every file, so the results are
+            # incomplete.
+            self.assertEqual(self.control_queue.get(),
+                             (CONTROL_ELEMENT.LOCAL_FAILED, filename))
             control_elem, index = self.control_queue.get()
             self.assertEqual(control_elem, CONTROL_ELEMENT.LOCAL)
             real = self.local_result_dict[index]
@@ -0,0 +1,52 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from coalib.processes.LazyFileDict import LazyFileDict
+
+
+class LazyFileDictTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'file.py')
+        with open(self.filename, 'w') as file:
+            file.write('line 1\nline 2\n')
+
+        self.binary_filename = os.path.join(self.directory.name, 'file.bin')
+        with open(self.binary_filename, 'wb') as file:
+            file.write(b'\xff\xfe\x00')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lazy_reading(self):
+        uut = LazyFileDict([self.filename])
+        # Nothing is read until accessed
+        os.remove(self.filename)
+        self.assertNotIn(self.filename, uut)
+        self.assertEqual(dict(uut), {})
+
+    def test_contents(self):
+        uut = LazyFileDict([self.filename, self.binary_filename])
+        self.assertEqual(uut[self.filename], ('line 1\n', 'line 2\n'))
+        self.assertNotIn(self.binary_filename, uut)
+        self.assertNotIn('other', uut)
+        self.assertEqual(list(uut), [self.filename])
+        self.assertEqual(len(uut), 1)
+        with self.assertRaises(KeyError):
+            uut[self.binary_filename]
+
+    def test_known_contents(self):
+        uut = LazyFileDict([self.filename], {self.filename: ('known\n',)})
+        self.assertEqual(uut[self.filename], ('known\n',))
+
+    def test_pickle(self):
+        uut = LazyFileDict([self.filename], {self.filename: ('known\n',)})
+        pickled = pickle.dumps(uut)
+        self.assertNotIn(b'known', pickled)
+
+        unpickled = pickle.loads(pickled)
+        self.assertEqual(unpickled.filenames, (self.filename,))
+        self.assertEqual(unpickled[self.filename], ('line 1\n', 'line 2\n'))
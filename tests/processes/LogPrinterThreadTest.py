@@ -34,3 +34,32 @@ class LogPrinterThreadTest(unittest.TestCase):
             self.assertEqual(stdout.getvalue(),
                              'Sample message 1\nSample message 2\nSample '
                              'message 3\n')
+
+    def test_stop(self):
+        log_printer = TestPrinter()
+        log_queue = queue.Queue()
+        self.uut = LogPrinterThread(log_queue, log_printer)
+        log_queue.put(item='Sample message 1')
+        log_queue.put(item='Sample message 2')
+        with retrieve_stdout() as stdout:
+            self.uut.start()
+            self.uut.stop()
+            self.uut.join(timeout=5)
+            self.assertFalse(self.uut.is_alive())
+            self.assertEqual(stdout.getvalue(),
+                             'Sample message 1\nSample message 2\n')
+
+    def test_producer_count(self):
+        log_printer = TestPrinter()
+        log_queue = queue.Queue()
+        self.uut = LogPrinterThread(log_queue, log_printer, producer_count=2)
+        log_queue.put(item='Sample message 1')
+        log_queue.put(item=None)
+        log_queue.put(item='Sample message 2')
+        with retrieve_stdout() as stdout:
+            self.uut.start()
+            self.uut.stop()
+            self.uut.join(timeout=5)
+            self.assertFalse(self.uut.is_alive())
+            self.assertEqual(stdout.getvalue(),
+                             'Sample message 1\nSample message 2\n')
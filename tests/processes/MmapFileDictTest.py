@@ -0,0 +1,50 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from coalib.output.printers.ListLogPrinter import ListLogPrinter
+from coalib.processes.MmapFileDict import MmapFileDict, split_lines
+from coalib.processes.Processing import get_file_dict
+
+
+class MmapFileDictTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filenames = []
+        for name, content in (('a.py', b'line 1\nline 2\n'),
+                              ('b.py', b'windows\r\nline'),
+                              ('empty.py', b''),
+                              ('unicode.py', 'f\xfc\xdf\n'.encode('utf-8')),
+                              ('binary.bin', b'\xff\xfe\x00')):
+            filename = os.path.join(self.directory.name, name)
+            with open(filename, 'wb') as file:
+                file.write(content)
+            self.filenames.append(filename)
+
+        self.uut = MmapFileDict.from_files(self.filenames,
+                                           directory=self.directory.name)
+
+    def tearDown(self):
+        self.uut.close()
+        self.directory.cleanup()
+
+    def test_contents(self):
+        self.assertEqual(dict(self.uut),
+                         get_file_dict(self.filenames, ListLogPrinter()))
+        self.assertEqual(len(self.uut), 4)
+        self.assertNotIn(self.filenames[-1], self.uut)
+
+    def test_pickle(self):
+        unpickled = pickle.loads(pickle.dumps(self.uut))
+        self.assertEqual(dict(unpickled), dict(self.uut))
+        unpickled.close()
+
+        # Only the instance that created the backing file deletes it.
+        self.assertTrue(os.path.exists(self.uut.path))
+        self.uut.close()
+        self.assertFalse(os.path.exists(self.uut.path))
+
+    def test_split_lines(self):
+        self.assertEqual(split_lines('a\n\nb\r\n'), ('a\n', '\n', 'b\r\n'))
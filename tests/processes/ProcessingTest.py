@@ -7,17 +7,20 @@ import re
 import subprocess
 import sys
 import unittest
+import unittest.mock
 
 from pyprint.ConsolePrinter import ConsolePrinter
 
 from coalib.bears.Bear import Bear
 from coalib.output.printers.LogPrinter import LogPrinter
 from coalib.processes.CONTROL_ELEMENT import CONTROL_ELEMENT
+from coalib.processes.MmapFileDict import MmapFileDict
 from coalib.processes.Processing import (
     ACTIONS, autoapply_actions, check_result_ignore, create_process_group,
-    execute_section, filter_raising_callables, get_default_actions,
-    get_file_dict, print_result, process_queues, simplify_section_result,
-    yield_ignore_ranges)
+    execute_section, execute_sections_concurrently, filter_raising_callables,
+    get_control_element, get_cpu_count, get_default_actions, get_file_dict,
+    get_global_bear_groups, get_job_count, get_worker_limits, print_result,
+    process_queues, simplify_section_result, yield_ignore_ranges)
 from coalib.results.HiddenResult import HiddenResult
 from coalib.results.Result import RESULT_SEVERITY, Result
 from coalib.results.result_actions.ApplyPatchAction import ApplyPatchAction
@@ -132,6 +135,215 @@ class ProcessingTest(unittest.TestCase):
                          'aspect=NoneType\\'
                          ') at 0x[0-9a-fA-F]+>'.format(hex(global_result.id)))
 
+    def test_run_cached_results(self):
+        self.sections['cli'].append(Setting('jobs', '1'))
+        cache = FileCache(self.log_printer, 'coala_test_results',
+                          flush_cache=True)
+
+        def execute():
+            results = execute_section(
+                self.sections['cli'],
+                copy.copy(self.global_bears['cli']),
+                copy.copy(self.local_bears['cli']),
+                lambda *args: self.result_queue.put(args[2]),
+                cache,
+                self.log_printer,
+                console_printer=self.console_printer)
+            cache.write()
+            return results
+
+        execute()
+        self.assertEqual(
+            len(cache.get_results('cli', self.testcode_c_path)), 1)
+        local_results = self.result_queue.get(timeout=0)
+        self.result_queue.get(timeout=0)
+
+        # The local bear doesn't run on the unchanged file again, but its
+        # results are replayed.
+        with unittest.mock.patch(
+                'coalib.processes.Processing.schedule_files',
+                return_value=[]) as schedule_files:
+            results = execute()
+        self.assertEqual(list(schedule_files.call_args[0][0]), [])
+        self.assertEqual(self.result_queue.get(timeout=0), local_results)
+        self.assertEqual(results[1][self.testcode_c_path], local_results)
+        self.assertEqual(len(self.result_queue.get(timeout=0)), 1)
+        self.assertTrue(self.result_queue.empty())
+
+        # Changing the settings of the local bears invalidates the results.
+        with unittest.mock.patch(
+                'coalib.processes.Processing.get_section_settings_hash',
+                return_value='changed'):
+            execute()
+        self.assertNotEqual(self.result_queue.get(timeout=0)[0].id,
+                            local_results[0].id)
+        self.assertEqual(len(self.result_queue.get(timeout=0)), 1)
+        self.assertTrue(self.result_queue.empty())
+
+    def test_run_pipe_results(self):
+        self.sections['cli'].append(Setting('jobs', '1'))
+        self.sections['cli'].append(Setting('pipe_results', 'true'))
+        results = execute_section(self.sections['cli'],
+                                  self.global_bears['cli'],
+                                  self.local_bears['cli'],
+                                  lambda *args: self.result_queue.put(args[2]),
+                                  None,
+                                  self.log_printer,
+                                  console_printer=self.console_printer)
+        self.assertTrue(results[0])
+
+        local_results = self.result_queue.get(timeout=0)
+        global_results = self.result_queue.get(timeout=0)
+        self.assertTrue(self.result_queue.empty())
+
+        self.assertEqual(len(local_results), 1)
+        self.assertEqual(len(global_results), 1)
+        self.assertEqual(local_results[0].origin, 'LocalTestBear')
+        self.assertEqual(global_results[0].origin, 'GlobalTestBear')
+
+        # Plain dicts are returned as no Manager is used.
+        self.assertIs(type(results[1]), dict)
+        self.assertIs(type(results[2]), dict)
+        self.assertEqual(len(results[1]), 1)
+        self.assertEqual(len(results[2]), 1)
+
+    def test_execute_sections_concurrently(self):
+        printed = []
+        section_results = execute_sections_concurrently(
+            [('cli', self.sections['cli'])],
+            self.global_bears,
+            self.local_bears,
+            lambda *args: printed.append(args[2]),
+            lambda section: printed.append(section.name),
+            None,
+            self.log_printer,
+            self.console_printer,
+            job_count=2)
+
+        (section_name, results), = list(section_results)
+        self.assertEqual(section_name, 'cli')
+        self.assertTrue(results[0])
+        self.assertEqual(len(results[1]), 1)
+        self.assertEqual(len(results[2]), 1)
+
+        # The output of the section is printed as a whole.
+        self.assertEqual(len(printed), 3)
+        self.assertEqual(printed[0], 'cli')
+        self.assertEqual(printed[1][0].origin, 'LocalTestBear')
+        self.assertEqual(printed[2][0].origin, 'GlobalTestBear')
+
+    def test_execute_sections_concurrently_changed_files(self):
+        cache = FileCache(self.log_printer, 'coala_test', flush_cache=True)
+        cache.track_files({'c'}, 'other')
+
+        def print_results(log_printer, section, results, file_dict,
+                          file_diff_dict, console_printer):
+            # An action changes a file while the output is printed.
+            file_diff_dict['c'] = None
+
+        section_results = execute_sections_concurrently(
+            [('cli', self.sections['cli'])],
+            self.global_bears,
+            self.local_bears,
+            print_results,
+            lambda section: None,
+            cache,
+            self.log_printer,
+            self.console_printer,
+            job_count=2)
+        list(section_results)
+
+        # The file is analyzed again by all sections.
+        self.assertIn(('other', 'c'), cache.to_untrack)
+
+    def test_get_job_count(self):
+        section = Section('test')
+        self.assertEqual(get_job_count(section, self.log_printer),
+                         get_cpu_count())
+        section.append(Setting('jobs', '3'))
+        self.assertEqual(get_job_count(section, self.log_printer), 3)
+        section.append(Setting('jobs', 'many'))
+        self.assertEqual(get_job_count(section, self.log_printer),
+                         get_cpu_count())
+
+    def test_get_worker_limits(self):
+        section = Section('test')
+        self.assertEqual(get_worker_limits(section, self.log_printer), (0, 0))
+        section.append(Setting('max_files_per_worker', '10'))
+        section.append(Setting('max_worker_rss', '1.5'))
+        self.assertEqual(get_worker_limits(section, self.log_printer),
+                         (10, 1.5))
+        section.append(Setting('max_files_per_worker', 'many'))
+        section.append(Setting('max_worker_rss', 'lots'))
+        self.assertEqual(get_worker_limits(section, self.log_printer),
+                         (0, 0))
+        self.assertEqual(self.log_queue.get(timeout=0).message,
+                         "Unable to convert setting 'max_files_per_worker' "
+                         'into a number. Falling back to 0 (disabled).')
+        self.assertEqual(self.log_queue.get(timeout=0).message,
+                         "Unable to convert setting 'max_worker_rss' into a "
+                         'number. Falling back to 0 (disabled).')
+
+    def test_run_overlap_global_bears(self):
+        self.sections['cli'].append(Setting('jobs', '1'))
+        self.sections['cli'].append(Setting('overlap_global_bears', 'true'))
+        results = execute_section(self.sections['cli'],
+                                  self.global_bears['cli'],
+                                  self.local_bears['cli'],
+                                  lambda *args: self.result_queue.put(args[2]),
+                                  None,
+                                  self.log_printer,
+                                  console_printer=self.console_printer)
+        self.assertTrue(results[0])
+
+        # The global bear is run first and its results aren't held back.
+        global_results = self.result_queue.get(timeout=0)
+        local_results = self.result_queue.get(timeout=0)
+        self.assertTrue(self.result_queue.empty())
+
+        self.assertEqual(local_results[0].origin, 'LocalTestBear')
+        self.assertEqual(global_results[0].origin, 'GlobalTestBear')
+        self.assertEqual(len(results[1]), 1)
+        self.assertEqual(len(results[2]), 1)
+
+    def test_run_shared_file_store(self):
+        self.sections['cli'].append(Setting('jobs', '2'))
+        self.sections['cli'].append(Setting('shared_file_store', 'true'))
+        results = execute_section(self.sections['cli'],
+                                  self.global_bears['cli'],
+                                  self.local_bears['cli'],
+                                  lambda *args: self.result_queue.put(args[2]),
+                                  None,
+                                  self.log_printer,
+                                  console_printer=self.console_printer)
+        self.assertTrue(results[0])
+        self.assertEqual(len(results[1]), 1)
+        self.assertEqual(len(results[2]), 1)
+
+        file_dict = self.global_bears['cli'][0].file_dict
+        self.assertIsInstance(file_dict, MmapFileDict)
+        self.assertEqual(dict(file_dict), results[3])
+        file_dict.close()
+
+    def test_run_max_files_per_worker(self):
+        self.sections['cli'].append(Setting('jobs', '1'))
+        self.sections['cli'].append(Setting('max_files_per_worker', '1'))
+        results = execute_section(self.sections['cli'],
+                                  self.global_bears['cli'],
+                                  self.local_bears['cli'],
+                                  lambda *args: self.result_queue.put(args[2]),
+                                  None,
+                                  self.log_printer,
+                                  console_printer=self.console_printer)
+        self.assertTrue(results[0])
+
+        # The replacement of the retired process runs the global bear.
+        local_results = self.result_queue.get(timeout=0)
+        global_results = self.result_queue.get(timeout=0)
+        self.assertTrue(self.result_queue.empty())
+        self.assertEqual(local_results[0].origin, 'LocalTestBear')
+        self.assertEqual(global_results[0].origin, 'GlobalTestBear')
+
     def test_empty_run(self):
         execute_section(self.sections['cli'],
                         [],
@@ -227,6 +439,87 @@ class ProcessingTest(unittest.TestCase):
         self.assertEqual(self.queue.get(timeout=0), ([first_global]))
         self.assertEqual(self.queue.get(timeout=0), ([first_global]))
 
+    def test_process_queues_cache(self):
+        ctrlq = queue.Queue()
+        ctrlq.put((CONTROL_ELEMENT.LOCAL_FAILED, 'a'))
+        ctrlq.put((CONTROL_ELEMENT.LOCAL, 'a'))
+        ctrlq.put((CONTROL_ELEMENT.LOCAL, 'b'))
+        ctrlq.put((CONTROL_ELEMENT.LOCAL_FINISHED, None))
+        ctrlq.put((CONTROL_ELEMENT.GLOBAL_FINISHED, None))
+        result = Result('LocalBear', 'message')
+        cache = unittest.mock.Mock()
+
+        def print_results(log_printer, section, results, file_dict,
+                          file_diff_dict, console_printer):
+            # An action changes the file.
+            file_diff_dict['c'] = None
+
+        process_queues(
+            [DummyProcess(control_queue=ctrlq) for i in range(2)],
+            ctrlq,
+            {'a': [result], 'b': [result]},
+            {},
+            {},
+            print_results,
+            Section('section'),
+            cache,
+            self.log_printer,
+            self.console_printer)
+
+        # The results of the file a bear failed on are incomplete.
+        cache.set_results.assert_called_once_with('section', 'b', [result])
+        cache.untrack_files.assert_called_once_with({'a'}, 'section')
+        cache.untrack_changed_files.assert_called_once_with({'c'})
+
+    def test_get_control_element(self):
+        ctrlq = queue.Queue()
+        local_result_dict = {}
+        global_result_dict = {}
+        local_result = Result('LocalBear', 'message')
+        global_result = Result('GlobalBear', 'message')
+
+        ctrlq.put((CONTROL_ELEMENT.LOCAL, 'f'))
+        ctrlq.put((CONTROL_ELEMENT.LOCAL_RESULTS, ('f', [local_result])))
+        ctrlq.put((CONTROL_ELEMENT.GLOBAL_RESULTS,
+                   ('GlobalBear', [global_result])))
+
+        for expected in [(CONTROL_ELEMENT.LOCAL, 'f'),
+                         (CONTROL_ELEMENT.LOCAL, 'f'),
+                         (CONTROL_ELEMENT.GLOBAL, 'GlobalBear')]:
+            self.assertEqual(get_control_element(ctrlq,
+                                                 local_result_dict,
+                                                 global_result_dict,
+                                                 timeout=0),
+                             expected)
+
+        self.assertEqual(local_result_dict, {'f': [local_result]})
+        self.assertEqual(global_result_dict, {'GlobalBear': [global_result]})
+
+        with self.assertRaises(queue.Empty):
+            get_control_element(ctrlq, {}, {}, timeout=0)
+
+    def test_get_global_bear_groups(self):
+        class A:
+            BEAR_DEPS = set()
+
+        class B:
+            BEAR_DEPS = {A}
+
+        class C:
+            BEAR_DEPS = set()
+
+        class D:
+            BEAR_DEPS = {B, C}
+
+        self.assertEqual(get_global_bear_groups([]), [])
+        self.assertEqual(get_global_bear_groups([A(), B(), C()]),
+                         [(0, 1), (2,)])
+        self.assertEqual(get_global_bear_groups([A(), C(), B(), D()]),
+                         [(0, 1, 2, 3)])
+        # Invalid bears are put into their own group.
+        self.assertEqual(get_global_bear_groups(['not a bear', A()]),
+                         [(0,), (1,)])
+
     def test_dead_processes(self):
         ctrlq = queue.Queue()
         # Not enough FINISH elements in the queue, processes start already dead
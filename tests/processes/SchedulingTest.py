@@ -0,0 +1,81 @@
+import heapq
+import os
+import unittest
+from unittest.mock import patch
+
+from coalib.processes.Scheduling import get_file_cost, schedule_files
+
+
+def simulate_makespan(schedule, costs, job_count, item_overhead=1):
+    """
+    Simulates processes pulling the items of ``schedule`` from a queue and
+    returns the time when the last process finishes.
+    """
+    finish_times = [0] * job_count
+    for item in schedule:
+        start = heapq.heappop(finish_times)
+        heapq.heappush(finish_times,
+                       start + item_overhead + sum(costs[f] for f in item))
+
+    return max(finish_times)
+
+
+class SchedulingTest(unittest.TestCase):
+
+    def test_get_file_cost(self):
+        self.assertEqual(get_file_cost(__file__),
+                         os.path.getsize(__file__) + 1)
+        self.assertEqual(get_file_cost(__file__, bear_count=3),
+                         (os.path.getsize(__file__) + 1) * 3)
+        self.assertEqual(get_file_cost('non_existent_file', bear_count=2), 2)
+
+    @patch('coalib.processes.Scheduling.os.path.getsize')
+    def test_schedule_files(self, getsize):
+        sizes = {'small0': 0, 'small1': 0, 'big': 99, 'small2': 0,
+                 'medium': 49, 'small3': 0, 'small4': 0, 'small5': 0}
+        getsize.side_effect = sizes.get
+
+        # Batches get smaller with the remaining cost: after the big and the
+        # medium file a cost of 6 remains, so the first batch may cost 3.
+        self.assertEqual(schedule_files(sizes, 1, batch_factor=2),
+                         [('big',),
+                          ('medium',),
+                          ('small0', 'small1', 'small2'),
+                          ('small3',),
+                          ('small4',),
+                          ('small5',)])
+
+        # One file per batch if there are plenty of processes.
+        self.assertEqual(schedule_files(sizes, 20),
+                         [('big',), ('medium',), ('small0',), ('small1',),
+                          ('small2',), ('small3',), ('small4',),
+                          ('small5',)])
+
+        self.assertEqual(schedule_files(['big'], 0), [('big',)])
+
+    @patch('coalib.processes.Scheduling.os.path.getsize')
+    def test_skewed_file_sizes_benchmark(self, getsize):
+        # Many small files and a few huge generated ones that come last in the
+        # collected file order.
+        sizes = {'file{}'.format(i): 99 for i in range(1000)}
+        sizes.update({'generated{}'.format(i): 49999 for i in range(3)})
+        getsize.side_effect = sizes.get
+        costs = {filename: size + 1 for filename, size in sizes.items()}
+        job_count = 4
+
+        unscheduled = simulate_makespan([(filename,) for filename in sizes],
+                                        costs,
+                                        job_count)
+        schedule = schedule_files(sizes, job_count)
+        scheduled = simulate_makespan(schedule, costs, job_count)
+
+        # The small files are processed alongside the huge ones, instead of
+        # the huge ones being started last, so the run takes about as long as
+        # the ideal distribution of the total cost.
+        ideal = sum(costs.values()) / job_count
+        self.assertEqual(unscheduled, 25000 + 250 + 50000 + 1)
+        self.assertLess(scheduled, ideal * 1.01)
+        # Far less queue round-trips are needed.
+        self.assertLess(len(schedule), len(sizes) / 10)
+        self.assertEqual(sorted(f for batch in schedule for f in batch),
+                         sorted(sizes))
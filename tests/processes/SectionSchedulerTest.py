@@ -0,0 +1,79 @@
+import threading
+import time
+import unittest
+
+from coalib.processes.SectionScheduler import SectionScheduler
+
+
+class SectionSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.running = []
+        self.overlaps = []
+
+    def make_task(self, name, job_count, files, duration=0.05):
+        def function():
+            with self.lock:
+                self.overlaps.append((name, tuple(sorted(self.running))))
+                self.running.append(name)
+            time.sleep(duration)
+            with self.lock:
+                self.running.remove(name)
+            return name
+
+        return job_count, set(files), function
+
+    def test_order(self):
+        uut = SectionScheduler(4)
+        tasks = [self.make_task('a', 1, ['1'], duration=0.1),
+                 self.make_task('b', 1, ['2']),
+                 self.make_task('c', 1, ['3'], duration=0)]
+        self.assertEqual(list(uut.run(tasks)), ['a', 'b', 'c'])
+        # All sections could run at the same time.
+        self.assertEqual(dict(self.overlaps)['c'], ('a', 'b'))
+        self.assertEqual(uut.free_jobs, 4)
+        self.assertEqual(uut.running_files, [])
+
+    def test_common_files(self):
+        uut = SectionScheduler(4)
+        tasks = [self.make_task('a', 1, ['1', '2']),
+                 self.make_task('b', 1, ['2', '3']),
+                 self.make_task('c', 1, ['4'])]
+        self.assertEqual(list(uut.run(tasks)), ['a', 'b', 'c'])
+        overlaps = dict(self.overlaps)
+        self.assertNotIn('a', overlaps['b'])
+
+    def test_files_locked_until_processed(self):
+        uut = SectionScheduler(4)
+        tasks = [self.make_task('a', 1, ['1'], duration=0),
+                 self.make_task('b', 1, ['1', '2'], duration=0)]
+        results = uut.run(tasks)
+        self.assertEqual(next(results), 'a')
+
+        # The results of 'a' may still be applied to its files.
+        time.sleep(0.05)
+        self.assertEqual([name for name, _ in self.overlaps], ['a'])
+
+        self.assertEqual(list(results), ['b'])
+        self.assertEqual(uut.running_files, [])
+
+    def test_job_budget(self):
+        uut = SectionScheduler(2)
+        tasks = [self.make_task('a', 2, ['1']),
+                 self.make_task('b', 5, ['2']),
+                 self.make_task('c', 1, ['3'])]
+        self.assertEqual(list(uut.run(tasks)), ['a', 'b', 'c'])
+        overlaps = dict(self.overlaps)
+        self.assertEqual(overlaps['b'], ())
+        self.assertEqual(overlaps['c'], ())
+
+    def test_exception(self):
+        def fail():
+            raise ValueError
+
+        uut = SectionScheduler(2)
+        results = uut.run([(1, set(), fail)])
+        with self.assertRaises(ValueError):
+            next(results)
+        self.assertEqual(uut.free_jobs, 2)